@@ -9,8 +9,23 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_asgi_application()
+
+# Несколько процессов uvicorn с кэшем и событиями в памяти каждого из них
+# отдавали бы устаревшие данные: такой запуск останавливается сразу.
+# Число процессов берётся из UVICORN_WORKERS/WEB_CONCURRENCY, флаг
+# uvicorn --workers в командной строке отсюда не виден (main/checks.py)
+from main.checks import raise_for_shared_state  # noqa: E402
+
+raise_for_shared_state()
+
+# Статику (админка) под uvicorn в режиме отладки отдаёт сам Django,
+# как это делает runserver
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -130,6 +131,88 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Без CACHES используется локальная память процесса; при нескольких
+# процессах нужен общий бэкенд, иначе сброс кэша не дойдёт до соседей.
+# REDIS_URL включает кэш в Redis (нужен пакет redis), DJANGO_CACHE_DIR -
+# общий файловый кэш (например, для uvicorn --workers). Для событий через
+# CacheBroker файловый кэш не годится, см. TASK_EVENTS_BACKEND.
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+elif os.environ.get("DJANGO_CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["DJANGO_CACHE_DIR"],
+        }
+    }
+
+# Ответы списков задач API для пользователя (0 - не кэшировать). Изменения
+# сбрасывают кэш сразу, срок ограничивает только устаревание по времени.
+TASK_RESPONSE_CACHE_TIMEOUT = 30
+
+# /api/async/tasks/...?wait=N: предел ожидания изменений и шаг проверки версии
+ASYNC_LONG_POLL_MAX_WAIT = 60
+ASYNC_LONG_POLL_INTERVAL = 1
+
+# Поток событий /api/async/events/ (см. main/events.py). InProcessBroker
+# годится для одного процесса; с несколькими - CacheBroker и кэш Redis или
+# Memcached (файловому кэшу не хватает атомарного incr).
+TASK_EVENTS_BACKEND = os.environ.get(
+    "TASK_EVENTS_BACKEND", "main.events.InProcessBroker"
+)
+# Сколько последних событий пользователя хранится для продолжения потока
+TASK_EVENTS_BUFFER = 200
+# Сколько секунд хранятся события в CacheBroker и как часто он их проверяет
+TASK_EVENTS_TTL = 3600
+TASK_EVENTS_POLL_INTERVAL = 1
+# Пауза без событий, после которой в поток пишется комментарий, секунды
+TASK_EVENTS_HEARTBEAT = 15
+# Через сколько миллисекунд EventSource переподключается после обрыва
+TASK_EVENTS_RETRY_MS = 3000
+
+# /api/sync/: записей на странице; отставание конца промежутка от текущего
+# времени, секунды; сколько дней хранятся отметки об удалении - более старый
+# токен требует полной загрузки.
+# Время изменения ставится до фиксации транзакции: строка, которая получила
+# время до конца промежутка, а зафиксирована после синхронизации, не попадёт
+# ни в эту синхронизацию, ни в следующую. Поэтому отставание должно быть
+# больше самой долгой транзакции, пишущей задачи, комментарии и отметки об
+# удалении: пачки импорта (main/imports.py), /api/tasks/bulk/,
+# действия админки. Если они дольше, увеличьте SYNC_SAFETY_LAG.
+SYNC_PAGE_SIZE = 500
+SYNC_SAFETY_LAG = int(os.environ.get("SYNC_SAFETY_LAG", 60))
+SYNC_TOMBSTONE_DAYS = 90
+
+# Полнотекстовый поиск (?search= в API задач и комментариев): конфигурация
+# текстового поиска PostgreSQL (simple - без стемминга, подходит для поиска
+# по началу слова)
+SEARCH_POSTGRES_CONFIG = "simple"
+
+
+# Админка: до этого числа строк COUNT(*) точный, выше - оценка по статистике
+# базы или закэшированный на ADMIN_COUNT_CACHE_TIMEOUT секунд подсчёт
+ADMIN_APPROXIMATE_COUNT_THRESHOLD = 10_000
+ADMIN_COUNT_CACHE_TIMEOUT = 600
+
+# Каталог готовых файлов фоновых выгрузок (команда run_export_jobs)
+EXPORT_JOBS_DIR = BASE_DIR / "exports"
+
+# Хранение истории изменений (команда purge_history): версии старше days
+# удаляются, кроме последних keep_versions версий каждого объекта
+HISTORY_RETENTION = {
+    "main.Task": {"days": 365, "keep_versions": 10},
+    "main.Comment": {"days": 180, "keep_versions": 3},
+    "main.Category": {"keep_versions": 20},
+}
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
@@ -1,10 +1,28 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, Prefetch
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from django.views.decorators.http import require_POST
 from import_export import fields, resources
 from import_export.admin import ExportMixin
 from import_export.formats.base_formats import XLSX
 from simple_history.admin import SimpleHistoryAdmin
 
-from .models import Category, Comment, Task
+from .export_jobs import job_path, retry_job
+from .exports import CONTENT_TYPES, asgi_streaming, csv_response
+from .forms import TaskImportForm
+from .history import history_batch
+from .imports import file_format_from_name, import_tasks
+from .models import Category, Comment, ExportJob, Task
+from .pagination import ApproximateCountHistoricalQuerySet, ApproximateCountPaginator
+
+IMPORT_ERRORS_SHOWN = 100
 
 
 class TaskResource(resources.ModelResource):
@@ -30,8 +48,8 @@ class TaskResource(resources.ModelResource):
     def dehydrate_users(self, obj):
         return ", ".join([user.username for user in obj.users.all()])
 
-    def get_export_queryset(self, request):
-        queryset = super().get_export_queryset(request)
+    def filter_export(self, queryset, **kwargs):
+        queryset = super().filter_export(queryset, **kwargs)
         return queryset.filter(priority__gte=3)
 
     def dehydrate_due_date(self, obj):
@@ -51,6 +69,29 @@ class TaskResource(resources.ModelResource):
         return obj.update_date.strftime("%d-%m-%Y %H:%M")
 
 
+class LargeTableAdminMixin:
+    """Без точного COUNT(*) на больших таблицах: приблизительное число строк
+    в списке и в истории объекта, без общего счётчика и счётчиков фильтров.
+    Версии при удалении выбранных объектов пишутся одним пакетом."""
+
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def delete_queryset(self, request, queryset):
+        # Удаление выбранных объектов с каскадом пишет историю пакетами
+        with history_batch():
+            super().delete_queryset(request, queryset)
+
+    def get_history_queryset(self, request, history_manager, pk_name, object_id):
+        queryset = super().get_history_queryset(
+            request, history_manager, pk_name, object_id
+        )
+        return ApproximateCountHistoricalQuerySet(
+            queryset.model, queryset.query.chain(), queryset.db
+        )
+
+
 class TaskInline(admin.TabularInline):
     model = Task
     fields = ("title", "status", "priority")
@@ -80,15 +121,19 @@ class CategoryAdmin(SimpleHistoryAdmin):
     def title_with_color(self, obj):
         return f"{obj.title} ({obj.color})"
 
-    @admin.display(description="Количество задач")
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(tasks_total=Count("task"))
+
+    @admin.display(description="Количество задач", ordering="tasks_total")
     def tasks_count(self, obj):
-        return obj.task_set.count()
+        return obj.tasks_total
 
 
 @admin.register(Task)
-class TaskAdmin(ExportMixin, SimpleHistoryAdmin):
+class TaskAdmin(LargeTableAdminMixin, ExportMixin, SimpleHistoryAdmin):
     resource_class = TaskResource
     formats = [XLSX]
+    import_export_change_list_template = "admin/main/task/change_list_export.html"
 
     list_display = (
         "title",
@@ -99,6 +144,16 @@ class TaskAdmin(ExportMixin, SimpleHistoryAdmin):
         "due_date",
     )
     filter_horizontal = ["users"]
+    list_select_related = ("category",)
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .prefetch_related(
+                Prefetch("users", queryset=User.objects.only("id", "username"))
+            )
+        )
 
     def get_users(self, obj):
         return ", ".join([u.username for u in obj.users.all()])
@@ -121,11 +176,165 @@ class TaskAdmin(ExportMixin, SimpleHistoryAdmin):
         ("Даты", {"fields": ("due_date", "creation_date", "update_date")}),
     )
 
+    def get_urls(self):
+        return [
+            path(
+                "export-stream/",
+                self.admin_site.admin_view(self.export_stream_view),
+                name="main_task_export_stream",
+            ),
+            path(
+                "export-job/",
+                self.admin_site.admin_view(require_POST(self.export_job_view)),
+                name="main_task_export_job",
+            ),
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name="main_task_import",
+            ),
+        ] + super().get_urls()
+
+    def export_stream_view(self, request):
+        """Потоковая выгрузка списка с текущими фильтрами в CSV. XLSX - только
+        фоновой выгрузкой (export_job_view)."""
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+        response = csv_response(
+            TaskResource(),
+            self.get_export_queryset(request),
+            f"tasks-{timezone.now():%Y-%m-%d}",
+        )
+        return asgi_streaming(request, response)
+
+    def export_job_view(self, request):
+        """Ставит выгрузку с текущими фильтрами в очередь run_export_jobs."""
+        file_format = request.POST.get("file_format")
+        if file_format not in CONTENT_TYPES:
+            raise Http404
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+        job = ExportJob.objects.create(
+            created_by=request.user,
+            file_format=file_format,
+            query_string=request.GET.urlencode(),
+        )
+        self.message_user(
+            request,
+            f"{job} поставлена в очередь, ход выполнения виден в списке выгрузок",
+            messages.SUCCESS,
+        )
+        return redirect("admin:main_exportjob_changelist")
+
+    def import_view(self, request):
+        """Импорт файла через TaskImporter; строки с ошибками пропускаются."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = TaskImportForm(request.POST or None, request.FILES or None)
+        errors = []
+        if form.is_valid():
+            file = form.cleaned_data["file"]
+            result = import_tasks(
+                file,
+                file_format_from_name(file.name),
+                default_user=request.user,
+                dry_run=form.cleaned_data["dry_run"],
+            )
+            errors = result.errors
+            if form.cleaned_data["dry_run"]:
+                message = f"Строк без ошибок: {result.valid}"
+            else:
+                message = f"Создано задач: {result.created}"
+            self.message_user(
+                request,
+                f"{message}, ошибок: {len(errors)}",
+                messages.WARNING if errors else messages.SUCCESS,
+            )
+            if not errors and not form.cleaned_data["dry_run"]:
+                return redirect("admin:main_task_changelist")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.opts,
+            "title": "Импорт задач",
+            "form": form,
+            "errors": errors[:IMPORT_ERRORS_SHOWN],
+            "errors_hidden": max(0, len(errors) - IMPORT_ERRORS_SHOWN),
+        }
+        return TemplateResponse(request, "admin/main/task/import_tasks.html", context)
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "__str__",
+        "created_by",
+        "file_format",
+        "progress_display",
+        "created_at",
+        "finished_at",
+        "download_link",
+    )
+    list_select_related = ("created_by",)
+    list_filter = ("status", "file_format")
+    readonly_fields = [field.name for field in ExportJob._meta.fields]
+    actions = ("retry",)
+
+    def has_add_permission(self, request):
+        # Задания создаются кнопкой в списке задач
+        return False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.user.is_superuser:
+            return queryset
+        return queryset.filter(created_by=request.user)
+
+    @admin.display(description="Прогресс")
+    def progress_display(self, obj):
+        total = obj.total_rows if obj.total_rows is not None else "?"
+        return f"{obj.progress}% ({obj.processed_rows}/{total})"
+
+    @admin.display(description="Файл")
+    def download_link(self, obj):
+        if obj.status != "done":
+            return ""
+        url = reverse("admin:main_exportjob_download", args=[obj.pk])
+        return format_html('<a href="{}">Скачать</a>', url)
+
+    @admin.action(description="Перезапустить с места остановки")
+    def retry(self, request, queryset):
+        for job in queryset.filter(status="failed"):
+            retry_job(job)
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="main_exportjob_download",
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        job = get_object_or_404(self.get_queryset(request), pk=pk, status="done")
+        file_path = job_path(job)
+        if not file_path.exists():
+            raise Http404
+        response = FileResponse(
+            open(file_path, "rb"),
+            as_attachment=True,
+            filename=f"tasks-{job.created_at:%Y-%m-%d}-{job.pk}.{job.file_format}",
+            content_type=CONTENT_TYPES[job.file_format],
+        )
+        return asgi_streaming(request, response)
+
 
 @admin.register(Comment)
-class CommentAdmin(SimpleHistoryAdmin):
+class CommentAdmin(LargeTableAdminMixin, SimpleHistoryAdmin):
     list_display = ("short_text", "task", "get_user", "created_at")
     list_display_links = ("short_text",)
+    list_select_related = ("task", "user")
     list_filter = ("task", "user", "created_at")
     search_fields = ("text",)
     readonly_fields = ("created_at", "updated_at")
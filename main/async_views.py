@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.http import require_GET
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import NotAuthenticated, NotFound, ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import aget_user_version, user_version_key
+from .events import get_broker, parse_event_id
+from .filters import TaskFilter
+from .models import Task
+from .pagination import InvalidCursor, Keyset, TaskPagination
+from .serializers import TaskRowSerializer, TaskSerializer
+
+# Асинхронные версии чтения задач из API для запуска под ASGI (uvicorn).
+# Ответы те же, что у TaskViewSet в курсорном режиме, а ожидание изменений
+# (?wait=) не занимает поток сервера.
+
+task_keyset = Keyset(TaskPagination.keyset_ordering)
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        safe=False,
+        encoder=JSONEncoder,
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+async def get_api_user(request):
+    """Пользователь по заголовку Authorization: Token ... или по сессии."""
+    keyword, _, key = request.headers.get("Authorization", "").partition(" ")
+    if keyword == "Token" and key.strip():
+        token = (
+            await Token.objects.select_related("user").filter(key=key.strip()).afirst()
+        )
+        if token is not None and token.user.is_active:
+            return token.user
+        return None
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def async_api_view(view):
+    @require_GET
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await get_api_user(request)
+        if user is None:
+            response = json_response(
+                {"detail": str(NotAuthenticated.default_detail)}, status=401
+            )
+            response["WWW-Authenticate"] = "Token"
+            return response
+        try:
+            return await view(request, user, *args, **kwargs)
+        except ValidationError as exc:
+            return json_response(exc.detail, status=400)
+        except NotFound as exc:
+            return json_response({"detail": str(exc.detail)}, status=404)
+        except InvalidCursor:
+            return json_response({"detail": "Неверный курсор"}, status=404)
+
+    return wrapper
+
+
+async def versioned_response(request, user, build, next_change=None):
+    """ETag по версии данных пользователя (см. cache.py).
+
+    Если ETag клиента совпал, а в запросе есть ?wait=N, ответ ждёт до N
+    секунд, пока версия не сменится, и только потом отдаёт 304.
+
+    next_change - для ответов, которые меняются со временем без записи в
+    базу: корутина, возвращающая ближайший такой момент (или None). Он
+    входит в ETag, и ожидание заканчивается, когда он наступит.
+    """
+    try:
+        wait = int(request.GET.get("wait", 0))
+    except ValueError:
+        raise ValidationError({"wait": "Ожидается число секунд"})
+    # ETag не зависит от ?wait=, чтобы клиент мог менять время ожидания
+    path = remove_query_param(request.get_full_path(), "wait")
+    version = await aget_user_version(user.pk)
+    changes_at = next_change and await next_change()
+    if version_etag(version, path, changes_at) in parse_etags(
+        request.headers.get("If-None-Match", "")
+    ):
+        timeout = min(max(wait, 0), settings.ASYNC_LONG_POLL_MAX_WAIT)
+        if changes_at is not None:
+            timeout = min(timeout, (changes_at - timezone.now()).total_seconds())
+        new_version = await wait_for_new_version(user.pk, version, timeout)
+        if new_version is None and (changes_at is None or timezone.now() <= changes_at):
+            response = HttpResponseNotModified()
+            response["ETag"] = version_etag(version, path, changes_at)
+            return response
+        version = new_version or version
+        changes_at = next_change and await next_change()
+
+    data = await cached_data(
+        request, user, version_state(version, changes_at), path, build
+    )
+    response = json_response(data)
+    response["ETag"] = version_etag(version, path, changes_at)
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+async def wait_for_new_version(user_id, version, timeout):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        await asyncio.sleep(
+            min(settings.ASYNC_LONG_POLL_INTERVAL, deadline - loop.time())
+        )
+        current = await cache.aget(user_version_key(user_id))
+        if current != version:
+            return current or await aget_user_version(user_id)
+    return None
+
+
+async def cached_data(request, user, version, path, build):
+    # Как cache_user_response: новая версия пользователя меняет ключ
+    timeout = settings.TASK_RESPONSE_CACHE_TIMEOUT
+    if not timeout:
+        return await build()
+    digest = hashlib.md5(
+        f"{request.get_host()}{path}".encode(), usedforsecurity=False
+    ).hexdigest()
+    key = f"tasks:async:{user.pk}:{version}:{digest}"
+    data = await cache.aget(key)
+    if data is None:
+        data = await build()
+        await cache.aset(key, data, timeout)
+    return data
+
+
+def version_state(version, changes_at):
+    if changes_at is None:
+        return version
+    return f"{version}:{changes_at.isoformat()}"
+
+
+def version_etag(version, path, changes_at=None):
+    state = version_state(version, changes_at)
+    digest = hashlib.md5(f"{state}:{path}".encode(), usedforsecurity=False)
+    return quote_etag(digest.hexdigest())
+
+
+async def cursor_page(request, queryset):
+    rows = TaskRowSerializer(TaskSerializer())
+    items, next_cursor, previous_cursor = await task_keyset.apaginate(
+        rows.values(queryset),
+        request.GET.get("cursor"),
+        settings.REST_FRAMEWORK["PAGE_SIZE"],
+    )
+    return {
+        "next": cursor_link(request, next_cursor),
+        "previous": cursor_link(request, previous_cursor),
+        "results": await rows.ato_representation(items),
+    }
+
+
+def cursor_link(request, cursor):
+    if cursor is None:
+        return None
+    return replace_query_param(request.build_absolute_uri(), "cursor", cursor)
+
+
+@async_api_view
+async def task_list(request, user):
+    # Фильтры TaskFilter только строят запрос, к базе они не обращаются
+    filterset = TaskFilter(request.GET, queryset=Task.objects.filter(users=user))
+    if not filterset.is_valid():
+        raise ValidationError(filterset.errors)
+    queryset = filterset.qs
+    return await versioned_response(
+        request, user, lambda: cursor_page(request, queryset)
+    )
+
+
+@async_api_view
+async def task_overdue(request, user):
+    open_tasks = Task.objects.filter(users=user, status__in=["pending", "in_progress"])
+
+    async def next_change():
+        # Список меняется и без записи: когда истекает ближайший срок.
+        # Момент берётся до выборки, так что ETag не опережает данные
+        stats = await open_tasks.filter(due_date__gte=timezone.now()).aaggregate(
+            next_due=Min("due_date")
+        )
+        return stats["next_due"]
+
+    return await versioned_response(
+        request,
+        user,
+        lambda: cursor_page(request, open_tasks.filter(due_date__lt=timezone.now())),
+        next_change,
+    )
+
+
+@async_api_view
+async def task_detail(request, user, pk):
+    rows = TaskRowSerializer(TaskSerializer())
+
+    async def build():
+        row = await rows.values(Task.objects.filter(users=user, pk=pk)).afirst()
+        if row is None:
+            raise NotFound
+        return (await rows.ato_representation([row]))[0]
+
+    return await versioned_response(request, user, build)
+
+
+@async_api_view
+async def task_events(request, user):
+    """Поток Server-Sent Events об изменениях задач пользователя.
+
+    Клиент, переподключаясь, передаёт id последнего события в заголовке
+    Last-Event-ID (EventSource делает это сам) или в ?last_event_id=.
+    Если продолжить с него нельзя, первым приходит событие reset.
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get(
+        "last_event_id"
+    )
+    response = StreamingHttpResponse(
+        event_stream(user.pk, last_event_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # nginx иначе копит поток в буфере
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def event_stream(user_id, last_event_id):
+    broker = get_broker()
+    yield f"retry: {settings.TASK_EVENTS_RETRY_MS}\n\n"
+    while True:
+        events, reset, last_event_id = await broker.read(user_id, last_event_id)
+        if reset:
+            yield sse_message(last_event_id, {"type": "reset"})
+        for event_id, event in events:
+            yield sse_message(event_id, event)
+        if events or reset:
+            continue
+        _, seq = parse_event_id(last_event_id)
+        if not await broker.wait(user_id, seq, settings.TASK_EVENTS_HEARTBEAT):
+            # Комментарий держит соединение открытым через прокси
+            yield ": ping\n\n"
+
+
+def sse_message(event_id, event):
+    data = json.dumps(event, cls=JSONEncoder, ensure_ascii=False)
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {data}\n\n"
@@ -0,0 +1,191 @@
+import hashlib
+import json
+from functools import wraps
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+# У каждого пользователя есть версия его данных. Записи задач меняют
+# версию (см. signals.py), и все ключи со старой версией перестают читаться,
+# поэтому перебирать и удалять их не нужно.
+
+
+def user_version_key(user_id):
+    return f"tasks:version:{user_id}"
+
+
+def get_user_version(user_id):
+    key = user_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_user_version(user_id):
+    key = user_version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, uuid4().hex, None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_user_versions(user_ids):
+    versions = {user_version_key(user_id): uuid4().hex for user_id in set(user_ids)}
+    if versions:
+        cache.set_many(versions, None)
+
+
+def user_cache_key(user_id, name):
+    return f"tasks:{name}:{user_id}:{get_user_version(user_id)}"
+
+
+def response_cache_key(request, name):
+    # Порядок параметров и повторяющиеся значения не создают лишних ключей
+    params = sorted(
+        (key, sorted(values)) for key, values in request.query_params.lists()
+    )
+    digest = hashlib.md5(
+        json.dumps([request.get_host(), params]).encode(), usedforsecurity=False
+    ).hexdigest()
+    return user_cache_key(request.user.pk, f"response:{name}:{digest}")
+
+
+def content_etag(data):
+    payload = json.dumps(data, cls=JSONEncoder, separators=(",", ":"))
+    return quote_etag(hashlib.md5(payload.encode(), usedforsecurity=False).hexdigest())
+
+
+def cache_user_response(name):
+    """Кэширует данные ответа действия ViewSet для пользователя и параметров
+    запроса вместе с его валидаторами и отвечает 304 прямо из кэша.
+
+    Запись в задачах пользователя меняет его версию в ключе, а
+    TASK_RESPONSE_CACHE_TIMEOUT ограничивает устаревание ответов,
+    зависящих от текущего времени (просроченные задачи).
+    """
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            timeout = settings.TASK_RESPONSE_CACHE_TIMEOUT
+            if not timeout:
+                return method(self, request, *args, **kwargs)
+
+            key = response_cache_key(request, name)
+            entry = cache.get(key)
+            if entry is None:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                entry = {
+                    "etag": response.get("ETag") or content_etag(response.data),
+                    "last_modified": response.get("Last-Modified"),
+                    "data": response.data,
+                }
+                cache.set(key, entry, timeout)
+
+            response = Response(entry["data"])
+            response["ETag"] = entry["etag"]
+            if entry["last_modified"]:
+                response["Last-Modified"] = entry["last_modified"]
+            return not_modified_or(request, response)
+
+        return wrapper
+
+    return decorator
+
+
+def not_modified_or(request, response):
+    """Ответ 304 вместо response, если валидаторы клиента совпали."""
+    # Ответ свой у каждого пользователя и проверяется при каждом запросе
+    response["Cache-Control"] = "private, no-cache"
+    return get_conditional_response(
+        request,
+        etag=response.get("ETag"),
+        last_modified=parse_http_date_safe(response.get("Last-Modified")),
+        response=response,
+    )
+
+
+class ConditionalGetMixin:
+    """ETag для списков и объектов ViewSet по одному запросу
+    MAX(last_modified_field) и COUNT(*) и версии пользователя: если
+    валидаторы клиента совпали, ответ 304 отдаётся без сериализации.
+
+    Версия нужна для изменений, которые не трогают строки queryset, но
+    меняют ответ: переименования владельца или категории (signals.py).
+
+    Last-Modified отдаётся только для объекта: удаление задачи из списка
+    или владельца из задачи не меняет MAX(), и клиент, проверяющий список
+    по If-Modified-Since, получил бы 304 вместо нового списка.
+    """
+
+    last_modified_field = None
+
+    def conditional(self, request, queryset, build, single=False):
+        stats = queryset.order_by().aggregate(
+            last_modified=Max(self.last_modified_field), count=Count("pk")
+        )
+        if not stats["count"]:
+            return build()
+
+        last_modified = stats["last_modified"]
+        # Адрес с параметрами в ETag: у каждой страницы и фильтра своя версия
+        etag = quote_etag(
+            hashlib.md5(
+                f"{request.user.pk}:{request.get_full_path()}:{stats['count']}:"
+                f"{last_modified.isoformat()}:{get_user_version(request.user.pk)}".encode(),
+                usedforsecurity=False,
+            ).hexdigest()
+        )
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if single:
+            headers["Last-Modified"] = http_date(last_modified.timestamp())
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if single else None,
+        )
+        if response is None:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            request,
+            self.filter_queryset(self.get_queryset()),
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        # Как get_object_or_404 в DRF: неверный id - 404, а не ошибка сервера
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: kwargs[lookup]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        return self.conditional(
+            request,
+            queryset,
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+            single=True,
+        )
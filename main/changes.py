@@ -0,0 +1,38 @@
+from collections import defaultdict
+
+from .cache import bump_user_versions
+from .events import publish_task_events
+from .models import TaskCounter, TaskTombstone
+from .search import index_tasks
+
+# Побочные эффекты изменения задач в одном месте: их вызывают и сигналы
+# (main/signals.py), и массовые операции, которые сигналов не порождают
+# (сериализатор списка, импорт, TaskQuerySet.complete).
+
+
+def tasks_changed(before, after, change_types=None, reindex=()):
+    """Версии кэша владельцев, надгробия, события, поисковый индекс и
+    счётчики сводки после изменения задач. История пишется отдельно.
+
+    before и after - {(id задачи, id пользователя): TaskState или None} до и
+    после изменения; None - состояние не нужно, у владельца нет счётчиков.
+    Пара только в before - задача у пользователя исчезла, только в after -
+    появилась. Оставшимся владельцам приходит событие change_types[id
+    задачи], если оно задано. reindex - задачи, у которых изменился текст.
+    """
+    removed = before.keys() - after.keys()
+    added = after.keys() - before.keys()
+    kept = defaultdict(list)
+    for pair in before.keys() & after.keys():
+        change_type = (change_types or {}).get(pair[0])
+        if change_type:
+            kept[change_type].append(pair)
+
+    bump_user_versions(user_id for _, user_id in before.keys() | after.keys())
+    TaskTombstone.record(removed)
+    publish_task_events("task.deleted", removed)
+    publish_task_events("task.created", added)
+    for change_type, pairs in kept.items():
+        publish_task_events(change_type, pairs)
+    index_tasks(reindex)
+    TaskCounter.apply_changes(before, after)
@@ -0,0 +1,71 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register, run_checks
+from django.core.exceptions import ImproperlyConfigured
+
+from .events import get_broker
+
+# Кэши, содержимое которых видно только своему процессу
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def worker_count():
+    """Число процессов uvicorn из UVICORN_WORKERS или WEB_CONCURRENCY.
+
+    uvicorn читает --workers из этих же переменных, но сам флаг командной
+    строки (uvicorn --workers 4) приложению не виден: процессов больше
+    одного задают только переменной, как в Dockerfile.
+    """
+    return int(
+        os.environ.get("UVICORN_WORKERS") or os.environ.get("WEB_CONCURRENCY") or 1
+    )
+
+
+@register(Tags.caches)
+def check_shared_state(app_configs=None, **kwargs):
+    """Версии данных пользователей, кэш ответов и события должны быть общими
+    у всех процессов сервера, иначе клиенты получают устаревшие ответы,
+    неверные 304 и теряют события."""
+    errors = []
+    # Брокер событий проверяет кэш при создании: ошибка видна при запуске,
+    # а не в первом publish() после фиксации транзакции
+    try:
+        get_broker()
+    except ImproperlyConfigured as exc:
+        errors.append(Error(str(exc), id="main.E001"))
+
+    workers = worker_count()
+    if workers <= 1:
+        return errors
+    if settings.CACHES["default"]["BACKEND"] in PROCESS_LOCAL_CACHES:
+        errors.append(
+            Error(
+                f"Процессов сервера: {workers}, а кэш у каждого свой.",
+                hint="Задайте общий кэш (REDIS_URL, DJANGO_CACHE_DIR) или "
+                "запустите один процесс.",
+                id="main.E002",
+            )
+        )
+    if settings.TASK_EVENTS_BACKEND == "main.events.InProcessBroker":
+        errors.append(
+            Error(
+                f"Процессов сервера: {workers}, а InProcessBroker хранит события "
+                "в памяти процесса.",
+                hint="Задайте TASK_EVENTS_BACKEND=main.events.CacheBroker с кэшем "
+                "Redis или Memcached или запустите один процесс.",
+                id="main.E003",
+            )
+        )
+    return errors
+
+
+def raise_for_shared_state():
+    """Проверки кэшей при запуске ASGI-сервера: uvicorn, в отличие от
+    manage.py, системные проверки Django сам не запускает."""
+    errors = [error for error in run_checks(tags=[Tags.caches]) if error.is_serious()]
+    if errors:
+        raise ImproperlyConfigured("\n".join(str(error) for error in errors))
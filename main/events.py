@@ -0,0 +1,273 @@
+import asyncio
+import secrets
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from functools import lru_cache
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# События об изменениях задач для потока /api/async/events/. Тип события
+# описывает изменение с точки зрения получателя: task.created - задача
+# появилась у пользователя (создана или он добавлен во владельцы),
+# task.deleted - исчезла (удалена или он убран из владельцев).
+#
+# У каждого пользователя своя нумерация событий. id события -
+# "<поколение>-<номер>"; поколение меняется, когда буфер брокера начат
+# заново (перезапуск процесса, очистка кэша), и тогда продолжить поток с
+# прежнего id нельзя - клиент получает событие reset и загружает данные
+# заново.
+
+# Кэши, в которых incr атомарен: у остальных (файловый, база) он читает и
+# записывает значение отдельно, и параллельные publish() выдают одинаковые
+# номера. LocMemCache атомарен только в пределах процесса.
+ATOMIC_INCR_CACHES = {
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+}
+
+# CacheBroker хранит поколение и номер последнего события одним числом:
+# поколение в старших битах, номер в младших. incr двигает номер, не трогая
+# поколение, а вытесненный ключ add() заводит заново уже с новым поколением.
+SEQ_BITS = 32
+
+
+class EventBroker(ABC):
+    """Буфер последних TASK_EVENTS_BUFFER событий каждого пользователя.
+
+    publish() вызывается из обычного (синхронного) кода, read() и wait() -
+    из асинхронного представления.
+    """
+
+    def __init__(self):
+        self.buffer_size = settings.TASK_EVENTS_BUFFER
+
+    @abstractmethod
+    def publish(self, messages):
+        """messages - пары (id пользователя, событие)."""
+
+    @abstractmethod
+    async def position(self, user_id):
+        """(поколение, номер последнего события пользователя)."""
+
+    @abstractmethod
+    async def events(self, user_id, generation, first, last):
+        """События с номерами first..last или None, если часть вытеснена."""
+
+    @abstractmethod
+    async def wait(self, user_id, seq, timeout):
+        """Ждёт события с номером больше seq не дольше timeout секунд.
+
+        Возвращает False, если за это время событий не было.
+        """
+
+    async def read(self, user_id, last_event_id):
+        """Возвращает (события после last_event_id, нужен ли reset, текущий id).
+
+        Без last_event_id поток начинается с текущего момента.
+        """
+        generation, seq = await self.position(user_id)
+        current = format_event_id(generation, seq)
+        if not last_event_id:
+            return [], False, current
+        last_generation, last_seq = parse_event_id(last_event_id)
+        if last_generation != generation or last_seq > seq:
+            return [], True, current
+        if last_seq == seq:
+            return [], False, current
+        if seq - last_seq > self.buffer_size:
+            return [], True, current
+        events = await self.events(user_id, generation, last_seq + 1, seq)
+        if events is None:
+            return [], True, current
+        return (
+            [
+                (format_event_id(generation, number), event)
+                for number, event in enumerate(events, last_seq + 1)
+            ],
+            False,
+            current,
+        )
+
+
+class InProcessBroker(EventBroker):
+    """Буфер в памяти процесса. Подходит, когда сервер запущен одним
+    процессом: события из других процессов сюда не попадут."""
+
+    def __init__(self):
+        super().__init__()
+        self.generation = uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._seq = defaultdict(int)
+        self._buffers = defaultdict(lambda: deque(maxlen=self.buffer_size))
+        self._waiters = defaultdict(set)
+
+    def publish(self, messages):
+        waiters = []
+        with self._lock:
+            for user_id, event in messages:
+                self._seq[user_id] += 1
+                self._buffers[user_id].append((self._seq[user_id], event))
+                waiters.extend(self._waiters[user_id])
+        # Сигналы приходят из потоков синхронного кода, а ждут события
+        # корутины в цикле событий ASGI-сервера
+        for loop, ready in waiters:
+            loop.call_soon_threadsafe(ready.set)
+
+    async def position(self, user_id):
+        with self._lock:
+            return self.generation, self._seq.get(user_id, 0)
+
+    async def events(self, user_id, generation, first, last):
+        with self._lock:
+            buffered = list(self._buffers.get(user_id, ()))
+        if not buffered or buffered[0][0] > first:
+            return None
+        return [event for number, event in buffered if first <= number <= last]
+
+    async def wait(self, user_id, seq, timeout):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self._seq.get(user_id, 0) > seq:
+                return True
+            self._waiters[user_id].add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._waiters[user_id].discard(waiter)
+
+
+class CacheBroker(EventBroker):
+    """Буфер в кэше Django: для нескольких процессов с общим кэшем (Redis,
+    Memcached), в котором incr атомарен. Новые события ожидающие потоки
+    находят, проверяя номер раз в TASK_EVENTS_POLL_INTERVAL секунд."""
+
+    def __init__(self):
+        super().__init__()
+        backend = settings.CACHES["default"]["BACKEND"]
+        if backend not in ATOMIC_INCR_CACHES:
+            raise ImproperlyConfigured(
+                f"CacheBroker нумерует события через cache.incr, а в {backend} "
+                "он не атомарен. Задайте кэш Redis или Memcached (REDIS_URL)."
+            )
+
+    def publish(self, messages):
+        by_user = defaultdict(list)
+        for user_id, event in messages:
+            by_user[user_id].append(event)
+        entries = {}
+        for user_id, events in by_user.items():
+            generation, last = split_position(self.advance(user_id, len(events)))
+            for number, event in enumerate(events, last - len(events) + 1):
+                entries[event_key(user_id, generation, number)] = event
+        cache.set_many(entries, settings.TASK_EVENTS_TTL)
+
+    def advance(self, user_id, count):
+        key = position_key(user_id)
+        while True:
+            cache.add(key, new_position(), None)
+            try:
+                return cache.incr(key, count)
+            except ValueError:
+                # Ключ вытеснен между add() и incr()
+                continue
+
+    async def position(self, user_id):
+        key = position_key(user_id)
+        while (position := await cache.aget(key)) is None:
+            await cache.aadd(key, new_position(), None)
+        return split_position(position)
+
+    async def events(self, user_id, generation, first, last):
+        keys = [
+            event_key(user_id, generation, number) for number in range(first, last + 1)
+        ]
+        found = await cache.aget_many(keys)
+        if len(found) != len(keys):
+            return None
+        return [found[key] for key in keys]
+
+    async def wait(self, user_id, seq, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        key = position_key(user_id)
+        start = await cache.aget(key)
+        if start is None or split_position(start)[1] > seq:
+            return True
+        while loop.time() < deadline:
+            await asyncio.sleep(
+                min(settings.TASK_EVENTS_POLL_INTERVAL, deadline - loop.time())
+            )
+            # Новые события или новое поколение: read() разберётся, что именно
+            if await cache.aget(key) != start:
+                return True
+        return False
+
+
+def position_key(user_id):
+    return f"events:position:{user_id}"
+
+
+def event_key(user_id, generation, number):
+    return f"events:{user_id}:{generation}:{number}"
+
+
+def new_position():
+    return secrets.randbits(30) << SEQ_BITS
+
+
+def split_position(position):
+    """(поколение, номер) из числа, которое хранит CacheBroker."""
+    return f"{position >> SEQ_BITS:08x}", position & ((1 << SEQ_BITS) - 1)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.TASK_EVENTS_BACKEND)()
+
+
+def format_event_id(generation, seq):
+    return f"{generation}-{seq}"
+
+
+def parse_event_id(event_id):
+    generation, _, seq = event_id.rpartition("-")
+    try:
+        return generation, int(seq)
+    except ValueError:
+        return None, -1
+
+
+def publish(messages):
+    """Отправляет события после фиксации транзакции: откаченные изменения
+    до клиентов не доходят."""
+    messages = list(messages)
+    if messages:
+        transaction.on_commit(lambda: get_broker().publish(messages))
+
+
+def publish_task_events(event_type, owners, **data):
+    """owners - пары (id задачи, id пользователя), как в Task.users.through."""
+    publish(
+        (user_id, {"type": event_type, "task": task_id, **data})
+        for task_id, user_id in owners
+    )
+
+
+def task_change_type(task):
+    # Снимок полей на момент загрузки хранит HistorySnapshotMixin
+    previous = getattr(task, "_history_snapshot", {}).get("status")
+    if task.status == "completed" and previous != "completed":
+        return "task.completed"
+    return "task.updated"
@@ -0,0 +1,165 @@
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib import admin
+from django.db.models import Q
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+
+from .exports import export_queryset, iter_csv, write_xlsx
+from .models import ExportJob, Task
+from .pagination import approximate_count
+
+
+class JobLost(Exception):
+    """Задание, сочтённое брошенным, взял другой обработчик."""
+
+
+def job_path(job, suffix=""):
+    directory = Path(settings.EXPORT_JOBS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"tasks-export-{job.pk}.{job.file_format}{suffix}"
+
+
+def claim_next_job(stale_after):
+    """Берёт задание из очереди или брошенное упавшим обработчиком."""
+    stale = timezone.now() - timedelta(seconds=stale_after)
+    candidates = ExportJob.objects.filter(
+        Q(status="pending") | Q(status="running", updated_at__lt=stale)
+    ).order_by("created_at")
+    for job in candidates[:10]:
+        # Условный UPDATE: из нескольких обработчиков задание получит один.
+        claimed = ExportJob.objects.filter(
+            pk=job.pk, status=job.status, updated_at=job.updated_at
+        ).update(status="running", claim=uuid4().hex, updated_at=timezone.now())
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def save_job(job, *fields):
+    """Сохраняет поля задания, если им по-прежнему владеет этот обработчик.
+
+    Задание, которое долго не сохранялось, claim_next_job отдаёт другому
+    обработчику с новой меткой claim; прежний узнаёт об этом здесь и
+    прекращает работу (JobLost), не трогая файл.
+    """
+    job.updated_at = timezone.now()
+    values = {field: getattr(job, field) for field in (*fields, "updated_at")}
+    if not ExportJob.objects.filter(pk=job.pk, claim=job.claim).update(**values):
+        raise JobLost(job)
+
+
+def changelist_request(job):
+    """GET-запрос списка задач в админке с фильтрами задания: ChangeList
+    берёт из запроса только параметры и пользователя."""
+    request = HttpRequest()
+    request.method = "GET"
+    request.GET = QueryDict(job.query_string)
+    request.user = job.created_by
+    return request
+
+
+def job_queryset(model_admin, resource, job):
+    # Фильтры восстанавливаются тем же ChangeList, что и у обычной выгрузки.
+    queryset = model_admin.get_export_queryset(changelist_request(job))
+    return resource.filter_export(export_queryset(queryset))
+
+
+def run_job(job, chunk_size, on_chunk=None):
+    """Выгружает задачи пачками по возрастанию pk.
+
+    После каждой пачки файл сбрасывается на диск, а в задании сохраняются
+    последний pk и длина записанной части, так что после падения обработчика
+    выгрузка продолжается с этой пачки, а не с начала.
+    """
+    model_admin = admin.site.get_model_admin(Task)
+    resource = model_admin.resource_class()
+    queryset = job_queryset(model_admin, resource, job)
+    if job.total_rows is None:
+        job.total_rows = approximate_count(queryset)
+        save_job(job, "total_rows")
+
+    part = job_path(job, ".part")
+    part.touch()
+    if part.stat().st_size < job.file_size:
+        # Подтверждённой части нет (файл удалён или потерян): с начала
+        job.last_pk = job.processed_rows = job.file_size = 0
+        save_job(job, "last_pk", "processed_rows", "file_size")
+
+    # Запись идёт с подтверждённого смещения, а не в конец файла
+    with open(part, "r+b") as file:
+        # Хвост после последней подтверждённой пачки мог остаться от сбоя.
+        file.truncate(job.file_size)
+        file.seek(job.file_size)
+        if job.file_size == 0:
+            file.write(json_line(resource.get_export_headers()))
+
+        while True:
+            tasks = list(queryset.filter(pk__gt=job.last_pk)[:chunk_size])
+            if not tasks:
+                break
+            # Выборка могла идти долго: задание за это время могли забрать
+            save_job(job)
+            file.write(
+                b"".join(json_line(resource.export_resource(task)) for task in tasks)
+            )
+            file.flush()
+            os.fsync(file.fileno())
+
+            job.last_pk = tasks[-1].pk
+            job.processed_rows += len(tasks)
+            job.file_size = file.tell()
+            save_job(job, "last_pk", "processed_rows", "file_size")
+            if on_chunk:
+                on_chunk(job)
+        # Дальше могут быть только байты обработчика, у которого забрали задание
+        file.truncate()
+
+    target = job_path(job)
+    with open(part, encoding="utf-8") as source:
+        rows = (json.loads(line) for line in source)
+        if job.file_format == "xlsx":
+            write_xlsx(rows, target)
+        else:
+            with open(target, "w", encoding="utf-8", newline="") as file:
+                file.writelines(iter_csv(rows))
+
+    # Часть удаляется только после отметки о готовности: иначе сбой между
+    # ними оставил бы задание без файла, с которого можно продолжить
+    job.status = "done"
+    job.file_name = target.name
+    job.finished_at = timezone.now()
+    save_job(job, "status", "file_name", "finished_at")
+    part.unlink(missing_ok=True)
+    return job
+
+
+def fail_job(job, error):
+    # Записанная часть остаётся: повторный запуск продолжит с last_pk.
+    job.status = "failed"
+    job.error = str(error)
+    job.finished_at = timezone.now()
+    try:
+        save_job(job, "status", "error", "finished_at")
+    except JobLost:
+        # Задание уже выполняет другой обработчик
+        pass
+
+
+def retry_job(job):
+    job.status = "pending"
+    job.error = ""
+    job.finished_at = None
+    job.save(update_fields=["status", "error", "finished_at", "updated_at"])
+
+
+def json_line(row):
+    # Строки пачки хранятся в JSON Lines: числа и пустые значения доходят
+    # до XLSX с теми же типами, что и при обычной выгрузке.
+    return (json.dumps(row, ensure_ascii=False, default=str) + "\n").encode("utf-8")
@@ -0,0 +1,93 @@
+import re
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import django_filters
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+from .models import Task
+from .search import search
+
+ISO_WEEK_RE = re.compile(r"^(\d{4})-W(\d{2})$")
+
+
+def parse_day_range(value):
+    """'2026-01-16', '2026-01-16..2026-01-20' или ISO-неделя '2026-W03'.
+
+    Возвращает полуинтервал дней [first, next_after_last).
+    """
+    week = ISO_WEEK_RE.match(value)
+    if week:
+        first = date.fromisocalendar(int(week[1]), int(week[2]), 1)
+        return first, first + timedelta(days=7)
+
+    start, _, end = value.partition("..")
+    first = parse_date(start)
+    last = parse_date(end) if end else first
+    if first is None or last is None or last < first:
+        raise ValueError(value)
+    return first, last + timedelta(days=1)
+
+
+def day_range_bounds(value, tz):
+    first, after_last = parse_day_range(value)
+    return (
+        timezone.make_aware(datetime.combine(first, time.min), tz),
+        timezone.make_aware(datetime.combine(after_last, time.min), tz),
+    )
+
+
+class TaskFilter(django_filters.FilterSet):
+    # Диапазон вместо due_date__date: условие due_date >= a AND due_date < b
+    # не оборачивает колонку в приведение к дате и идёт по индексу.
+    due_date = django_filters.CharFilter(method="filter_due_date")
+
+    class Meta:
+        model = Task
+        fields = {
+            "status": ["exact"],
+            "priority": ["exact", "gte", "lte"],
+            "due_date": ["gte", "lte"],
+        }
+
+    def filter_due_date(self, queryset, name, value):
+        try:
+            start, end = day_range_bounds(value, self.get_timezone())
+        except ValueError:
+            raise ValidationError(
+                {
+                    "due_date": "Ожидается дата ГГГГ-ММ-ДД, диапазон "
+                    "ГГГГ-ММ-ДД..ГГГГ-ММ-ДД или неделя ГГГГ-Wнн"
+                }
+            )
+        return queryset.filter(**{f"{name}__gte": start, f"{name}__lt": end})
+
+    def get_timezone(self):
+        name = self.data.get("tz")
+        if not name:
+            return timezone.get_current_timezone()
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValidationError({"tz": f"Неизвестный часовой пояс: {name}"})
+
+
+class FullTextSearchFilter(SearchFilter):
+    """?search= по полнотекстовому индексу (main/search.py): слова ищутся
+    по началу, результаты - от более релевантных, если не задан ?ordering=.
+    Без индекса - обычный поиск SearchFilter по search_fields."""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        # С ?ordering= порядок уже задал OrderingFilter
+        order = not request.query_params.get(api_settings.ORDERING_PARAM)
+        found = search(queryset, terms, order)
+        if found is None:
+            return super().filter_queryset(request, queryset, view)
+        return found
@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import User
 
+from .imports import file_format_from_name
 from .models import Task
 
 
@@ -58,6 +59,23 @@ class TaskForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if self.instance and self.instance.due_date:
-            self.initial["due_date"] = self.instance.due_date.strftime("%Y-%m-%dT%H:%M")
+            # Поле ввода хранит минуты; начальное значение - datetime той же
+            # точности, чтобы changed_data не считал неизменённый срок новым.
+            self.initial["due_date"] = self.instance.due_date.replace(
+                second=0, microsecond=0
+            )
         if self.instance.pk:
             self.initial["users"] = self.instance.users.all()
+
+
+class TaskImportForm(forms.Form):
+    file = forms.FileField(label="Файл CSV или XLSX")
+    dry_run = forms.BooleanField(
+        label="Только проверить, ничего не создавая", required=False
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        if file_format_from_name(file.name) is None:
+            raise forms.ValidationError("Поддерживаются только файлы .csv и .xlsx")
+        return file
@@ -0,0 +1,256 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import groupby
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+from simple_history.models import HistoricalRecords
+from simple_history.utils import get_history_model_for_model
+
+HISTORY_CHUNK_SIZE = 5000
+
+_pending_history = ContextVar("pending_history", default=None)
+
+
+class HistorySnapshotMixin:
+    """Запоминает отслеживаемые поля загруженного из базы объекта, чтобы
+    ChangedOnlyHistoricalRecords мог отличить save() без изменений."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._history_snapshot = field_values(instance)
+        return instance
+
+
+def field_values(instance):
+    # Отложенные поля в снимок не попадают
+    return {
+        attname: instance.__dict__[attname]
+        for attname in tracked_fields(type(instance))
+        if attname in instance.__dict__
+    }
+
+
+def changed_fields(instance):
+    """attname полей, изменённых с момента загрузки (без снимка - все)."""
+    values = field_values(instance)
+    snapshot = getattr(instance, "_history_snapshot", None)
+    if snapshot is None:
+        return set(values)
+    return {
+        attname
+        for attname, value in values.items()
+        if attname not in snapshot or snapshot[attname] != value
+    }
+
+
+def has_tracked_changes(instance):
+    if getattr(instance, "_history_snapshot", None) is None:
+        return True
+    return bool(changed_fields(instance))
+
+
+class ChangedOnlyHistoricalRecords(HistoricalRecords):
+    """История без пустых версий и с пакетной записью в history_batch().
+
+    Сохранение объекта, у которого отслеживаемые поля (кроме auto_now) не
+    изменились с момента загрузки, версию не создаёт. Объекты, созданные не
+    из запроса к базе, сравнивать не с чем - для них версия пишется всегда.
+    """
+
+    def post_save(self, instance, created, using=None, **kwargs):
+        if created or has_tracked_changes(instance):
+            super().post_save(instance, created, using=using, **kwargs)
+        instance._history_snapshot = field_values(instance)
+
+    def create_historical_record(self, instance, history_type, using=None):
+        pending = _pending_history.get()
+        if pending is None:
+            return super().create_historical_record(instance, history_type, using)
+
+        # То же, что делает HistoricalRecords, но без save() и без сигналов
+        # pre/post_create_historical_record: строка ждёт bulk_create.
+        history_model = getattr(instance, self.manager_name).model
+        pending[history_model].append(
+            history_model(
+                history_date=getattr(instance, "_history_date", timezone.now()),
+                history_type=history_type,
+                history_user=self.get_history_user(instance),
+                history_change_reason=self.get_change_reason_for_object(
+                    instance, history_type, using
+                ),
+                **{
+                    field.attname: getattr(instance, field.attname)
+                    for field in self.fields_included(instance)
+                },
+            )
+        )
+
+
+@contextmanager
+def history_batch(batch_size=1000):
+    """Версии, созданные внутри блока, пишутся одним bulk_create на модель
+    в конце блока, в той же транзакции, что и сами изменения."""
+    if _pending_history.get() is not None:
+        # Вложенный блок пишет в общий пакет внешнего
+        yield
+        return
+    pending = defaultdict(list)
+    token = _pending_history.set(pending)
+    try:
+        with transaction.atomic():
+            yield
+            for history_model, rows in pending.items():
+                history_model.objects.bulk_create(rows, batch_size=batch_size)
+    finally:
+        _pending_history.reset(token)
+
+
+@dataclass
+class RetentionPolicy:
+    """Версии старше days удаляются, кроме последних keep_versions версий
+    каждого объекта. Без days ограничивается только число версий."""
+
+    model: type
+    days: int = None
+    keep_versions: int = None
+
+    @property
+    def history_model(self):
+        return get_history_model_for_model(self.model)
+
+    def expired(self, now=None):
+        history = self.history_model
+        condition = Q()
+        if self.days is not None:
+            now = now or timezone.now()
+            condition &= Q(history_date__lt=now - timedelta(days=self.days))
+        if self.keep_versions is not None:
+            # history_id последней сохраняемой версии объекта; у объектов,
+            # где версий меньше keep_versions, подзапрос пуст и строки остаются.
+            offset = self.keep_versions - 1
+            oldest_kept = history.objects.filter(id=OuterRef("id")).order_by(
+                "-history_id"
+            )[offset:][:1]
+            condition &= Q(history_id__lt=Subquery(oldest_kept.values("history_id")))
+        return history.objects.filter(condition)
+
+
+def get_retention_policies(labels=None):
+    policies = []
+    for label, options in settings.HISTORY_RETENTION.items():
+        if labels and label not in labels:
+            continue
+        policy = RetentionPolicy(apps.get_model(label), **options)
+        if policy.days is None and policy.keep_versions is None:
+            raise ValueError(f"{label}: нужен days или keep_versions")
+        if policy.keep_versions is not None and policy.keep_versions < 1:
+            raise ValueError(f"{label}: keep_versions должно быть больше нуля")
+        policies.append(policy)
+    return policies
+
+
+def delete_in_chunks(queryset, chunk_size, archive=None, pause=0):
+    """Удаляет строки истории пачками по history_id.
+
+    Каждая пачка - отдельный короткий DELETE ... WHERE history_id IN (...),
+    так что таблица не блокируется на время всей чистки. Архив пишется до
+    удаления: после сбоя пачка выбирается заново и перезаписывает тот же файл.
+    """
+    model = queryset.model
+    deleted = 0
+    last_id = 0
+    while True:
+        chunk = queryset.filter(history_id__gt=last_id).order_by("history_id")
+        ids = list(chunk.values_list("history_id", flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        if archive is not None:
+            archive.write(
+                model, model.objects.filter(history_id__in=ids).order_by("history_id")
+            )
+        deleted += model.objects.filter(history_id__in=ids).delete()[0]
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+
+
+def tracked_fields(model):
+    # auto_now меняется при любом save() и не делает версию содержательной
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if not field.primary_key and not getattr(field, "auto_now", False)
+    ]
+
+
+def duplicate_versions(model, chunk_size=HISTORY_CHUNK_SIZE):
+    """history_id изменений "~", не отличающихся от предыдущей версии объекта."""
+    rows = (
+        get_history_model_for_model(model)
+        .objects.order_by("id", "history_id")
+        .values_list("id", "history_id", "history_type", *tracked_fields(model))
+        .iterator(chunk_size=chunk_size)
+    )
+    for _, versions in groupby(rows, key=lambda row: row[0]):
+        previous = None
+        for _, history_id, history_type, *values in versions:
+            if history_type == "~" and values == previous:
+                yield history_id
+            else:
+                previous = values
+
+
+class JsonLinesArchive:
+    extension = "jsonl"
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def write(self, history_model, queryset):
+        """Раскладывает строки по каталогам <модель>/<год-месяц>/, чтобы
+        архив можно было читать и удалять помесячно."""
+        rows = list(queryset.values())
+        months = groupby(rows, key=lambda row: f"{row['history_date']:%Y-%m}")
+        for month, month_rows in months:
+            month_rows = list(month_rows)
+            directory = self.directory / history_model._meta.label_lower / month
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"part-{month_rows[0]['history_id']}.{self.extension}"
+            self.dump(month_rows, path)
+
+    def dump(self, rows, path):
+        with open(path, "w", encoding="utf-8") as file:
+            for row in rows:
+                file.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+                file.write("\n")
+
+
+class ParquetArchive(JsonLinesArchive):
+    extension = "parquet"
+
+    def __init__(self, directory):
+        # pandas пишет parquet через pyarrow, которого нет в requirements.txt
+        import pyarrow  # noqa: F401
+
+        super().__init__(directory)
+
+    def dump(self, rows, path):
+        # Модуль импортируется из models.py, pandas нужен только здесь
+        import pandas as pd
+
+        pd.DataFrame(rows).to_parquet(path, index=False)
+
+
+ARCHIVES = {"jsonl": JsonLinesArchive, "parquet": ParquetArchive}
@@ -0,0 +1,279 @@
+import re
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+from simple_history.utils import bulk_create_with_history
+
+from .changes import tasks_changed
+from .models import Category, Task, TaskCounter
+
+IMPORT_CHUNK_SIZE = 5000
+
+# Заголовки выгрузки TaskResource и имена полей модели
+COLUMNS = {
+    "title": "title",
+    "description": "description",
+    "users": "users",
+    "Пользователи": "users",
+    "category": "category",
+    "category__title": "category",
+    "status": "status",
+    "Статус": "status",
+    "priority": "priority",
+    "due_date": "due_date",
+}
+REQUIRED_COLUMNS = {"title", "due_date"}
+
+STATUSES = {
+    **{code: code for code, _ in Task.STATUS_CHOICES},
+    **{label.lower(): code for code, label in Task.STATUS_CHOICES},
+    # подпись из выгрузки TaskResource.dehydrate_status
+    "завершено": "completed",
+}
+TITLE_MAX_LENGTH = Task._meta.get_field("title").max_length
+
+# Смещение после времени: такие даты не переводятся в текущий часовой пояс
+TZ_OFFSET_RE = r"\d:\d\d(?::\d\d(?:\.\d+)?)?\s*(?:Z|[+-]\d\d:?\d\d)$"
+# Форматы выгрузки (dehydrate_due_date) и ввода в админке после ISO 8601
+DATE_FORMATS = ("%d-%m-%Y %H:%M", "%d-%m-%Y", "%d.%m.%Y %H:%M", "%d.%m.%Y")
+
+
+@dataclass
+class ImportResult:
+    valid: int = 0
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, row, message):
+        self.errors.append((row, message))
+
+
+def read_chunks(file, file_format, chunk_size=IMPORT_CHUNK_SIZE):
+    """Строки файла пачками DataFrame со строковыми значениями.
+
+    Номера строк в индексе совпадают с номерами строк файла, чтобы в
+    сообщениях об ошибках можно было сослаться на них.
+    """
+    # pandas загружается только при импорте: модуль подключают админка и
+    # формы, и веб-процессам он больше ни для чего не нужен
+    import pandas as pd
+
+    if file_format == "csv":
+        chunks = pd.read_csv(
+            file,
+            dtype=str,
+            keep_default_na=False,
+            encoding="utf-8-sig",
+            chunksize=chunk_size,
+        )
+        for chunk in chunks:
+            chunk.index += 2
+            yield chunk
+        return
+
+    # read_excel читает лист целиком, read-only книга отдаёт строки потоком
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [str(value or "") for value in next(rows, ())]
+        first_row = 2
+        while batch := list(islice(rows, chunk_size)):
+            chunk = pd.DataFrame(
+                [
+                    ["" if value is None else str(value) for value in row]
+                    for row in batch
+                ],
+                columns=headers,
+                index=range(first_row, first_row + len(batch)),
+            )
+            first_row += len(batch)
+            yield chunk
+    finally:
+        workbook.close()
+
+
+class TaskImporter:
+    """Создаёт задачи из пачек строк: проверки по столбцам целиком, затем
+    bulk_create задач и одной вставкой владельцев в таблицу связи."""
+
+    def __init__(self, default_user=None, batch_size=1000, dry_run=False):
+        self.default_user = default_user
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.tz = timezone.get_current_timezone()
+        # Категорий немного: одна карта название -> id на весь импорт
+        self.categories = {
+            title.lower(): pk
+            for pk, title in Category.objects.values_list("id", "title")
+        }
+        self.result = ImportResult()
+
+    def run(self, chunks):
+        for chunk in chunks:
+            self.import_chunk(chunk)
+        return self.result
+
+    def import_chunk(self, chunk):
+        chunk = self.normalize(chunk)
+        if chunk is None:
+            return
+        rows, owners = self.validate(chunk)
+        self.result.valid += len(rows)
+        if not rows.empty and not self.dry_run:
+            self.insert(rows, owners)
+
+    def normalize(self, chunk):
+        chunk = chunk.rename(columns=COLUMNS)
+        missing = REQUIRED_COLUMNS - set(chunk.columns)
+        if missing:
+            self.result.add_error(1, f"Нет столбцов: {', '.join(sorted(missing))}")
+            return None
+        for column in set(COLUMNS.values()) - set(chunk.columns):
+            chunk[column] = ""
+        return chunk[list(dict.fromkeys(COLUMNS.values()))].apply(
+            lambda column: column.str.strip()
+        )
+
+    def validate(self, chunk):
+        import pandas as pd
+
+        errors = pd.Series("", index=chunk.index)
+
+        def fail(mask, message):
+            errors[mask & (errors == "")] = message
+
+        title = chunk["title"]
+        fail(title == "", "Пустое название")
+        fail(title.str.len() > TITLE_MAX_LENGTH, "Название длиннее 50 символов")
+
+        priority = pd.to_numeric(chunk["priority"].replace("", "2"), errors="coerce")
+        fail(
+            ~priority.isin([value for value, _ in Task.PRIORITY_CHOICES]),
+            "Приоритет должен быть от 1 до 4",
+        )
+
+        status = chunk["status"].str.lower().replace("", "pending").map(STATUSES)
+        fail(status.isna(), "Неизвестный статус")
+
+        due_date = self.parse_due_dates(chunk["due_date"])
+        fail(due_date.isna(), "Неверный срок выполнения")
+
+        category = chunk["category"].str.lower().map(self.categories)
+        fail((chunk["category"] != "") & category.isna(), "Неизвестная категория")
+
+        owners = self.owner_ids(chunk["users"])
+        fail(owners.isna(), "Неизвестный пользователь")
+        fail(owners.str.len() == 0, "Не указаны владельцы")
+
+        for row, message in errors[errors != ""].items():
+            self.result.add_error(row, message)
+
+        valid = errors == ""
+        rows = pd.DataFrame(
+            {
+                "title": title,
+                "description": chunk["description"],
+                "status": status,
+                "priority": priority,
+                "due_date": due_date,
+                "category_id": category,
+            }
+        )[valid]
+        return rows, owners[valid]
+
+    def parse_due_dates(self, values):
+        import pandas as pd
+
+        aware = values.str.contains(TZ_OFFSET_RE)
+        parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns, UTC]")
+        parsed[aware] = pd.to_datetime(
+            values[aware], format="ISO8601", utc=True, errors="coerce"
+        )
+
+        naive = values[~aware]
+        local = pd.to_datetime(naive, format="ISO8601", errors="coerce")
+        for date_format in DATE_FORMATS:
+            pending = local.isna() & (naive != "")
+            if not pending.any():
+                break
+            local[pending] = pd.to_datetime(
+                naive[pending], format=date_format, errors="coerce"
+            )
+        parsed[~aware] = local.dt.tz_localize(
+            self.tz, ambiguous="NaT", nonexistent="NaT"
+        ).dt.tz_convert("UTC")
+        return parsed
+
+    def owner_ids(self, values):
+        """Списки id владельцев; None, если кто-то из пользователей не найден."""
+        default = [self.default_user.username] if self.default_user else []
+        names = values.str.split(",").map(
+            lambda row: [name.strip() for name in row if name.strip()] or default
+        )
+        users = dict(
+            User.objects.filter(
+                username__in={name for row in names for name in row}
+            ).values_list("username", "id")
+        )
+        return names.map(
+            lambda row: (
+                [users[name] for name in row]
+                if all(name in users for name in row)
+                else None
+            )
+        )
+
+    def insert(self, rows, owners):
+        import pandas as pd
+
+        tasks = [
+            Task(
+                title=row.title,
+                description=row.description,
+                status=row.status,
+                priority=int(row.priority),
+                due_date=row.due_date.to_pydatetime(),
+                category_id=None if pd.isna(row.category_id) else int(row.category_id),
+            )
+            for row in rows.itertuples()
+        ]
+        Through = Task.users.through
+        with transaction.atomic():
+            tasks = bulk_create_with_history(
+                tasks,
+                Task,
+                batch_size=self.batch_size,
+                default_user=self.default_user,
+            )
+            links = {
+                (task.pk, user_id)
+                for task, user_ids in zip(tasks, owners)
+                for user_id in user_ids
+            }
+            Through.objects.bulk_create(
+                (
+                    Through(task_id=task_id, user_id=user_id)
+                    for task_id, user_id in links
+                ),
+                batch_size=self.batch_size,
+            )
+            states = {task.pk: TaskCounter.state(task) for task in tasks}
+            tasks_changed(
+                {},
+                {pair: states[pair[0]] for pair in links},
+                reindex=[task.pk for task in tasks],
+            )
+        self.result.created += len(tasks)
+
+
+def import_tasks(file, file_format, chunk_size=IMPORT_CHUNK_SIZE, **kwargs):
+    return TaskImporter(**kwargs).run(read_chunks(file, file_format, chunk_size))
+
+
+def file_format_from_name(name):
+    match = re.search(r"\.(csv|xlsx)$", name, re.IGNORECASE)
+    return match[1].lower() if match else None
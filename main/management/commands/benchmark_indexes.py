@@ -0,0 +1,159 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from main.models import Category, Task
+
+OPEN_STATUSES = ["pending", "in_progress"]
+
+
+def query_shapes(user, now, using=DEFAULT_DB_ALIAS):
+    """Запросы, которые выполняет приложение, и индексы, любой из которых
+    должен оказаться в плане."""
+    tasks = Task.objects.using(using)
+    return [
+        (
+            "overdue_tasks (команда)",
+            Task.users.through.objects.using(using)
+            .filter(task__due_date__lt=now, task__status__in=OPEN_STATUSES)
+            .order_by("user_id", "task__due_date", "task_id"),
+            # Команда читает всех владельцев подряд: когда просроченных
+            # много (или нет статистики ANALYZE), план идёт по связи в
+            # порядке user_id и не сортирует всю выборку
+            (
+                "task_open_status_due_idx",
+                "task_due_date_id_idx",
+                "task_users_user_task_idx",
+            ),
+        ),
+        (
+            "/api/tasks/overdue/",
+            tasks.filter(users=user, due_date__lt=now, status__in=OPEN_STATUSES),
+            ("task_users_user_task_idx", "task_open_status_due_idx"),
+        ),
+        (
+            "?priority=4&status=pending",
+            tasks.filter(users=user, priority=4, status="pending"),
+            ("task_users_user_task_idx", "task_priority_status_idx"),
+        ),
+        (
+            "priority__gte + статус",
+            tasks.filter(priority__gte=3, status="pending"),
+            ("task_priority_status_idx",),
+        ),
+        (
+            "?due_date=ГГГГ-ММ-ДД",
+            tasks.filter(
+                due_date__gte=now, due_date__lt=now + timedelta(days=1)
+            ).order_by("due_date", "id"),
+            ("task_due_date_id_idx",),
+        ),
+        (
+            "/api/tasks/?pagination=cursor",
+            tasks.filter(users=user).order_by("due_date", "id")[:13],
+            ("task_users_user_task_idx", "task_due_date_id_idx"),
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Заполняет базу задачами и проверяет, что планы запросов используют индексы"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            action="store_true",
+            help="Сначала создать тестовые данные в базе --database",
+        )
+        parser.add_argument(
+            "--database",
+            help="Псевдоним базы из DATABASES; с --seed обязателен, "
+            "без него проверяется default",
+        )
+        parser.add_argument("--tasks", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=1_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        if options["seed"]:
+            # Тестовые данные не должны попасть в рабочую базу по умолчанию
+            if not using:
+                raise CommandError("С --seed укажите отдельную базу: --database")
+            self.seed(using, options["tasks"], options["users"], options["batch_size"])
+        using = using or DEFAULT_DB_ALIAS
+
+        user = User.objects.using(using).order_by("?").first()
+        if user is None:
+            raise CommandError("В базе нет пользователей, запустите с --seed")
+
+        now = timezone.now()
+        missing = []
+        for name, queryset, indexes in query_shapes(user, now, using):
+            plan = queryset.explain()
+            used = [index for index in indexes if index in plan]
+
+            started = time.perf_counter()
+            for _ in range(options["repeat"]):
+                list(queryset[:100])
+            elapsed = (time.perf_counter() - started) / options["repeat"] * 1000
+
+            style = self.style.SUCCESS if used else self.style.ERROR
+            self.stdout.write(
+                style(f"{name}: {elapsed:.1f} мс, индексы: {', '.join(used) or 'нет'}")
+            )
+            self.stdout.write(f"    {plan}".replace("\n", "\n    "))
+            if not used:
+                missing.append(name)
+
+        if missing:
+            raise CommandError(f"Индексы не используются: {', '.join(missing)}")
+
+    def seed(self, using, tasks, users, batch_size):
+        self.stdout.write(f"Создание {users} пользователей и {tasks} задач...")
+        now = timezone.now()
+        rng = random.Random(42)
+
+        with transaction.atomic(using=using):
+            first_user = User.objects.using(using).count()
+            User.objects.using(using).bulk_create(
+                User(username=f"bench_{first_user + i}") for i in range(users)
+            )
+            user_ids = list(User.objects.using(using).values_list("id", flat=True))
+            categories = list(
+                Category.objects.using(using).values_list("id", flat=True)
+            ) + [None]
+
+        Through = Task.users.through
+        created = 0
+        while created < tasks:
+            size = min(batch_size, tasks - created)
+            with transaction.atomic(using=using):
+                batch = Task.objects.using(using).bulk_create(
+                    Task(
+                        title=f"Задача {created + i}",
+                        description="Тестовая задача",
+                        status=rng.choice(["pending", "in_progress", "completed"]),
+                        priority=rng.randint(1, 4),
+                        due_date=now
+                        + timedelta(minutes=rng.randint(-525_600, 525_600)),
+                        category_id=rng.choice(categories),
+                    )
+                    for i in range(size)
+                )
+                Through.objects.using(using).bulk_create(
+                    Through(task_id=task.id, user_id=user_id)
+                    for task in batch
+                    for user_id in rng.sample(user_ids, rng.randint(1, 2))
+                )
+            created += size
+            self.stdout.write(f"  {created}/{tasks}")
+
+        with connections[using].cursor() as cursor:
+            cursor.execute("ANALYZE")
@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from main.imports import (
+    IMPORT_CHUNK_SIZE,
+    TaskImporter,
+    file_format_from_name,
+    read_chunks,
+)
+
+
+class Command(BaseCommand):
+    help = "Импортирует задачи из CSV или XLSX пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл .csv или .xlsx")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "xlsx"],
+            help="Формат файла, если его нельзя определить по расширению",
+        )
+        parser.add_argument(
+            "--owner",
+            metavar="USERNAME",
+            help="Владелец задач, у которых в файле не указаны пользователи; "
+            "он же записывается автором в истории",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только проверить строки, ничего не создавая",
+        )
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--show-errors",
+            type=int,
+            default=50,
+            help="Сколько ошибок вывести (все учитываются в итоге)",
+        )
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or file_format_from_name(options["path"])
+        if file_format is None:
+            raise CommandError("Не удалось определить формат файла, укажите --format")
+        if options["chunk_size"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--chunk-size и --batch-size должны быть больше нуля")
+
+        owner = None
+        if options["owner"]:
+            owner = User.objects.filter(username=options["owner"]).first()
+            if owner is None:
+                raise CommandError(f"Пользователь {options['owner']} не найден")
+
+        importer = TaskImporter(
+            default_user=owner,
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+        )
+        result = importer.result
+        # Каждая пачка в своей транзакции: при сбое созданное раньше остаётся
+        with open(options["path"], "rb") as file:
+            for chunk in read_chunks(file, file_format, options["chunk_size"]):
+                importer.import_chunk(chunk)
+                self.stdout.write(
+                    f"  строк: {result.valid + len(result.errors)}, "
+                    f"создано: {result.created}, ошибок: {len(result.errors)}"
+                )
+
+        for row, message in result.errors[: options["show_errors"]]:
+            self.stderr.write(f"Строка {row}: {message}")
+
+        if options["dry_run"]:
+            summary = f"Проверено: {result.valid} строк без ошибок"
+        else:
+            summary = f"Создано задач: {result.created}"
+        style = self.style.WARNING if result.errors else self.style.SUCCESS
+        self.stdout.write(style(f"{summary}, ошибок: {len(result.errors)}"))
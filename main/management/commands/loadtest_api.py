@@ -0,0 +1,67 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочная проверка запущенного сервера: параллельные GET-запросы "
+        "к одному адресу, пропускная способность и задержки"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "url", help="Например, http://127.0.0.1:8000/api/async/tasks/"
+        )
+        parser.add_argument("--token", help="Токен API (заголовок Authorization)")
+        parser.add_argument(
+            "--concurrency", type=int, default=20, help="Одновременных запросов"
+        )
+        parser.add_argument("--requests", type=int, default=1000, help="Всего запросов")
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--concurrency и --requests должны быть больше нуля")
+
+        headers = {}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+
+        def fetch(_):
+            started = time.perf_counter()
+            try:
+                with urlopen(
+                    Request(options["url"], headers=headers),
+                    timeout=options["timeout"],
+                ) as response:
+                    response.read()
+                    status = response.status
+            except HTTPError as error:
+                status = error.code
+            except (URLError, OSError):
+                status = None
+            return status, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options["concurrency"]) as executor:
+            results = list(executor.map(fetch, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(duration * 1000 for _, duration in results)
+        failed = sum(1 for status, _ in results if status != 200)
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        self.stdout.write(
+            f"Запросов: {len(results)}, ошибок: {failed}, "
+            f"за {elapsed:.2f} с ({len(results) / elapsed:.1f} в секунду)"
+        )
+        self.stdout.write(
+            f"Задержка, мс: p50 {percentiles[49]:.1f}, p95 {percentiles[94]:.1f}, "
+            f"p99 {percentiles[98]:.1f}, макс {latencies[-1]:.1f}"
+        )
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style("Готово"))
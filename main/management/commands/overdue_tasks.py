@@ -1,26 +1,95 @@
-from django.core.management.base import BaseCommand
-from django.utils import timezone
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-from main.models import Task
+from django.core.management.base import BaseCommand, CommandError
+
+from main.notifications import (
+    JsonLinesSink,
+    StdoutSink,
+    iter_overdue_digests,
+    load_sink,
+)
+from main.utils import batched
 
 
 class Command(BaseCommand):
     help = "Показывает все просроченные задачи"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--jsonl",
+            metavar="PATH",
+            help="Записать сводки в файл JSON Lines вместо вывода в консоль",
+        )
+        parser.add_argument(
+            "--sink",
+            metavar="DOTTED.PATH",
+            help="Класс получателя сводок с методами send(digests) и close()",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            help="Обработать не больше указанного числа пользователей",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Число потоков, отправляющих пачки сводок",
+        )
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
     def handle(self, *args, **options):
-        now = timezone.now()
+        if options["workers"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--workers и --batch-size должны быть больше нуля")
 
-        overdue_tasks = Task.objects.filter(
-            due_date__lt=now, status__in=["pending", "in_progress"]
+        if options["sink"]:
+            sink = load_sink(options["sink"])
+        elif options["jsonl"]:
+            sink = JsonLinesSink(options["jsonl"])
+        else:
+            sink = StdoutSink(self.stdout, self.style)
+
+        digests = iter_overdue_digests(
+            chunk_size=options["chunk_size"], limit=options["limit"]
         )
+        batches = batched(digests, options["batch_size"])
+
+        try:
+            users, tasks = self.dispatch(sink, batches, options["workers"])
+        finally:
+            sink.close()
 
-        if not overdue_tasks.exists():
+        if not users:
             self.stdout.write(self.style.SUCCESS("Просроченных задач нет"))
             return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Пользователей в рассылке: {users}, задач в сводках: {tasks}"
+            )
+        )
 
-        self.stdout.write(self.style.WARNING("Просроченные задачи:"))
+    def dispatch(self, sink, batches, workers):
+        users = tasks = 0
+        if workers == 1:
+            for batch in batches:
+                sink.send(batch)
+                users += len(batch)
+                tasks += sum(len(digest.tasks) for digest in batch)
+            return users, tasks
 
-        for task in overdue_tasks:
-            self.stdout.write(
-                f'- {task.title} | пользователь: {task.users} | срок: {task.due_date.strftime("%d-%m-%Y %H:%M")}'
-            )
+        # Одновременно в работе не больше workers пачек, чтобы чтение из базы
+        # не обгоняло отправку и память оставалась ограниченной.
+        pending = set()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch in batches:
+                if len(pending) >= workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(executor.submit(sink.send, batch))
+                users += len(batch)
+                tasks += sum(len(digest.tasks) for digest in batch)
+            for future in pending:
+                future.result()
+        return users, tasks
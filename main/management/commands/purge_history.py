@@ -0,0 +1,122 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.history import (
+    ARCHIVES,
+    HISTORY_CHUNK_SIZE,
+    delete_in_chunks,
+    duplicate_versions,
+    get_retention_policies,
+)
+from main.models import TaskTombstone
+from main.sync import sync_horizon
+from main.utils import batched
+
+
+class Command(BaseCommand):
+    help = "Удаляет старые версии из таблиц истории по HISTORY_RETENTION"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            metavar="APP.MODEL",
+            help="Обработать только эту модель (можно повторять)",
+        )
+        parser.add_argument(
+            "--compact",
+            action="store_true",
+            help="Также удалить изменения, не отличающиеся от предыдущей версии",
+        )
+        parser.add_argument(
+            "--archive",
+            metavar="DIR",
+            help="Перед удалением сохранить строки в каталог <модель>/<год-месяц>/",
+        )
+        parser.add_argument(
+            "--archive-format", choices=sorted(ARCHIVES), default="jsonl"
+        )
+        parser.add_argument("--chunk-size", type=int, default=HISTORY_CHUNK_SIZE)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Пауза между пачками, секунды (снижает нагрузку на базу)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать строки, которые будут удалены",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size должен быть больше нуля")
+        try:
+            policies = get_retention_policies(options["model"])
+        except (LookupError, ValueError) as error:
+            raise CommandError(f"HISTORY_RETENTION: {error}")
+        if not policies:
+            raise CommandError("Нет политик хранения для указанных моделей")
+
+        archive = None
+        if options["archive"]:
+            try:
+                archive = ARCHIVES[options["archive_format"]](options["archive"])
+            except ImportError:
+                raise CommandError("Для архива в parquet нужен пакет pyarrow")
+
+        for policy in policies:
+            history = policy.history_model
+            label = policy.model._meta.label
+            if options["dry_run"]:
+                expired = policy.expired().count()
+                self.stdout.write(f"{label}: к удалению {expired} версий")
+                if options["compact"]:
+                    duplicates = sum(1 for _ in duplicate_versions(policy.model))
+                    self.stdout.write(f"{label}: повторов {duplicates}")
+                continue
+
+            deleted = delete_in_chunks(
+                policy.expired(),
+                options["chunk_size"],
+                archive=archive,
+                pause=options["pause"],
+            )
+            self.stdout.write(f"{label}: удалено устаревших версий: {deleted}")
+
+            if options["compact"]:
+                compacted = 0
+                # Список дубликатов собирается целиком: удаление во время
+                # чтения сдвинуло бы страницы iterator() на некоторых базах.
+                duplicates = list(
+                    duplicate_versions(policy.model, options["chunk_size"])
+                )
+                for ids in batched(duplicates, options["chunk_size"]):
+                    compacted += delete_in_chunks(
+                        history.objects.filter(history_id__in=ids),
+                        options["chunk_size"],
+                        archive=archive,
+                        pause=options["pause"],
+                    )
+                self.stdout.write(f"{label}: удалено повторов: {compacted}")
+
+        if not options["model"]:
+            self.purge_tombstones(options)
+
+    def purge_tombstones(self, options):
+        # Отметки об удалении нужны /api/sync/ только в пределах срока токена
+        expired = TaskTombstone.objects.filter(removed_at__lt=sync_horizon())
+        if options["dry_run"]:
+            self.stdout.write(f"Отметки удаления задач: к удалению {expired.count()}")
+            return
+        deleted = 0
+        while True:
+            ids = list(expired.values_list("pk", flat=True)[: options["chunk_size"]])
+            if not ids:
+                break
+            deleted += TaskTombstone.objects.filter(pk__in=ids).delete()[0]
+            if options["pause"]:
+                time.sleep(options["pause"])
+        self.stdout.write(f"Отметки удаления задач: удалено {deleted}")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from main.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Заново заполняет полнотекстовый индекс задач и комментариев"
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if backend is None:
+            raise CommandError(
+                "Полнотекстового индекса нет: база не SQLite/PostgreSQL "
+                "или не применены миграции"
+            )
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(self.style.SUCCESS("Индекс перестроен"))
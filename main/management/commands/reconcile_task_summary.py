@@ -0,0 +1,58 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from main.models import TaskCounter
+from main.summary import rebuild_counters
+from main.utils import batched
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счётчики сводки /api/tasks/summary/ по задачам в базе "
+        "и сообщает, у скольких пользователей они расходились"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", action="append", help="Имя пользователя (можно несколько)"
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("pk")
+        if options["user"]:
+            users = users.filter(username__in=options["user"])
+        user_ids = list(users.values_list("pk", flat=True))
+
+        drifted = 0
+        for batch in batched(user_ids, options["batch_size"]):
+            before = self.counts(batch)
+            rebuild_counters(batch)
+            after = self.counts(batch)
+            # У пользователей без счётчиков они строятся впервые
+            for user_id in before:
+                if before[user_id] != after[user_id]:
+                    drifted += 1
+                    self.stdout.write(f"Расходились счётчики пользователя {user_id}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Пересчитано пользователей: {len(user_ids)}, "
+                f"с расхождениями: {drifted}"
+            )
+        )
+
+    @staticmethod
+    def counts(user_ids):
+        # Просроченные сравнивать не с чем: их счётчик учитывает задачи
+        # только до момента последнего чтения сводки
+        counts = defaultdict(dict)
+        rows = TaskCounter.objects.filter(user_id__in=user_ids).values_list(
+            "user_id", "key", "count"
+        )
+        for user_id, key, count in rows:
+            user_counts = counts[user_id]
+            if count and key != TaskCounter.OVERDUE:
+                user_counts[key] = count
+        return counts
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.export_jobs import JobLost, claim_next_job, fail_job, run_job
+from main.exports import EXPORT_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Выполняет фоновые выгрузки задач, созданные в админке"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить задания из очереди и выйти, не дожидаясь новых",
+        )
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Пауза между проверками очереди, секунды",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=300,
+            help="Через сколько секунд без прогресса задание считается брошенным "
+            "и продолжается этим обработчиком",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size должен быть больше нуля")
+
+        while True:
+            job = claim_next_job(options["stale_after"])
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+
+            self.stdout.write(f"{job}: начата с задачи #{job.last_pk + 1}")
+            try:
+                run_job(job, options["chunk_size"], on_chunk=self.report)
+            except JobLost:
+                self.stderr.write(
+                    self.style.WARNING(f"{job}: продолжена другим обработчиком")
+                )
+            except Exception as error:
+                fail_job(job, error)
+                self.stderr.write(self.style.ERROR(f"{job}: {error}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{job}: {job.file_name}"))
+
+    def report(self, job):
+        self.stdout.write(f"  {job.processed_rows}/{job.total_rows or '?'}")
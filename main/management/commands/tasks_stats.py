@@ -1,20 +1,129 @@
-from django.core.management.base import BaseCommand
+import csv
+import json
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 from main.models import Task
 
+GROUPS = {
+    "user": "users__username",
+    "category": "category__title",
+    "priority": "priority",
+}
+
+# Разбивки, в которых каждая задача попадает ровно в одну группу: для них
+# итог считается суммой групп, и весь отчёт строится одним запросом.
+PARTITIONS = ("category", "priority")
+
+LABELS = {
+    "total": "Всего задач",
+    "pending": "В ожидании",
+    "in_progress": "В процессе",
+    "completed": "Завершено",
+    "overdue": "Просрочено",
+}
+
+GROUP_TITLES = {
+    "user": "По пользователям",
+    "category": "По категориям",
+    "priority": "По приоритетам",
+}
+
 
 class Command(BaseCommand):
     help = "Показывает статистику задач по статусам"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--by",
+            choices=sorted(GROUPS),
+            help="Разбивка по пользователям, категориям или приоритетам",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("text", "json", "csv"),
+            default="text",
+            help="Формат вывода",
+        )
+        parser.add_argument(
+            "--since",
+            help="Учитывать только задачи, созданные начиная с даты (YYYY-MM-DD)",
+        )
+
     def handle(self, *args, **options):
-        total = Task.objects.count()
+        now = timezone.now()
+        counters = {"total": Count("id")}
+        for status, _ in Task.STATUS_CHOICES:
+            counters[status] = Count("id", filter=Q(status=status))
+        counters["overdue"] = Count(
+            "id", filter=Q(due_date__lt=now) & ~Q(status="completed")
+        )
+
+        queryset = Task.objects.all()
+        if options["since"]:
+            queryset = queryset.filter(
+                creation_date__gte=self.parse_since(options["since"])
+            )
 
-        pending = Task.objects.filter(status="pending").count()
-        in_progress = Task.objects.filter(status="in_progress").count()
-        completed = Task.objects.filter(status="completed").count()
+        by = options["by"]
+        groups = None
+        if by:
+            column = GROUPS[by]
+            groups = [
+                {by: row.pop(column), **row}
+                for row in queryset.values(column).annotate(**counters).order_by(column)
+            ]
 
+        if by in PARTITIONS:
+            totals = {name: sum(row[name] for row in groups) for name in counters}
+        else:
+            totals = queryset.aggregate(**counters)
+
+        writer = getattr(self, f"write_{options['format']}")
+        writer(totals, by, groups)
+
+    def parse_since(self, value):
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f"Неверная дата: {value}")
+            since = datetime.combine(day, time.min)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+    def write_text(self, totals, by, groups):
         self.stdout.write(self.style.SUCCESS("Статистика задач:"))
-        self.stdout.write(f"Всего задач: {total}")
-        self.stdout.write(f"В ожидании: {pending}")
-        self.stdout.write(f"В процессе: {in_progress}")
-        self.stdout.write(f"Завершено: {completed}")
+        for name, label in LABELS.items():
+            self.stdout.write(f"{label}: {totals[name]}")
+
+        if groups is None:
+            return
+        self.stdout.write("")
+        self.stdout.write(self.style.SUCCESS(f"{GROUP_TITLES[by]}:"))
+        for row in groups:
+            counts = ", ".join(
+                f"{label.lower()}: {row[name]}" for name, label in LABELS.items()
+            )
+            self.stdout.write(f"- {row[by] if row[by] is not None else '—'} | {counts}")
+
+    def write_json(self, totals, by, groups):
+        report = dict(totals)
+        if groups is not None:
+            report[f"by_{by}"] = groups
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+    def write_csv(self, totals, by, groups):
+        writer = csv.writer(self.stdout, lineterminator="\n")
+        if groups is None:
+            writer.writerow(list(LABELS))
+            writer.writerow([totals[name] for name in LABELS])
+            return
+        writer.writerow([by, *LABELS])
+        for row in groups:
+            writer.writerow([row[by], *(row[name] for name in LABELS)])
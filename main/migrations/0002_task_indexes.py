@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-16 22:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+# У автоматической таблицы связи есть только уникальный индекс
+# (task_id, user_id); выборки "задачи пользователя" идут от user_id.
+# Модели связи в миграциях нет, поэтому индекс добавляется через
+# schema_editor - он же строит DROP INDEX в синтаксисе нужной базы.
+TASK_USERS_INDEX = models.Index(
+    fields=["user", "task"], name="task_users_user_task_idx"
+)
+
+
+def add_task_users_index(apps, schema_editor):
+    Through = apps.get_model("main", "Task").users.through
+    schema_editor.add_index(Through, TASK_USERS_INDEX)
+
+
+def remove_task_users_index(apps, schema_editor):
+    Through = apps.get_model("main", "Task").users.through
+    schema_editor.remove_index(Through, TASK_USERS_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                condition=models.Q(("status__in", ["pending", "in_progress"])),
+                fields=["status", "due_date"],
+                name="task_open_status_due_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["priority", "status"], name="task_priority_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(fields=["due_date", "id"], name="task_due_date_id_idx"),
+        ),
+        migrations.RunPython(add_task_users_index, remove_task_users_index),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations
+
+# Таблицы полнотекстового индекса (см. main/search.py). Миграция создаёт их
+# и сразу заполняет по уже существующим данным, иначе ?search= ничего не
+# находил бы до запуска rebuild_search_index.
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """RunSQL только на базе vendor: у индекса свой DDL в каждой СУБД."""
+
+    def __init__(self, vendor, *args, **kwargs):
+        self.vendor = vendor
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        return name, [self.vendor, *args], kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def fill_index(apps, schema_editor):
+    # Те же INSERT ... SELECT, что у rebuild_search_index
+    from main.search import backend_for
+
+    backend = backend_for(schema_editor.connection.alias)
+    if backend is not None:
+        backend.rebuild()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0004_sync"),
+    ]
+
+    operations = [
+        VendorRunSQL(
+            "sqlite",
+            [
+                "CREATE VIRTUAL TABLE main_task_fts USING fts5(title, description, "
+                "category, tokenize='unicode61 remove_diacritics 2')",
+                "CREATE VIRTUAL TABLE main_comment_fts USING "
+                "fts5(text, tokenize='unicode61 remove_diacritics 2')",
+            ],
+            [
+                "DROP TABLE IF EXISTS main_task_fts",
+                "DROP TABLE IF EXISTS main_comment_fts",
+            ],
+        ),
+        VendorRunSQL(
+            "postgresql",
+            [
+                "CREATE TABLE main_task_search ("
+                "id bigint PRIMARY KEY REFERENCES main_task (id) "
+                "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)",
+                "CREATE INDEX main_task_search_document ON main_task_search "
+                "USING gin (document)",
+                "CREATE TABLE main_comment_search ("
+                "id bigint PRIMARY KEY REFERENCES main_comment (id) "
+                "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)",
+                "CREATE INDEX main_comment_search_document ON main_comment_search "
+                "USING gin (document)",
+            ],
+            [
+                "DROP TABLE IF EXISTS main_task_search",
+                "DROP TABLE IF EXISTS main_comment_search",
+            ],
+        ),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
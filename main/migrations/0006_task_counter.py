@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0005_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=50, verbose_name="Счётчик")),
+                ("count", models.IntegerField(default=0, verbose_name="Количество")),
+                (
+                    "as_of",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Просрочено до"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="task_counters",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Счётчик задач пользователя",
+                "verbose_name_plural": "Счётчики задач пользователей",
+                "unique_together": {("user", "key")},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0006_task_counter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exportjob",
+            name="claim",
+            field=models.CharField(
+                blank=True,
+                help_text="Меняется, когда задание берёт другой обработчик",
+                max_length=32,
+                verbose_name="Метка обработчика",
+            ),
+        ),
+    ]
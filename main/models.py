@@ -1,9 +1,14 @@
+from collections import Counter, defaultdict, namedtuple
+
 from django.contrib.auth.models import User
-from django.db import models
-from simple_history.models import HistoricalRecords
+from django.db import models, transaction
+from django.utils import timezone
+from simple_history.utils import get_history_manager_for_model
+
+from .history import ChangedOnlyHistoricalRecords, HistorySnapshotMixin
 
 
-class Category(models.Model):
+class Category(HistorySnapshotMixin, models.Model):
     COLOR_CHOICES = [
         ("#FF0000", "Красный"),
         ("#00FF00", "Зеленый"),
@@ -22,7 +27,7 @@ class Category(models.Model):
         "Цвет", max_length=7, choices=COLOR_CHOICES, default="#FFFFFF"
     )
 
-    history = HistoricalRecords()
+    history = ChangedOnlyHistoricalRecords()
 
     def __str__(self):
         return f"{self.title}"
@@ -33,7 +38,46 @@ class Category(models.Model):
         unique_together = ["title"]
 
 
-class Task(models.Model):
+class TaskQuerySet(models.QuerySet):
+    def complete(self, history_user=None):
+        """Завершает незавершённые задачи одним UPDATE.
+
+        Возвращает задачи, которые завершил именно этот вызов: их id
+        выбираются с блокировкой строк, поэтому повторное или параллельное
+        завершение не перезаписывает строку и не создаёт запись истории.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            task_ids = list(
+                self.exclude(status="completed")
+                .select_for_update(of=("self",))
+                .values_list("pk", flat=True)
+            )
+            if not task_ids:
+                return []
+            before = TaskCounter.owned_states(task_ids)
+            Task.objects.filter(pk__in=task_ids).update(
+                status="completed", update_date=now
+            )
+            tasks = list(Task.objects.filter(pk__in=task_ids))
+            get_history_manager_for_model(Task).bulk_history_create(
+                tasks, update=True, default_user=history_user
+            )
+            # main/changes.py сам импортирует модели
+            from .changes import tasks_changed
+
+            tasks_changed(
+                before,
+                {
+                    pair: state._replace(status="completed")
+                    for pair, state in before.items()
+                },
+                dict.fromkeys(task_ids, "task.completed"),
+            )
+        return tasks
+
+
+class Task(HistorySnapshotMixin, models.Model):
     STATUS_CHOICES = [
         ("pending", "В ожидании"),
         ("in_progress", "В процессе"),
@@ -70,7 +114,21 @@ class Task(models.Model):
         related_name="tasks",
     )
 
-    history = HistoricalRecords()
+    history = ChangedOnlyHistoricalRecords()
+
+    objects = TaskQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # Если у владельцев есть счётчики сводки, pre_save читает строку с
+        # блокировкой, а post_save меняет по ней счётчики (main/signals.py):
+        # тогда это одна транзакция. Остальным сохранениям она не нужна.
+        self._counted = not self._state.adding and TaskCounter.counted(
+            Task.users.through.objects.filter(task_id=self.pk).values("user_id")
+        )
+        if not self._counted:
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
 
     def get_comments_preview(self, limit=5):
         comments = self.comments.select_related("user").all()[:limit]
@@ -90,9 +148,21 @@ class Task(models.Model):
     class Meta:
         verbose_name = "Задача"
         verbose_name_plural = "Задачи"
+        indexes = [
+            models.Index(
+                fields=["status", "due_date"],
+                name="task_open_status_due_idx",
+                condition=models.Q(status__in=["pending", "in_progress"]),
+            ),
+            models.Index(
+                fields=["priority", "status"], name="task_priority_status_idx"
+            ),
+            models.Index(fields=["due_date", "id"], name="task_due_date_id_idx"),
+            models.Index(fields=["update_date", "id"], name="task_update_date_id_idx"),
+        ]
 
 
-class Comment(models.Model):
+class Comment(HistorySnapshotMixin, models.Model):
     task = models.ForeignKey(
         Task,
         on_delete=models.CASCADE,
@@ -123,7 +193,7 @@ class Comment(models.Model):
         help_text="Дата и время последнего изменения комментария",
     )
 
-    history = HistoricalRecords()
+    history = ChangedOnlyHistoricalRecords()
 
     def __str__(self):
         preview = self.text[:50] + "..." if len(self.text) > 50 else self.text
@@ -136,4 +206,249 @@ class Comment(models.Model):
         indexes = [
             models.Index(fields=["task", "created_at"]),
             models.Index(fields=["user", "created_at"]),
+            models.Index(fields=["updated_at", "id"]),
+        ]
+
+
+class TaskTombstone(models.Model):
+    """Отметка о том, что задача пропала у пользователя: удалена или он
+    убран из владельцев. По ней /api/sync/ сообщает клиенту об удалении -
+    в истории задачи владельцы не хранятся."""
+
+    task_id = models.IntegerField("Задача")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+        related_name="task_tombstones",
+    )
+    removed_at = models.DateTimeField("Дата удаления", default=timezone.now)
+
+    @classmethod
+    def record(cls, owners):
+        """owners - пары (id задачи, id пользователя), потерявших доступ."""
+        cls.objects.bulk_create(
+            cls(task_id=task_id, user_id=user_id) for task_id, user_id in owners
+        )
+
+    def __str__(self):
+        return f"Задача #{self.task_id} удалена у {self.user_id}"
+
+    class Meta:
+        verbose_name = "Удалённая у пользователя задача"
+        verbose_name_plural = "Удалённые у пользователей задачи"
+        indexes = [
+            models.Index(fields=["user", "removed_at", "id"]),
+            models.Index(fields=["removed_at"]),
+        ]
+
+
+# Поля задачи, от которых зависят счётчики TaskCounter
+TaskState = namedtuple("TaskState", ["status", "priority", "category_id", "due_date"])
+
+
+class TaskCounter(models.Model):
+    """Счётчик задач пользователя для /api/tasks/summary/: всего, по
+    статусам, приоритетам, категориям и просроченных.
+
+    Сигналы и массовые операции меняют счётчики на разницу (apply_changes),
+    команда reconcile_task_summary пересчитывает их заново. Просроченной
+    задача становится без записи в базу, поэтому счётчик overdue учитывает
+    только задачи со сроком раньше as_of, а сдвигает as_of чтение сводки
+    (main/summary.py).
+    """
+
+    OVERDUE = "overdue"
+    OPEN_STATUSES = ("pending", "in_progress")
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+        related_name="task_counters",
+    )
+    key = models.CharField("Счётчик", max_length=50)
+    count = models.IntegerField("Количество", default=0)
+    as_of = models.DateTimeField("Просрочено до", null=True, blank=True)
+
+    @staticmethod
+    def state(task):
+        return TaskState(task.status, task.priority, task.category_id, task.due_date)
+
+    @staticmethod
+    def owned_states(task_ids):
+        """{(id задачи, id пользователя): TaskState} по таблице владельцев."""
+        rows = Task.users.through.objects.filter(task_id__in=task_ids).values_list(
+            "task_id",
+            "user_id",
+            "task__status",
+            "task__priority",
+            "task__category_id",
+            "task__due_date",
+        )
+        return {
+            (task_id, user_id): TaskState(*state) for task_id, user_id, *state in rows
+        }
+
+    @staticmethod
+    def keys(state):
+        return (
+            "total",
+            f"status:{state.status}",
+            f"priority:{state.priority}",
+            f"category:{state.category_id or ''}",
+        )
+
+    @classmethod
+    def is_overdue(cls, state, as_of):
+        return state.status in cls.OPEN_STATUSES and state.due_date < as_of
+
+    @classmethod
+    def counted(cls, user_ids):
+        """Есть ли счётчики хотя бы у одного из пользователей (список id или
+        подзапрос)."""
+        return cls.objects.filter(user_id__in=user_ids, key=cls.OVERDUE).exists()
+
+    @classmethod
+    def apply_changes(cls, before, after):
+        """Меняет счётчики по разнице состояний {(id задачи, id
+        пользователя): TaskState} до и после изменения; нет пары - задачи у
+        пользователя нет. Вызывается в транзакции самого изменения."""
+        changed = [
+            (pair[1], before.get(pair), after.get(pair))
+            for pair in before.keys() | after.keys()
+            if before.get(pair) != after.get(pair)
+        ]
+        if not changed:
+            return
+        user_ids = {user_id for user_id, _, _ in changed}
+        # Счётчики пользователя появляются при первом чтении сводки, до
+        # этого менять нечего. Строка overdue блокируется до конца
+        # транзакции: изменение либо попадает в пересчёт (main/summary.py),
+        # либо ждёт его и применяется к новым счётчикам
+        as_of = dict(
+            cls.objects.select_for_update()
+            .filter(user_id__in=user_ids, key=cls.OVERDUE)
+            .order_by("user_id")
+            .values_list("user_id", "as_of")
+        )
+        deltas = defaultdict(Counter)
+        for user_id, old, new in changed:
+            if user_id not in as_of:
+                continue
+            for state, sign in ((old, -1), (new, 1)):
+                if state is None:
+                    continue
+                for key in cls.keys(state):
+                    deltas[user_id][key] += sign
+                # as_of пуст, пока счётчики строятся: overdue посчитает пересчёт
+                if as_of[user_id] and cls.is_overdue(state, as_of[user_id]):
+                    deltas[user_id][cls.OVERDUE] += sign
+
+        # Пользователи с одинаковыми изменениями обновляются одним запросом
+        groups = defaultdict(list)
+        for user_id, delta in deltas.items():
+            delta = frozenset((key, value) for key, value in delta.items() if value)
+            if delta:
+                groups[delta].append(user_id)
+        cls.objects.bulk_create(
+            [
+                cls(user_id=user_id, key=key)
+                for delta, user_ids in groups.items()
+                for user_id in user_ids
+                for key, value in delta
+                if value > 0
+            ],
+            ignore_conflicts=True,
+        )
+        for delta, user_ids in groups.items():
+            cls.objects.filter(
+                user_id__in=user_ids, key__in=[key for key, _ in delta]
+            ).update(
+                count=models.F("count")
+                + models.Case(
+                    *[models.When(key=key, then=value) for key, value in delta],
+                    output_field=models.IntegerField(),
+                )
+            )
+
+    def __str__(self):
+        return f"{self.key} у {self.user_id}: {self.count}"
+
+    class Meta:
+        verbose_name = "Счётчик задач пользователя"
+        verbose_name_plural = "Счётчики задач пользователей"
+        unique_together = ["user", "key"]
+
+
+class ExportJob(models.Model):
+    STATUS_CHOICES = [
+        ("pending", "В очереди"),
+        ("running", "Выполняется"),
+        ("done", "Готово"),
+        ("failed", "Ошибка"),
+    ]
+    FORMAT_CHOICES = [
+        ("csv", "CSV"),
+        ("xlsx", "XLSX"),
+    ]
+
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Автор",
+        related_name="export_jobs",
+    )
+    file_format = models.CharField(
+        "Формат", max_length=4, choices=FORMAT_CHOICES, default="xlsx"
+    )
+    query_string = models.TextField(
+        "Фильтры списка",
+        blank=True,
+        help_text="Параметры списка задач в админке на момент запуска",
+    )
+    status = models.CharField(
+        "Статус", max_length=10, choices=STATUS_CHOICES, default="pending"
+    )
+    total_rows = models.PositiveIntegerField("Всего строк", null=True, blank=True)
+    processed_rows = models.PositiveIntegerField("Выгружено строк", default=0)
+    last_pk = models.BigIntegerField(
+        "Последняя выгруженная задача",
+        default=0,
+        help_text="С неё продолжается выгрузка после сбоя",
+    )
+    file_size = models.BigIntegerField(
+        "Размер записанной части",
+        default=0,
+        help_text="Всё, что записано после этого смещения, отбрасывается при возобновлении",
+    )
+    file_name = models.CharField("Файл", max_length=255, blank=True)
+    claim = models.CharField(
+        "Метка обработчика",
+        max_length=32,
+        blank=True,
+        help_text="Меняется, когда задание берёт другой обработчик",
+    )
+    error = models.TextField("Ошибка", blank=True)
+    created_at = models.DateTimeField("Дата создания", auto_now_add=True)
+    updated_at = models.DateTimeField("Дата обновления", auto_now=True)
+    finished_at = models.DateTimeField("Дата завершения", null=True, blank=True)
+
+    @property
+    def progress(self):
+        if self.status == "done":
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, self.processed_rows * 100 // self.total_rows)
+
+    def __str__(self):
+        return f"Выгрузка #{self.pk} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Выгрузка задач"
+        verbose_name_plural = "Выгрузки задач"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "updated_at"]),
         ]
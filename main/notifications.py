@@ -0,0 +1,107 @@
+import json
+import threading
+from dataclasses import dataclass, field
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+OPEN_STATUSES = ("pending", "in_progress")
+
+
+@dataclass
+class OverdueDigest:
+    user_id: int
+    username: str
+    tasks: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            "user_id": self.user_id,
+            "username": self.username,
+            "tasks": [
+                {**task, "due_date": task["due_date"].isoformat()}
+                for task in self.tasks
+            ],
+        }
+
+
+def iter_overdue_digests(now=None, chunk_size=2000, limit=None):
+    """Просроченные задачи, сгруппированные по владельцам.
+
+    Строки читаются из таблицы связи Task.users, отсортированной по
+    пользователю, потоком .iterator(): в памяти держатся только задачи
+    одного пользователя, а имена владельцев приходят тем же запросом.
+    """
+    now = now or timezone.now()
+    rows = (
+        Task.users.through.objects.filter(
+            task__due_date__lt=now, task__status__in=OPEN_STATUSES
+        )
+        .order_by("user_id", "task__due_date", "task_id")
+        .values_list(
+            "user_id", "user__username", "task_id", "task__title", "task__due_date"
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    digests = (
+        OverdueDigest(
+            user_id,
+            username,
+            [
+                {"id": task_id, "title": title, "due_date": due_date}
+                for _, _, task_id, title, due_date in group
+            ],
+        )
+        for (user_id, username), group in groupby(rows, key=itemgetter(0, 1))
+    )
+    return islice(digests, limit)
+
+
+class StdoutSink:
+    def __init__(self, stdout, style):
+        self.stdout = stdout
+        self.style = style
+        self.lock = threading.Lock()
+        self.started = False
+
+    def send(self, digests):
+        with self.lock:
+            if not self.started:
+                self.stdout.write(self.style.WARNING("Просроченные задачи:"))
+                self.started = True
+            for digest in digests:
+                self.stdout.write(f"{digest.username} ({len(digest.tasks)}):")
+                for task in digest.tasks:
+                    due_date = timezone.localtime(task["due_date"])
+                    self.stdout.write(
+                        f'  - {task["title"]} | срок: {due_date.strftime("%d-%m-%Y %H:%M")}'
+                    )
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def send(self, digests):
+        lines = "".join(
+            json.dumps(digest.as_dict(), ensure_ascii=False) + "\n"
+            for digest in digests
+        )
+        with self.lock:
+            self.file.write(lines)
+
+    def close(self):
+        self.file.close()
+
+
+def load_sink(path, **kwargs):
+    """Подключаемый получатель: класс с методами send(digests) и close()."""
+    return import_string(path)(**kwargs)
@@ -0,0 +1,283 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from simple_history.manager import HistoricalQuerySet
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Keyset:
+    """Постраничная выборка по ключу (keyset) без OFFSET и COUNT(*).
+
+    ordering задаётся как в order_by: ("-due_date", "-id"). Последнее поле
+    должно быть уникальным, чтобы порядок был строгим.
+    """
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+        self.fields = tuple(name.lstrip("-") for name in self.ordering)
+
+    def encode(self, obj, reverse=False):
+        if isinstance(obj, dict):
+            values = [self._dump(obj[field]) for field in self.fields]
+        else:
+            values = [self._dump(getattr(obj, field)) for field in self.fields]
+        payload = json.dumps([int(reverse), *values], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode(self, cursor, model):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            reverse, *raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(raw) != len(self.fields):
+                raise InvalidCursor(cursor)
+            values = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, raw)
+            ]
+        # to_python() сообщает о неверном значении через ValidationError
+        except (binascii.Error, TypeError, ValueError, ValidationError) as exc:
+            raise InvalidCursor(cursor) from exc
+        if any(value is None for value in values):
+            raise InvalidCursor(cursor)
+        return bool(reverse), values
+
+    def paginate(self, queryset, cursor=None, page_size=20):
+        """Возвращает (items, next_cursor, previous_cursor).
+
+        Выбирается page_size + 1 строк: лишняя строка говорит о том, что
+        в этом направлении есть ещё страница.
+        """
+        queryset, reverse, values = self._page_queryset(queryset, cursor)
+        items = list(queryset[: page_size + 1])
+        return self._page_result(items, reverse, values, page_size)
+
+    async def apaginate(self, queryset, cursor=None, page_size=20):
+        queryset, reverse, values = self._page_queryset(queryset, cursor)
+        items = [item async for item in queryset[: page_size + 1]]
+        return self._page_result(items, reverse, values, page_size)
+
+    def _page_queryset(self, queryset, cursor):
+        reverse, values = False, None
+        if cursor:
+            reverse, values = self.decode(cursor, queryset.model)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._flip(name) for name in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+        return queryset, reverse, values
+
+    def _page_result(self, items, reverse, values, page_size):
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        if reverse:
+            items.reverse()
+
+        next_cursor = previous_cursor = None
+        if items:
+            if has_more or reverse:
+                next_cursor = self.encode(items[-1])
+            if (has_more and reverse) or (not reverse and values is not None):
+                previous_cursor = self.encode(items[0], reverse=True)
+        return items, next_cursor, previous_cursor
+
+    def _after(self, ordering, values):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        condition = Q()
+        for i, name in enumerate(ordering):
+            field = name.lstrip("-")
+            lookup = "lt" if name.startswith("-") else "gt"
+            equal = {f: v for f, v in zip(self.fields[:i], values[:i])}
+            condition |= Q(**equal, **{f"{field}__{lookup}": values[i]})
+        return condition
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith("-") else f"-{name}"
+
+    @staticmethod
+    def _dump(value):
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return value
+
+
+class KeysetPageNumberPagination(PageNumberPagination):
+    """Обычная постраничная навигация или курсорная по запросу клиента.
+
+    ?pagination=cursor (или наличие ?cursor=...) включает режим по ключу:
+    без COUNT(*) и OFFSET, в ответе только next/previous и results. Порядок
+    в нём всегда keyset_ordering, другой ?ordering= - ошибка 400.
+    """
+
+    keyset_ordering = None
+    mode_query_param = "pagination"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Неверный курсор"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_mode = self.use_keyset(request)
+        if not self.keyset_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM)
+        if ordering and ordering.split(",") != list(self.keyset_ordering):
+            raise serializers.ValidationError(
+                {
+                    api_settings.ORDERING_PARAM: "С pagination=cursor порядок "
+                    f"только {','.join(self.keyset_ordering)}"
+                }
+            )
+        try:
+            items, self.next_cursor, self.previous_cursor = Keyset(
+                self.keyset_ordering
+            ).paginate(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request),
+            )
+        except InvalidCursor:
+            raise NotFound(self.invalid_cursor_message)
+        return items
+
+    def use_keyset(self, request):
+        if not self.keyset_ordering:
+            return False
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_query_param in request.query_params
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset_mode:
+            return super().get_paginated_response(data)
+        return Response(
+            {
+                "next": self.get_cursor_link(self.next_cursor),
+                "previous": self.get_cursor_link(self.previous_cursor),
+                "results": data,
+            }
+        )
+
+    def get_cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+
+class TaskPagination(KeysetPageNumberPagination):
+    keyset_ordering = ("due_date", "id")
+
+
+class CommentPagination(KeysetPageNumberPagination):
+    keyset_ordering = ("-created_at", "-id")
+
+
+class TaskHistoryPagination(KeysetPageNumberPagination):
+    keyset_ordering = ("-history_id",)
+
+    def use_keyset(self, request):
+        # История растёт только с одного конца, номера страниц ей не нужны
+        return True
+
+
+def table_row_estimate(model, using="default"):
+    """Число строк таблицы по статистике планировщика или None."""
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        "postgresql": (
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(table)],
+        ),
+        # Строка на каждый индекс, первое число в stat - строк в индексе: у
+        # частичного индекса их меньше, чем в таблице
+        "sqlite": (
+            "SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s",
+            [table],
+        ),
+        "mysql": (
+            "SELECT table_rows FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s",
+            [table],
+        ),
+    }
+    if connection.vendor not in queries:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(*queries[connection.vendor])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+def approximate_count(queryset):
+    """COUNT(*) для больших таблиц админки.
+
+    Небольшие результаты (до ADMIN_APPROXIMATE_COUNT_THRESHOLD строк)
+    считаются точно, но по выборке с LIMIT, поэтому не проходят всю таблицу.
+    Для всей таблицы берётся оценка из статистики базы, для больших выборок
+    с фильтрами - точное число из кэша, которое пересчитывается раз в
+    ADMIN_COUNT_CACHE_TIMEOUT секунд.
+    """
+    threshold = settings.ADMIN_APPROXIMATE_COUNT_THRESHOLD
+    if not queryset.query.where:
+        estimate = table_row_estimate(queryset.model, queryset.db)
+        if estimate is not None and estimate > threshold:
+            return estimate
+
+    limited = QuerySet.count(queryset.order_by()[: threshold + 1])
+    if limited <= threshold:
+        return limited
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.md5(repr((sql, params)).encode(), usedforsecurity=False)
+    return cache.get_or_set(
+        f"admin-count:{queryset.db}:{digest.hexdigest()}",
+        lambda: QuerySet.count(queryset),
+        settings.ADMIN_COUNT_CACHE_TIMEOUT,
+    )
+
+
+class ApproximateCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            return approximate_count(self.object_list)
+        return len(self.object_list)
+
+
+class ApproximateCountHistoricalQuerySet(HistoricalQuerySet):
+    """История объекта с count() как у approximate_count(): страницы истории
+    в SimpleHistoryAdmin считает обычный Paginator, а не ModelAdmin.paginator."""
+
+    def count(self):
+        return approximate_count(self)
@@ -0,0 +1,280 @@
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from .models import Task
+from .utils import batched
+
+# Полнотекстовый поиск по задачам и комментариям. Индекс лежит в отдельных
+# таблицах (FTS5 в SQLite, tsvector в PostgreSQL), создаётся и заполняется
+# миграцией 0005 и дальше обновляется сигналами при изменении текста;
+# rebuild_search_index строит его заново. На других базах индекса нет, и поиск остаётся
+# подстрочным (SearchFilter).
+
+WORD_RE = re.compile(r"\w+")
+INDEX_CHUNK_SIZE = 500
+# Поля задачи, от которых зависит её документ в индексе
+TASK_TEXT_FIELDS = {"title", "description", "category_id"}
+
+
+def query_words(terms):
+    return WORD_RE.findall(" ".join(terms))
+
+
+class SearchBackend(ABC):
+    task_table = "main_task_search"
+    comment_table = "main_comment_search"
+    # Колонка таблиц индекса с id документа
+    id_column = "id"
+    # Чем больше rank(), тем документ релевантнее
+    rank_ordering = "-search_rank"
+
+    def __init__(self, using="default"):
+        self.using = using
+
+    def execute(self, sql, params=()):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            if cursor.description:
+                return cursor.fetchall()
+            return None
+
+    def index_tasks(self, task_ids):
+        for ids in batched(task_ids, INDEX_CHUNK_SIZE):
+            self.remove(self.task_table, ids)
+            self.execute(*self.task_documents(ids))
+
+    def index_comments(self, comment_ids):
+        for ids in batched(comment_ids, INDEX_CHUNK_SIZE):
+            self.remove(self.comment_table, ids)
+            self.execute(*self.comment_documents(ids))
+
+    def remove_tasks(self, task_ids):
+        for ids in batched(task_ids, INDEX_CHUNK_SIZE):
+            self.remove(self.task_table, ids)
+
+    def remove_comments(self, comment_ids):
+        for ids in batched(comment_ids, INDEX_CHUNK_SIZE):
+            self.remove(self.comment_table, ids)
+
+    def rebuild(self):
+        self.execute(f"DELETE FROM {self.task_table}")
+        self.execute(*self.task_documents(None))
+        self.execute(f"DELETE FROM {self.comment_table}")
+        self.execute(*self.comment_documents(None))
+
+    def filter(self, queryset, terms, order=True):
+        """queryset, сужённый до объектов, подходящих под все слова terms
+        (каждое - как начало слова). С order - от более релевантных к менее,
+        релевантность в поле search_rank.
+
+        Условие поиска остаётся в том же запросе, поэтому остальные фильтры
+        queryset и постраничная выдача работают со всеми совпадениями, а не
+        с частью.
+        """
+        words = query_words(terms)
+        if not words:
+            return queryset.none()
+        table = self.task_table if queryset.model is Task else self.comment_table
+        condition, params = self.condition(table, words)
+        if not order:
+            return queryset.filter(
+                pk__in=RawSQL(
+                    f"SELECT {self.id_column} FROM {table} WHERE {condition}", params
+                )
+            )
+        # Для сортировки таблица индекса присоединяется один раз: совпадение
+        # и релевантность считаются по одной и той же строке
+        quote_name = connections[self.using].ops.quote_name
+        meta = queryset.model._meta
+        column = f"{quote_name(meta.db_table)}.{quote_name(meta.pk.column)}"
+        rank, rank_params = self.rank(table, words)
+        return queryset.extra(
+            tables=[table],
+            where=[f"{table}.{self.id_column} = {column}", condition],
+            params=params,
+            select={"search_rank": rank},
+            select_params=rank_params,
+        ).order_by(self.rank_ordering, "pk")
+
+    @abstractmethod
+    def remove(self, table, ids):
+        """Удаляет из индекса table документы с id из ids."""
+
+    @abstractmethod
+    def task_documents(self, ids):
+        """(SQL, параметры) вставки документов задач ids, всех при None."""
+
+    @abstractmethod
+    def comment_documents(self, ids):
+        """(SQL, параметры) вставки документов комментариев ids, всех при None."""
+
+    @abstractmethod
+    def condition(self, table, words):
+        """(SQL, параметры) условия, что документ table содержит все words."""
+
+    @abstractmethod
+    def rank(self, table, words):
+        """(SQL, параметры) релевантности документа table в том же запросе,
+        что и condition()."""
+
+
+class SqliteSearchBackend(SearchBackend):
+    task_table = "main_task_fts"
+    comment_table = "main_comment_fts"
+    id_column = "rowid"
+    tokenizer = "unicode61 remove_diacritics 2"
+    # Вес совпадений в bm25: название, описание, категория
+    task_weights = (10.0, 1.0, 5.0)
+    # bm25 тем меньше, чем документ релевантнее
+    rank_ordering = "search_rank"
+
+    def remove(self, table, ids):
+        placeholders = ", ".join(["%s"] * len(ids))
+        self.execute(f"DELETE FROM {table} WHERE rowid IN ({placeholders})", ids)
+
+    def task_documents(self, ids):
+        sql = (
+            f"INSERT INTO {self.task_table} (rowid, title, description, category) "
+            "SELECT t.id, t.title, t.description, COALESCE(c.title, '') "
+            "FROM main_task t LEFT JOIN main_category c ON c.id = t.category_id"
+        )
+        return self.with_ids(sql, "t.id", ids)
+
+    def comment_documents(self, ids):
+        sql = (
+            f"INSERT INTO {self.comment_table} (rowid, text) "
+            "SELECT c.id, c.text FROM main_comment c"
+        )
+        return self.with_ids(sql, "c.id", ids)
+
+    @staticmethod
+    def with_ids(sql, column, ids):
+        if ids is None:
+            return sql, []
+        placeholders = ", ".join(["%s"] * len(ids))
+        return f"{sql} WHERE {column} IN ({placeholders})", list(ids)
+
+    @staticmethod
+    def match(words):
+        # Слова в кавычках - без синтаксиса запросов FTS5, * - поиск по началу
+        return " ".join(f'"{word}"*' for word in words)
+
+    def condition(self, table, words):
+        return f"{table} MATCH %s", [self.match(words)]
+
+    def rank(self, table, words):
+        weights = self.task_weights if table == self.task_table else ()
+        return f"bm25({', '.join([table, *map(str, weights)])})", []
+
+
+class PostgresSearchBackend(SearchBackend):
+    @property
+    def config(self):
+        return settings.SEARCH_POSTGRES_CONFIG
+
+    def remove(self, table, ids):
+        self.execute(f"DELETE FROM {table} WHERE id = ANY(%s)", [list(ids)])
+
+    def task_documents(self, ids):
+        sql = (
+            f"INSERT INTO {self.task_table} (id, document) "
+            "SELECT t.id, "
+            "setweight(to_tsvector(%s::regconfig, t.title), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, COALESCE(c.title, '')), 'B') || "
+            "setweight(to_tsvector(%s::regconfig, t.description), 'C') "
+            "FROM main_task t LEFT JOIN main_category c ON c.id = t.category_id"
+        )
+        return self.with_ids(sql, "t.id", ids, [self.config] * 3)
+
+    def comment_documents(self, ids):
+        sql = (
+            f"INSERT INTO {self.comment_table} (id, document) "
+            "SELECT c.id, to_tsvector(%s::regconfig, c.text) FROM main_comment c"
+        )
+        return self.with_ids(sql, "c.id", ids, [self.config])
+
+    @staticmethod
+    def with_ids(sql, column, ids, params):
+        if ids is None:
+            return sql, params
+        return f"{sql} WHERE {column} = ANY(%s)", [*params, list(ids)]
+
+    @staticmethod
+    def match(words):
+        return " & ".join(f"{word}:*" for word in words)
+
+    def condition(self, table, words):
+        return (
+            f"{table}.document @@ to_tsquery(%s::regconfig, %s)",
+            [self.config, self.match(words)],
+        )
+
+    def rank(self, table, words):
+        return (
+            f"ts_rank({table}.document, to_tsquery(%s::regconfig, %s))",
+            [self.config, self.match(words)],
+        )
+
+
+BACKENDS = {"sqlite": SqliteSearchBackend, "postgresql": PostgresSearchBackend}
+
+
+def backend_for(using):
+    """Бэкенд для базы using, не проверяя, создан ли индекс."""
+    backend_class = BACKENDS.get(connections[using].vendor)
+    return backend_class(using) if backend_class else None
+
+
+# Найденные бэкенды по базам. Отсутствие индекса не запоминается: процесс
+# мог запуститься до миграции, которая создаёт таблицы
+_search_backends = {}
+
+
+def get_search_backend(using="default"):
+    """Бэкенд, если индекс создан, иначе None."""
+    if using in _search_backends:
+        return _search_backends[using]
+    backend = backend_for(using)
+    if backend is None:
+        return None
+    tables = connections[using].introspection.table_names()
+    if backend.task_table not in tables:
+        return None
+    _search_backends[using] = backend
+    return backend
+
+
+def index_tasks(task_ids, using="default"):
+    backend = get_search_backend(using)
+    if backend is not None:
+        backend.index_tasks(list(task_ids))
+
+
+def index_comments(comment_ids, using="default"):
+    backend = get_search_backend(using)
+    if backend is not None:
+        backend.index_comments(list(comment_ids))
+
+
+def remove_tasks(task_ids, using="default"):
+    backend = get_search_backend(using)
+    if backend is not None:
+        backend.remove_tasks(list(task_ids))
+
+
+def remove_comments(comment_ids, using="default"):
+    backend = get_search_backend(using)
+    if backend is not None:
+        backend.remove_comments(list(comment_ids))
+
+
+def search(queryset, terms, order=True):
+    """SearchBackend.filter() или None, если индекса нет."""
+    backend = get_search_backend(queryset.db)
+    if backend is None:
+        return None
+    return backend.filter(queryset, terms, order)
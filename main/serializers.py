@@ -1,8 +1,14 @@
 from django.contrib.auth.models import User
+from django.db import models, transaction
 from django.utils import timezone
 from rest_framework import serializers
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
 
-from .models import Category, Comment, Task
+from .changes import tasks_changed
+from .events import task_change_type
+from .history import tracked_fields
+from .models import Category, Comment, Task, TaskCounter
+from .search import TASK_TEXT_FIELDS
 
 
 class RegisterSerializer(serializers.ModelSerializer):
@@ -45,14 +51,156 @@ class CategorySerializer(serializers.ModelSerializer):
         return value
 
 
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Берёт объекты из context["preloaded"], если списочный сериализатор
+    загрузил их заранее одним запросом, иначе ищет в базе как обычно."""
+
+    def to_internal_value(self, data):
+        objects = self.context.get("preloaded", {}).get(self.queryset.model)
+        if objects is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool) or not isinstance(data, (int, str)):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return objects[int(data)]
+        except (KeyError, ValueError):
+            self.fail("does_not_exist", pk_value=data)
+
+
+class TaskListSerializer(serializers.ListSerializer):
+    """Массовые создание и частичное обновление задач.
+
+    Пользователи и категории всех элементов загружаются заранее, задачи
+    пишутся через bulk_create/bulk_update вместе с историей, строки связи
+    с владельцами - одной вставкой. Ошибки возвращаются по каждому элементу.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.preload(data)
+        return super().to_internal_value(data)
+
+    def preload(self, data):
+        items = [item for item in data if isinstance(item, dict)]
+        user_ids = {pk for item in items for pk in self.pk_list(item.get("user_ids"))}
+        category_ids = set(self.pk_list([item.get("category") for item in items]))
+        self.context["preloaded"] = {
+            User: User.objects.only("id", "username").in_bulk(user_ids),
+            Category: Category.objects.in_bulk(category_ids),
+        }
+        if self.instance is not None:
+            task_ids = self.pk_list([item.get("id") for item in items])
+            self.instances = self.instance.in_bulk(task_ids)
+            self.validated_instances = []
+
+    @staticmethod
+    def pk_list(values):
+        if not isinstance(values, list):
+            return []
+        return [
+            int(value)
+            for value in values
+            if isinstance(value, int)
+            and not isinstance(value, bool)
+            or isinstance(value, str)
+            and value.isdigit()
+        ]
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+
+        task_ids = self.pk_list([data.get("id") if isinstance(data, dict) else None])
+        task = self.instances.get(task_ids[0]) if task_ids else None
+        if task is None:
+            raise serializers.ValidationError(
+                {"id": ["Задача не найдена или не принадлежит пользователю"]}
+            )
+        self.child.instance = task
+        self.child.initial_data = data
+        validated = super().run_child_validation(data)
+        self.validated_instances.append(task)
+        return validated
+
+    @transaction.atomic
+    def create(self, validated_data):
+        request = self.context["request"]
+        owners = [item.pop("users", None) or [request.user] for item in validated_data]
+        tasks = bulk_create_with_history(
+            [Task(**item) for item in validated_data],
+            Task,
+            default_user=request.user,
+        )
+        rows = self.set_owners(tasks, owners)
+        states = {task.pk: TaskCounter.state(task) for task in tasks}
+        tasks_changed(
+            {},
+            {pair: states[pair[0]] for pair in rows},
+            reindex=[task.pk for task in tasks],
+        )
+        return tasks
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        request = self.context["request"]
+        now = timezone.now()
+        fields = {"update_date"}
+        tasks, owners = [], []
+        for task, attrs in zip(self.validated_instances, validated_data):
+            users = attrs.pop("users", None)
+            if users is not None:
+                tasks.append(task)
+                owners.append(users)
+            for name, value in attrs.items():
+                setattr(task, name, value)
+                fields.add(name)
+            task.update_date = now
+
+        updated = self.validated_instances
+        task_ids = [task.pk for task in updated]
+        change_types = {task.pk: task_change_type(task) for task in updated}
+        before = TaskCounter.owned_states(task_ids)
+        bulk_update_with_history(
+            updated, Task, sorted(fields), default_user=request.user
+        )
+        if tasks:
+            Task.users.through.objects.filter(
+                task_id__in=[task.pk for task in tasks]
+            ).delete()
+            self.set_owners(tasks, owners)
+        text_changed = {
+            Task._meta.get_field(name).attname for name in fields
+        } & TASK_TEXT_FIELDS
+        tasks_changed(
+            before,
+            TaskCounter.owned_states(task_ids),
+            change_types,
+            reindex=task_ids if text_changed else [],
+        )
+        return updated
+
+    def set_owners(self, tasks, owners):
+        Through = Task.users.through
+        rows = {
+            (task.pk, user.pk) for task, users in zip(tasks, owners) for user in users
+        }
+        Through.objects.bulk_create(
+            Through(task_id=task_id, user_id=user_id) for task_id, user_id in rows
+        )
+        return rows
+
+
 class TaskSerializer(serializers.ModelSerializer):
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+
     users = UserSerializer(many=True, read_only=True)
-    user_ids = serializers.PrimaryKeyRelatedField(
+    user_ids = PreloadedPrimaryKeyRelatedField(
         queryset=User.objects.all(), many=True, write_only=True, source="users"
     )
 
     class Meta:
         model = Task
+        list_serializer_class = TaskListSerializer
         fields = (
             "id",
             "title",
@@ -102,6 +250,125 @@ class TaskSerializer(serializers.ModelSerializer):
         return value
 
 
+class TaskRowSerializer:
+    """Быстрая сериализация списка задач из строк .values().
+
+    Даёт тот же JSON, что и TaskSerializer(many=True), но без создания
+    объектов моделей и без обхода полей сериализатора для каждой строки:
+    задачи читаются одним запросом, владельцы всей страницы - вторым.
+    """
+
+    def __init__(self, serializer):
+        self.columns = []
+        self.converters = []
+        for field in serializer._readable_fields:
+            if field.field_name == "users":
+                continue
+            self.columns.append(field.field_name)
+            if isinstance(field, serializers.DateTimeField):
+                self.converters.append(field.to_representation)
+            else:
+                self.converters.append(None)
+        self.keys = [field.field_name for field in serializer._readable_fields]
+
+    def values(self, queryset):
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        owners = self.owners_queryset(rows)
+        return self.build(rows, owners)
+
+    async def ato_representation(self, rows):
+        rows = list(rows)
+        owners = [owner async for owner in self.owners_queryset(rows)]
+        return self.build(rows, owners)
+
+    def owners_queryset(self, rows):
+        return (
+            Task.users.through.objects.filter(task_id__in=[row["id"] for row in rows])
+            .order_by("id")
+            .values_list("task_id", "user_id", "user__username")
+        )
+
+    def build(self, rows, owner_rows):
+        owners = {row["id"]: [] for row in rows}
+        for task_id, user_id, username in owner_rows:
+            owners[task_id].append({"id": user_id, "username": username})
+
+        data = []
+        for row in rows:
+            item = {}
+            for column, convert in zip(self.columns, self.converters):
+                value = row[column]
+                item[column] = (
+                    value if convert is None or value is None else convert(value)
+                )
+            item["users"] = owners[row["id"]]
+            data.append({key: item[key] for key in self.keys})
+        return data
+
+
+class TaskHistoryDiffSerializer:
+    """Версии задачи с изменёнными полями, из строк .values() истории.
+
+    Версии идут от новых к старым; каждая сравнивается со следующей в
+    списке, последняя на странице - с версией previous, выбранной отдельно.
+    """
+
+    meta_columns = ("history_id", "history_date", "history_type", "history_user_id")
+
+    def __init__(self):
+        self.fields = []
+        for attname in tracked_fields(Task):
+            field = Task._meta.get_field(attname)
+            convert = None
+            if isinstance(field, models.DateTimeField):
+                convert = serializers.DateTimeField().to_representation
+            self.fields.append((field.name, attname, convert))
+        self.to_datetime = serializers.DateTimeField().to_representation
+
+    def values(self, queryset):
+        return queryset.values(
+            *self.meta_columns,
+            "history_user__username",
+            *(attname for _, attname, _ in self.fields),
+        )
+
+    def to_representation(self, rows, previous=None):
+        rows = list(rows)
+        data = []
+        for row, older in zip(rows, [*rows[1:], previous]):
+            if row["history_type"] == "+" or older is None:
+                older = {}
+            changes = []
+            if row["history_type"] != "-":
+                for name, attname, convert in self.fields:
+                    old, new = older.get(attname), row[attname]
+                    if older and old == new:
+                        continue
+                    if convert is not None:
+                        old = None if old is None else convert(old)
+                        new = None if new is None else convert(new)
+                    changes.append({"field": name, "old": old, "new": new})
+            user = None
+            if row["history_user_id"] is not None:
+                user = {
+                    "id": row["history_user_id"],
+                    "username": row["history_user__username"],
+                }
+            data.append(
+                {
+                    "history_id": row["history_id"],
+                    "history_date": self.to_datetime(row["history_date"]),
+                    "history_type": row["history_type"],
+                    "user": user,
+                    "changes": changes,
+                }
+            )
+        return data
+
+
 class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
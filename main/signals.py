@@ -0,0 +1,218 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_user_versions
+from .changes import tasks_changed
+from .events import publish_task_events, task_change_type
+from .history import changed_fields, has_tracked_changes
+from .models import Category, Comment, Task, TaskCounter, TaskState
+from .search import (
+    TASK_TEXT_FIELDS,
+    index_comments,
+    index_tasks,
+    remove_comments,
+    remove_tasks,
+)
+
+
+def task_owner_ids(task_id):
+    return list(
+        Task.users.through.objects.filter(task_id=task_id).values_list(
+            "user_id", flat=True
+        )
+    )
+
+
+def stored_state(task):
+    """Поля задачи для TaskCounter в том виде, в каком они сейчас в базе.
+
+    Нужна, только если у владельцев есть счётчики. Строка читается с
+    блокировкой до конца транзакции сохранения или удаления: параллельное
+    изменение той же задачи ждёт и считает разницу уже от этого состояния, а
+    не от загруженного в объект.
+    """
+    row = (
+        Task.objects.using(task._state.db)
+        .select_for_update()
+        .filter(pk=task.pk)
+        .values_list(*TaskState._fields)
+        .first()
+    )
+    return row and TaskState(*row)
+
+
+@receiver(pre_save, sender=Task)
+def task_changing(sender, instance, **kwargs):
+    # В post_save снимок полей уже обновлён историей, поэтому тип события
+    # определяется здесь. Сохранение без изменений событий не порождает.
+    instance._change_type = (
+        task_change_type(instance) if has_tracked_changes(instance) else None
+    )
+    instance._search_dirty = bool(changed_fields(instance) & TASK_TEXT_FIELDS)
+    instance._stored_state = (
+        stored_state(instance) if getattr(instance, "_counted", False) else None
+    )
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    owners = task_owner_ids(instance.pk)
+    # Новая задача попадает в счётчики и события из m2m_changed, когда
+    # ей назначат владельцев
+    before = None if created else getattr(instance, "_stored_state", None)
+    after = before and TaskCounter.state(instance)
+    tasks_changed(
+        {(instance.pk, user_id): before for user_id in owners},
+        {(instance.pk, user_id): after for user_id in owners},
+        {instance.pk: None if created else getattr(instance, "_change_type", None)},
+        reindex=(
+            [instance.pk] if created or getattr(instance, "_search_dirty", True) else []
+        ),
+    )
+
+
+@receiver(pre_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    # После удаления строк связи владельцев уже не узнать.
+    owners = task_owner_ids(instance.pk)
+    state = stored_state(instance) if TaskCounter.counted(owners) else None
+    tasks_changed({(instance.pk, user_id): state for user_id in owners}, {})
+
+
+@receiver(post_delete, sender=Task)
+def task_removed(sender, instance, **kwargs):
+    remove_tasks([instance.pk])
+
+
+@receiver(m2m_changed, sender=Task.users.through)
+def task_users_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Список владельцев входит в ответ API, поэтому меняется версия всех
+    # владельцев задачи, а не только добавленных или удалённых, и дата
+    # обновления задачи, по которой API отвечает 304.
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        task_ids = [instance.pk]
+    elif action == "pre_clear":
+        task_ids = list(
+            Task.users.through.objects.filter(user_id=instance.pk).values_list(
+                "task_id", flat=True
+            )
+        )
+    else:
+        task_ids = list(pk_set)
+
+    owners = set(
+        Task.users.through.objects.filter(task_id__in=task_ids).values_list(
+            "task_id", "user_id"
+        )
+    )
+    if reverse:
+        changed = {(task_id, instance.pk) for task_id in task_ids}
+    elif action == "pre_clear":
+        changed = set(owners)
+    else:
+        changed = {(instance.pk, user_id) for user_id in pk_set}
+    Task.objects.filter(pk__in=task_ids).update(update_date=timezone.now())
+
+    states = {
+        task_id: TaskState(*state)
+        for task_id, *state in Task.objects.filter(pk__in=task_ids).values_list(
+            "pk", *TaskState._fields
+        )
+    }
+    # Добавленным задача появляется, удалённым - исчезает, остальным
+    # владельцам приходит изменение списка владельцев
+    if action == "post_add":
+        before, after = owners - changed, owners
+    else:
+        before, after = owners | changed, owners - changed
+    tasks_changed(
+        {pair: states.get(pair[0]) for pair in before},
+        {pair: states.get(pair[0]) for pair in after},
+        dict.fromkeys(task_ids, "task.updated"),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, created=False, **kwargs):
+    if kwargs["signal"] is post_delete:
+        remove_comments([instance.pk])
+    else:
+        index_comments([instance.pk])
+    owners = task_owner_ids(instance.task_id)
+    bump_user_versions(owners)
+    if created:
+        publish_task_events(
+            "comment.added",
+            [(instance.task_id, user_id) for user_id in owners],
+            comment=instance.pk,
+        )
+
+
+@receiver(pre_save, sender=User)
+def user_renaming(sender, instance, update_fields=None, **kwargs):
+    instance._renamed = (
+        instance.pk is not None
+        and (update_fields is None or "username" in update_fields)
+        and User.objects.filter(pk=instance.pk)
+        .exclude(username=instance.username)
+        .exists()
+    )
+
+
+@receiver(post_save, sender=User)
+def user_renamed(sender, instance, **kwargs):
+    # Имя владельца входит в ответы API задач у всех владельцев его задач,
+    # а строки задач при переименовании не меняются
+    if getattr(instance, "_renamed", False):
+        bump_user_versions(
+            Task.users.through.objects.filter(
+                task_id__in=Task.users.through.objects.filter(user=instance).values(
+                    "task_id"
+                )
+            )
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    # filtered-tasks отбирает задачи по названию категории, а поиск
+    # индексирует его вместе с задачей
+    if not created:
+        bump_user_versions(
+            Task.users.through.objects.filter(task__category=instance)
+            .values_list("user_id", flat=True)
+            .distinct()
+        )
+        index_tasks(Task.objects.filter(category=instance).values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleting(sender, instance, **kwargs):
+    # У задач категория обнуляется без сигналов: запоминаем их до удаления
+    instance._affected_tasks = list(
+        Task.objects.filter(category=instance).values_list("pk", flat=True)
+    )
+    instance._affected_states = TaskCounter.owned_states(instance._affected_tasks)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    states = getattr(instance, "_affected_states", {})
+    tasks_changed(
+        states,
+        {pair: state._replace(category_id=None) for pair, state in states.items()},
+        reindex=getattr(instance, "_affected_tasks", ()),
+    )
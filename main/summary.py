@@ -0,0 +1,133 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Task, TaskCounter
+
+# Сводка /api/tasks/summary/ читается из TaskCounter: число запросов не
+# зависит от количества задач пользователя. Счётчики пользователя строятся
+# при первом чтении и дальше меняются на разницу (TaskCounter.apply_changes).
+
+DIMENSIONS = {
+    "status": "task__status",
+    "priority": "task__priority",
+    "category": "task__category_id",
+}
+
+
+def rebuild_counters(user_ids):
+    """Пересчитывает счётчики пользователей по задачам в базе."""
+    user_ids = list(user_ids)
+    # Пустая строка overdue фиксируется до пересчёта: с ней изменения задач
+    # этих пользователей берут её блокировку в apply_changes и ждут конца
+    # пересчёта, а не пропускают счётчики, которых ещё нет
+    TaskCounter.objects.bulk_create(
+        [TaskCounter(user_id=user_id, key=TaskCounter.OVERDUE) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+    with transaction.atomic():
+        overdue_rows = list(
+            TaskCounter.objects.select_for_update()
+            .filter(user_id__in=user_ids, key=TaskCounter.OVERDUE)
+            .order_by("user_id")
+        )
+        now = timezone.now()
+        owned = Task.users.through.objects.filter(user_id__in=user_ids)
+        counts = Counter({(user_id, "total"): 0 for user_id in user_ids})
+        for name, field in DIMENSIONS.items():
+            rows = owned.values_list("user_id", field).annotate(n=Count("id"))
+            for user_id, value, n in rows.order_by():
+                counts[user_id, f"{name}:{value or ''}"] = n
+                if name == "status":
+                    counts[user_id, "total"] += n
+        overdue = dict(
+            owned.filter(
+                task__status__in=TaskCounter.OPEN_STATUSES, task__due_date__lt=now
+            )
+            .values_list("user_id")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        # Строка overdue остаётся на месте: ожидающие её блокировки после
+        # пересчёта должны её найти
+        TaskCounter.objects.filter(user_id__in=user_ids).exclude(
+            key=TaskCounter.OVERDUE
+        ).delete()
+        TaskCounter.objects.bulk_create(
+            [
+                TaskCounter(user_id=user_id, key=key, count=n)
+                for (user_id, key), n in counts.items()
+            ]
+        )
+        for row in overdue_rows:
+            row.count = overdue.get(row.user_id, 0)
+            row.as_of = now
+        TaskCounter.objects.bulk_update(overdue_rows, ["count", "as_of"])
+
+
+def read_counters(user):
+    return {
+        key: (count, as_of)
+        for key, count, as_of in TaskCounter.objects.filter(user=user).values_list(
+            "key", "count", "as_of"
+        )
+    }
+
+
+def get_counters(user):
+    """{счётчик: значение} с просроченными на текущий момент."""
+    counters = read_counters(user)
+    while True:
+        # Пустой as_of - счётчики ещё строятся или их построение оборвалось
+        if counters.get(TaskCounter.OVERDUE, (0, None))[1] is None:
+            # Параллельные построения ждут друг друга на блокировке строки
+            # overdue, поэтому конфликтов вставки здесь нет
+            rebuild_counters([user.pk])
+            counters = read_counters(user)
+            continue
+        overdue, as_of = counters[TaskCounter.OVERDUE]
+        now = timezone.now()
+        # С прошлого чтения просроченными стали задачи со сроком в [as_of, now)
+        expired = Task.objects.filter(
+            users=user,
+            status__in=TaskCounter.OPEN_STATUSES,
+            due_date__gte=as_of,
+            due_date__lt=now,
+        ).count()
+        # as_of в условии: параллельное чтение уже могло учесть эти задачи
+        if TaskCounter.objects.filter(
+            user=user, key=TaskCounter.OVERDUE, as_of=as_of
+        ).update(count=F("count") + expired, as_of=now):
+            counters[TaskCounter.OVERDUE] = (overdue + expired, now)
+            return {key: count for key, (count, _) in counters.items()}
+        counters = read_counters(user)
+
+
+def get_summary(user):
+    counters = get_counters(user)
+    summary = {
+        "total": counters.get("total", 0),
+        "overdue": counters[TaskCounter.OVERDUE],
+        "status": {value: 0 for value, _ in Task.STATUS_CHOICES},
+        "priority": {value: 0 for value, _ in Task.PRIORITY_CHOICES},
+        # Задачи без категории - с id None
+        "category": [],
+    }
+    for key, count in counters.items():
+        name, _, value = key.partition(":")
+        if name not in DIMENSIONS or not count:
+            continue
+        if name == "category":
+            summary["category"].append(
+                {"id": int(value) if value else None, "count": count}
+            )
+        elif name == "priority":
+            summary["priority"][int(value)] = count
+        else:
+            summary["status"][value] = count
+    summary["category"].sort(
+        key=lambda item: (-item["count"], item["id"] is not None, item["id"])
+    )
+    return summary
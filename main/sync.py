@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Comment, Task, TaskTombstone
+from .pagination import Keyset
+from .serializers import CommentSerializer, TaskRowSerializer, TaskSerializer
+
+# Выгрузка изменений для /api/sync/. Токен хранит момент, до которого
+# клиент получил данные; следующая синхронизация отдаёт то, что изменилось
+# после него. Изменения читаются по update_date/updated_at, удаления - из
+# TaskTombstone и истории комментариев.
+
+SYNC_SALT = "main.sync"
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def dump_token(moment):
+    return signing.dumps(moment.isoformat(), salt=SYNC_SALT)
+
+
+def load_token(token):
+    try:
+        return datetime.fromisoformat(signing.loads(token, salt=SYNC_SALT))
+    except (signing.BadSignature, TypeError, ValueError) as exc:
+        raise InvalidSyncToken(token) from exc
+
+
+def sync_horizon():
+    """Самый старый токен, с которого ещё можно продолжить: отметки об
+    удалении старше SYNC_TOMBSTONE_DAYS удаляет purge_history."""
+    return timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+
+
+class DeltaSync:
+    """Изменения задач пользователя в промежутке (since, until].
+
+    Данные отдаются по этапам: задачи, комментарии, удалённые задачи,
+    удалённые комментарии. Курсор хранит этап и позицию в нём, поэтому
+    все страницы одной синхронизации читают один и тот же промежуток.
+    """
+
+    phases = ("tasks", "comments", "deleted_tasks", "deleted_comments")
+
+    def __init__(self, user, since, until):
+        self.user = user
+        self.since = since
+        self.until = until
+
+    @classmethod
+    def start(cls, user, token=None):
+        since = load_token(token) if token else None
+        # Строки из ещё не зафиксированных транзакций получают время раньше
+        # момента синхронизации: промежуток заканчивается на SYNC_SAFETY_LAG
+        # секунд раньше, и запаса должно хватать на самую долгую транзакцию
+        # записи (см. config/settings.py).
+        until = timezone.now() - timedelta(seconds=settings.SYNC_SAFETY_LAG)
+        if since is not None:
+            until = max(until, since)
+        return cls(user, since, until)
+
+    @classmethod
+    def resume(cls, user, cursor):
+        try:
+            state = signing.loads(cursor, salt=SYNC_SALT)
+            if state["phase"] not in cls.phases:
+                raise ValueError(state["phase"])
+            since = state["since"] and datetime.fromisoformat(state["since"])
+            sync = cls(user, since, datetime.fromisoformat(state["until"]))
+            return sync, state["phase"], state["after"]
+        except (signing.BadSignature, KeyError, TypeError, ValueError) as exc:
+            raise InvalidSyncToken(cursor) from exc
+
+    def cursor(self, phase, after):
+        return signing.dumps(
+            {
+                "since": self.since and self.since.isoformat(),
+                "until": self.until.isoformat(),
+                "phase": phase,
+                "after": after,
+            },
+            salt=SYNC_SALT,
+        )
+
+    def page(self, phase=None, after=None, page_size=None):
+        """Возвращает (данные страницы, курсор следующей или None).
+
+        Страница вмещает page_size записей всех этапов вместе; на последней
+        в данных есть token для следующей синхронизации.
+        """
+        remaining = page_size or settings.SYNC_PAGE_SIZE
+        data = {name: [] for name in self.phases}
+        first = self.phases.index(phase) if phase else 0
+        for name in self.phases[first:]:
+            if not remaining:
+                return data, self.cursor(name, None)
+            queryset, keyset, represent = getattr(self, name)()
+            if queryset is not None:
+                items, next_cursor, _ = keyset.paginate(queryset, after, remaining)
+                data[name] = represent(items)
+                if next_cursor:
+                    return data, self.cursor(name, next_cursor)
+                remaining -= len(items)
+            after = None
+        data["token"] = dump_token(self.until)
+        return data, None
+
+    def period(self, field):
+        condition = Q(**{f"{field}__lte": self.until})
+        if self.since is not None:
+            condition &= Q(**{f"{field}__gt": self.since})
+        return condition
+
+    def owned_task_ids(self):
+        return Task.users.through.objects.filter(user=self.user).values("task_id")
+
+    def tasks(self):
+        rows = TaskRowSerializer(TaskSerializer())
+        queryset = rows.values(
+            Task.objects.filter(self.period("update_date"), users=self.user)
+        )
+        return queryset, Keyset(("update_date", "id")), rows.to_representation
+
+    def comments(self):
+        # Комментарии задачи, которая только что появилась у пользователя,
+        # старше токена: они приходят вместе с изменённой задачей.
+        queryset = Comment.objects.filter(task_id__in=self.owned_task_ids()).filter(
+            self.period("updated_at") | self.period("task__update_date")
+        )
+
+        def represent(items):
+            return CommentSerializer(items, many=True).data
+
+        return queryset, Keyset(("updated_at", "id")), represent
+
+    def deleted_tasks(self):
+        if self.since is None:
+            return None, None, None
+        # Задача, которую пользователю вернули, придёт среди изменённых
+        queryset = (
+            TaskTombstone.objects.filter(self.period("removed_at"), user=self.user)
+            .exclude(task_id__in=self.owned_task_ids())
+            .values("id", "task_id", "removed_at")
+        )
+
+        def represent(items):
+            return list(dict.fromkeys(item["task_id"] for item in items))
+
+        return queryset, Keyset(("removed_at", "id")), represent
+
+    def deleted_comments(self):
+        if self.since is None:
+            return None, None, None
+        # Комментарии удалённых задач клиент убирает вместе с задачей
+        queryset = Comment.history.filter(
+            self.period("history_date"),
+            history_type="-",
+            task_id__in=self.owned_task_ids(),
+        ).values("history_id", "history_date", "id")
+
+        def represent(items):
+            return [item["id"] for item in items]
+
+        return queryset, Keyset(("history_date", "history_id")), represent
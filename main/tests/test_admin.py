@@ -0,0 +1,124 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import Category, Comment, Task
+from ..pagination import (
+    ApproximateCountHistoricalQuerySet,
+    ApproximateCountPaginator,
+    approximate_count,
+    table_row_estimate,
+)
+
+
+class ApproximateCountTests(TestCase):
+    def setUp(self):
+        self.tasks = [
+            Task.objects.create(
+                title=f"Задача {i}",
+                description="",
+                due_date=timezone.now(),
+                status="pending" if i < 2 else "completed",
+            )
+            for i in range(10)
+        ]
+
+    def test_sqlite_estimate_ignores_partial_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("sqlite_stat1")
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        # В частичном task_open_status_due_idx только две открытые задачи
+        self.assertEqual(table_row_estimate(Task), 10)
+
+    @override_settings(ADMIN_APPROXIMATE_COUNT_THRESHOLD=5)
+    def test_whole_table_uses_estimate(self):
+        with mock.patch("main.pagination.table_row_estimate", return_value=1000):
+            self.assertEqual(approximate_count(Task.objects.all()), 1000)
+            # С фильтром оценка таблицы не подходит
+            self.assertEqual(
+                approximate_count(Task.objects.filter(status="completed")), 8
+            )
+
+    def test_small_result_is_exact(self):
+        with mock.patch("main.pagination.table_row_estimate", return_value=1000):
+            self.assertEqual(approximate_count(Task.objects.all()), 10)
+
+
+class AdminPaginationTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", password="secret")
+        self.client.force_login(self.admin)
+        self.task = Task.objects.create(
+            title="Задача", description="", due_date=timezone.now()
+        )
+        self.task.title = "Переименованная"
+        self.task.save()
+
+    def test_changelist(self):
+        response = self.client.get("/admin/main/task/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(
+            response.context["cl"].paginator, ApproximateCountPaginator
+        )
+
+    def test_history_view(self):
+        with mock.patch(
+            "main.pagination.approximate_count", wraps=approximate_count
+        ) as counted:
+            response = self.client.get(f"/admin/main/task/{self.task.pk}/history/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["page_obj"].object_list), 2)
+        self.assertIsInstance(
+            counted.call_args.args[0], ApproximateCountHistoricalQuerySet
+        )
+
+
+class ChangelistQueryTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", password="secret")
+        self.client.force_login(self.admin)
+        self.users = [User.objects.create_user(f"user{i}") for i in range(3)]
+
+    def add_rows(self, count):
+        for _ in range(count):
+            i = Category.objects.count()
+            category = Category.objects.create(title=f"Категория {i}")
+            task = Task.objects.create(
+                title=f"Задача {i}",
+                description="",
+                due_date=timezone.now(),
+                category=category,
+            )
+            task.users.add(*self.users)
+            Comment.objects.create(task=task, user=self.users[0], text="Текст")
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        urls = ("/admin/main/task/", "/admin/main/category/", "/admin/main/comment/")
+        self.add_rows(2)
+        few = [self.queries(url) for url in urls]
+        self.add_rows(10)
+        self.assertEqual([self.queries(url) for url in urls], few)
+
+    def test_category_task_count_is_sortable(self):
+        self.add_rows(1)
+        busy = Category.objects.create(title="Занятая")
+        for i in range(2):
+            Task.objects.create(
+                title=f"Ещё {i}", description="", due_date=timezone.now(), category=busy
+            )
+        response = self.client.get("/admin/main/category/", {"o": "-2"})
+        rows = response.context["cl"].result_list
+        self.assertEqual(
+            [(row.title, row.tasks_total) for row in rows][0], ("Занятая", 2)
+        )
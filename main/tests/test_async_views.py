@@ -0,0 +1,103 @@
+import asyncio
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from ..cache import bump_user_versions
+from ..models import Task
+
+
+@override_settings(ASYNC_LONG_POLL_MAX_WAIT=0.2, ASYNC_LONG_POLL_INTERVAL=0.01)
+class AsyncTaskViewsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob")
+        self.token = Token.objects.create(user=self.user)
+        now = timezone.now()
+        self.overdue = self.create_task("Просроченная", now - timedelta(days=1))
+        self.upcoming = self.create_task("Будущая", now + timedelta(days=1))
+        self.create_task("Чужая", now, users=[User.objects.create_user("alice")])
+
+    def create_task(self, title, due_date, users=None):
+        task = Task.objects.create(title=title, description="", due_date=due_date)
+        task.users.add(*(users or [self.user]))
+        return task
+
+    async def get(self, path, params=None, etag=None):
+        headers = {"Authorization": f"Token {self.token.key}"}
+        if etag:
+            headers["If-None-Match"] = etag
+        return await AsyncClient().get(path, params, headers=headers)
+
+    async def test_list_and_detail(self):
+        response = await self.get("/api/async/tasks/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [task["title"] for task in response.json()["results"]],
+            ["Просроченная", "Будущая"],
+        )
+        response = await self.get("/api/async/tasks/overdue/")
+        self.assertEqual(
+            [task["id"] for task in response.json()["results"]], [self.overdue.pk]
+        )
+        response = await self.get(f"/api/async/tasks/{self.upcoming.pk}/")
+        self.assertEqual(response.json()["title"], "Будущая")
+
+    async def test_errors(self):
+        anonymous = await AsyncClient().get("/api/async/tasks/")
+        self.assertEqual(anonymous.status_code, 401)
+        foreign = await Task.objects.aget(title="Чужая")
+        response = await self.get(f"/api/async/tasks/{foreign.pk}/")
+        self.assertEqual(response.status_code, 404)
+        response = await self.get("/api/async/tasks/", {"due_date": "вчера"})
+        self.assertEqual(response.status_code, 400)
+        response = await self.get("/api/async/tasks/", {"cursor": "мусор"})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_not_modified_until_write(self):
+        first = await self.get("/api/async/tasks/")
+        etag = first["ETag"]
+        response = await self.get("/api/async/tasks/", {"wait": 5}, etag)
+        # Ожидание ограничено ASYNC_LONG_POLL_MAX_WAIT
+        self.assertEqual(response.status_code, 304)
+
+        async def write():
+            await asyncio.sleep(0.05)
+            await sync_to_async(bump_user_versions)([self.user.pk])
+
+        response, _ = await asyncio.gather(
+            self.get("/api/async/tasks/", {"wait": 5}, etag),
+            write(),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    async def test_overdue_etag_expires_with_next_due_date(self):
+        first = await self.get("/api/async/tasks/overdue/")
+        await Task.objects.filter(pk=self.upcoming.pk).aupdate(
+            due_date=timezone.now() - timedelta(seconds=1)
+        )
+        # Запись без сигналов версию не меняет, но срок уже наступил
+        response = await self.get("/api/async/tasks/overdue/", etag=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+
+class AsyncExportTests(TestCase):
+    async def test_csv_export_is_async_stream(self):
+        admin = await User.objects.acreate_user(
+            "admin", password="secret", is_staff=True, is_superuser=True
+        )
+        await Task.objects.acreate(
+            title="Задача", description="", due_date=timezone.now(), priority=3
+        )
+        client = AsyncClient()
+        await client.aforce_login(admin)
+        response = await client.get("/admin/main/task/export-stream/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response])
+        self.assertIn("Задача".encode(), content)
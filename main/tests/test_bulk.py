@@ -0,0 +1,148 @@
+from collections import defaultdict
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..cache import get_user_version
+from ..models import Task, TaskTombstone
+from ..search import search
+from ..summary import get_summary, rebuild_counters
+
+
+class BulkTests(TestCase):
+    """Массовые операции дают те же побочные эффекты, что и сигналы."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("bob")
+        self.other = User.objects.create_user("eve")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.due = timezone.now() - timedelta(days=1)
+        self.task = Task.objects.create(
+            title="Старая", description="", due_date=self.due
+        )
+        self.task.users.add(self.user)
+        get_summary(self.user)
+        get_summary(self.other)
+        self.events = defaultdict(set)
+        patcher = mock.patch(
+            "main.changes.publish_task_events",
+            lambda event_type, owners: self.events[event_type].update(owners),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertCountersRebuilt(self):
+        for user in (self.user, self.other):
+            summary = get_summary(user)
+            rebuild_counters([user.pk])
+            self.assertEqual(summary, get_summary(user))
+
+    def test_create(self):
+        versions = get_user_version(self.user.pk), get_user_version(self.other.pk)
+        due = timezone.now() + timedelta(days=1)
+        response = self.client.post(
+            "/api/tasks/bulk/",
+            [
+                {
+                    "title": "Отчет",
+                    "description": "Квартальный",
+                    "due_date": due,
+                    "user_ids": [self.user.pk, self.other.pk],
+                },
+                {
+                    "title": "План",
+                    "description": "Годовой",
+                    "due_date": due,
+                    "user_ids": [self.user.pk],
+                },
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        report, plan = (item["id"] for item in response.data)
+
+        self.assertEqual(
+            self.events["task.created"],
+            {(report, self.user.pk), (report, self.other.pk), (plan, self.user.pk)},
+        )
+        self.assertNotEqual(
+            versions, (get_user_version(self.user.pk), get_user_version(self.other.pk))
+        )
+        self.assertEqual(
+            list(search(Task.objects.all(), ["отч"]).values_list("pk", flat=True)),
+            [report],
+        )
+        self.assertEqual(get_summary(self.other)["total"], 1)
+        self.assertCountersRebuilt()
+
+    def test_update_with_owner_change(self):
+        kept = Task.objects.create(title="Общая", description="", due_date=self.due)
+        kept.users.add(self.user, self.other)
+        version = get_user_version(self.other.pk)
+        self.events.clear()
+        response = self.client.patch(
+            "/api/tasks/bulk/",
+            [
+                {"id": self.task.pk, "title": "Новая", "user_ids": [self.other.pk]},
+                {"id": kept.pk, "status": "completed"},
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.events["task.deleted"], {(self.task.pk, self.user.pk)})
+        self.assertEqual(self.events["task.created"], {(self.task.pk, self.other.pk)})
+        self.assertEqual(
+            self.events["task.completed"],
+            {(kept.pk, self.user.pk), (kept.pk, self.other.pk)},
+        )
+        self.assertEqual(
+            list(TaskTombstone.objects.values_list("task_id", "user_id")),
+            [(self.task.pk, self.user.pk)],
+        )
+        self.assertNotEqual(version, get_user_version(self.other.pk))
+        self.assertEqual(
+            list(search(Task.objects.all(), ["новая"]).values_list("pk", flat=True)),
+            [self.task.pk],
+        )
+        summary = get_summary(self.other)
+        self.assertEqual((summary["total"], summary["overdue"]), (2, 1))
+        self.assertCountersRebuilt()
+
+    def test_complete(self):
+        response = self.client.post(
+            "/api/tasks/bulk-complete/", {"ids": [self.task.pk]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.events["task.completed"], {(self.task.pk, self.user.pk)})
+        self.assertEqual(get_summary(self.user)["status"]["completed"], 1)
+        self.assertCountersRebuilt()
+
+
+class CompleteTests(TestCase):
+    def setUp(self):
+        self.tasks = [
+            Task.objects.create(title=title, description="", due_date=timezone.now())
+            for title in ("Первая", "Вторая")
+        ]
+
+    def test_returns_only_own_completions(self):
+        # Параллельное завершение в ту же микросекунду не попадает в ответ
+        now = timezone.now()
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            first = Task.objects.filter(pk=self.tasks[0].pk).complete()
+            second = Task.objects.filter(pk__in=[t.pk for t in self.tasks]).complete()
+        self.assertEqual([task.pk for task in first], [self.tasks[0].pk])
+        self.assertEqual([task.pk for task in second], [self.tasks[1].pk])
+        self.assertEqual(Task.objects.filter(status="completed").count(), 2)
+
+    def test_repeat_is_noop(self):
+        tasks = Task.objects.filter(pk=self.tasks[0].pk)
+        self.assertEqual(len(tasks.complete()), 1)
+        self.assertEqual(tasks.complete(), [])
+        self.assertEqual(self.tasks[0].history.filter(status="completed").count(), 1)
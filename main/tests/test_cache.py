@@ -0,0 +1,136 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Category, Comment, Task
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob")
+        self.other = User.objects.create_user("eve")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = Category.objects.create(title="Работа")
+        self.task = Task.objects.create(
+            title="Общая",
+            description="",
+            due_date=timezone.now(),
+            category=self.category,
+        )
+        self.task.users.add(self.user, self.other)
+
+    def get(self, url, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def test_not_modified(self):
+        for url in ("/api/tasks/", f"/api/tasks/{self.task.pk}/"):
+            etag = self.get(url)["ETag"]
+            self.assertEqual(self.get(url, etag).status_code, 304)
+
+    def test_comments(self):
+        comment = Comment.objects.create(task=self.task, user=self.other, text="Да")
+        url = f"/api/comments/{comment.pk}/"
+        response = self.get(url)
+        self.assertIn("Last-Modified", response)
+        self.assertEqual(self.get(url, response["ETag"]).status_code, 304)
+
+        etag = self.get("/api/comments/")["ETag"]
+        self.assertNotIn("Last-Modified", self.get("/api/comments/"))
+        comment.text = "Нет"
+        comment.save()
+        self.assertEqual(self.get("/api/comments/", etag).status_code, 200)
+
+    def test_owner_rename(self):
+        url = f"/api/tasks/{self.task.pk}/"
+        etag = self.get(url)["ETag"]
+        self.other.username = "eva"
+        self.other.save()
+
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("eva", [user["username"] for user in response.data["users"]])
+
+    def test_category_rename(self):
+        etag = self.get("/api/tasks/")["ETag"]
+        self.category.title = "Дом"
+        self.category.save()
+        self.assertEqual(self.get("/api/tasks/", etag).status_code, 200)
+
+    def test_login_keeps_versions(self):
+        etag = self.get("/api/tasks/")["ETag"]
+        self.other.last_login = timezone.now()
+        self.other.save(update_fields=["last_login"])
+        self.assertEqual(self.get("/api/tasks/", etag).status_code, 304)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        # Кэш не откатывается вместе с базой, а id пользователей повторяются
+        cache.clear()
+        self.user = User.objects.create_user("bob")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_task(self, title, **kwargs):
+        task = Task.objects.create(
+            title=title,
+            description="",
+            due_date=timezone.now() + timedelta(days=1),
+            **kwargs,
+        )
+        task.users.add(self.user)
+        return task
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [task["id"] for task in response.data["results"]]
+
+    def test_filtered_tasks_follow_writes(self):
+        urgent = self.create_task("Срочная", priority=4)
+        self.create_task("Завершённая", priority=4, status="completed")
+        url = "/api/tasks/filtered-tasks/"
+        self.assertEqual(self.ids(url), [urgent.pk])
+
+        easy = self.create_task("Лёгкая", priority=1)
+        self.assertEqual(sorted(self.ids(url)), sorted([urgent.pk, easy.pk]))
+        urgent.status = "completed"
+        urgent.save()
+        self.assertEqual(self.ids(url), [easy.pk])
+
+    def test_repeated_list_is_served_from_cache(self):
+        self.create_task("Первая")
+        url = "/api/tasks/?status=pending&priority=2"
+        etag = self.client.get(url)["ETag"]
+        # Тот же запрос с другим порядком параметров - то же значение кэша
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/tasks/?priority=2&status=pending")
+            self.assertEqual(response["ETag"], etag)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_co_owner_write_invalidates(self):
+        other = User.objects.create_user("eve")
+        task = self.create_task("Общая")
+        task.users.add(other)
+        self.assertEqual(self.ids("/api/tasks/"), [task.pk])
+
+        client = APIClient()
+        client.force_authenticate(other)
+        response = client.patch(f"/api/tasks/{task.pk}/", {"title": "Переименована"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get("/api/tasks/")
+        self.assertEqual(response.data["results"][0]["title"], "Переименована")
+
+    def test_users_do_not_share_entries(self):
+        self.create_task("Своя")
+        self.ids("/api/tasks/")
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("eve"))
+        self.assertEqual(client.get("/api/tasks/").data["results"], [])
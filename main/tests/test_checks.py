@@ -0,0 +1,43 @@
+import os
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import check_shared_state, raise_for_shared_state
+from ..events import get_broker
+
+LOCAL_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+DUMMY_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+
+@override_settings(
+    CACHES=LOCAL_CACHE, TASK_EVENTS_BACKEND="main.events.InProcessBroker"
+)
+class SharedStateCheckTests(SimpleTestCase):
+    def setUp(self):
+        # Брокер создаётся один раз на процесс, а настройки здесь меняются
+        get_broker.cache_clear()
+        self.addCleanup(get_broker.cache_clear)
+
+    def ids(self, workers):
+        with mock.patch.dict(os.environ, {"UVICORN_WORKERS": str(workers)}):
+            return [error.id for error in check_shared_state()]
+
+    def test_single_worker(self):
+        self.assertEqual(self.ids(1), [])
+
+    def test_process_local_state(self):
+        self.assertEqual(self.ids(4), ["main.E002", "main.E003"])
+
+    @override_settings(TASK_EVENTS_BACKEND="main.events.CacheBroker")
+    def test_broker_needs_atomic_cache(self):
+        self.assertEqual(self.ids(4), ["main.E002"])
+        get_broker.cache_clear()
+        with override_settings(CACHES=DUMMY_CACHE):
+            self.assertEqual(self.ids(1), ["main.E001"])
+
+    def test_asgi_startup_raises(self):
+        with mock.patch.dict(os.environ, {"WEB_CONCURRENCY": "2"}):
+            with self.assertRaisesMessage(ImproperlyConfigured, "main.E002"):
+                raise_for_shared_state()
@@ -0,0 +1,108 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Category, Task
+
+
+class BenchmarkIndexesTests(TestCase):
+    def test_plans_use_indexes(self):
+        out = StringIO()
+        call_command(
+            "benchmark_indexes",
+            "--seed",
+            "--database=default",
+            "--tasks=2000",
+            "--users=20",
+            "--repeat=1",
+            stdout=out,
+        )
+        self.assertNotIn("индексы: нет", out.getvalue())
+
+
+class TasksStatsTests(TestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user("bob")
+        self.alice = User.objects.create_user("alice")
+        work = Category.objects.create(title="Работа")
+        now = timezone.now()
+        rows = [
+            ("pending", now - timedelta(days=1), work, 1, [self.bob]),
+            ("in_progress", now + timedelta(days=1), work, 3, [self.bob, self.alice]),
+            ("completed", now - timedelta(days=1), None, 3, [self.alice]),
+        ]
+        self.tasks = []
+        for status, due_date, category, priority, users in rows:
+            task = Task.objects.create(
+                title=status,
+                description="",
+                status=status,
+                due_date=due_date,
+                category=category,
+                priority=priority,
+            )
+            task.users.add(*users)
+            self.tasks.append(task)
+
+    def stats(self, *args):
+        out = StringIO()
+        call_command("tasks_stats", "--format=json", *args, stdout=out)
+        return json.loads(out.getvalue())
+
+    def test_totals(self):
+        with self.assertNumQueries(1):
+            report = self.stats()
+        self.assertEqual(
+            report,
+            {
+                "total": 3,
+                "pending": 1,
+                "in_progress": 1,
+                "completed": 1,
+                # Завершённая задача с прошедшим сроком не просрочена
+                "overdue": 1,
+            },
+        )
+
+    def test_partition_is_one_query(self):
+        with self.assertNumQueries(1):
+            report = self.stats("--by=category")
+        self.assertEqual(report["total"], 3)
+        self.assertEqual(
+            [(row["category"], row["total"]) for row in report["by_category"]],
+            [(None, 1), ("Работа", 2)],
+        )
+
+    def test_by_user_counts_shared_task_once_in_total(self):
+        report = self.stats("--by=user")
+        self.assertEqual(report["total"], 3)
+        self.assertEqual(
+            [(row["user"], row["total"]) for row in report["by_user"]],
+            [("alice", 2), ("bob", 2)],
+        )
+
+    def test_since(self):
+        Task.objects.filter(pk=self.tasks[0].pk).update(
+            creation_date=timezone.now() - timedelta(days=10)
+        )
+        since = (timezone.localdate() - timedelta(days=1)).isoformat()
+        self.assertEqual(self.stats(f"--since={since}")["total"], 2)
+        with self.assertRaises(CommandError):
+            self.stats("--since=вчера")
+
+    def test_csv(self):
+        out = StringIO()
+        call_command("tasks_stats", "--format=csv", "--by=priority", stdout=out)
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [
+                "priority,total,pending,in_progress,completed,overdue",
+                "1,1,1,0,0,1",
+                "3,2,0,1,1,0",
+            ],
+        )
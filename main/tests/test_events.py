@@ -0,0 +1,97 @@
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from ..async_views import event_stream
+from ..events import (
+    SEQ_BITS,
+    CacheBroker,
+    event_key,
+    format_event_id,
+    get_broker,
+    position_key,
+    split_position,
+)
+
+USER = 7
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    TASK_EVENTS_BACKEND="main.events.CacheBroker",
+    TASK_EVENTS_BUFFER=10,
+)
+class CacheBrokerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        get_broker.cache_clear()
+        self.addCleanup(get_broker.cache_clear)
+        self.broker = CacheBroker()
+
+    def publish(self, *types):
+        self.broker.publish((USER, {"type": event_type}) for event_type in types)
+
+    def read(self, last_event_id):
+        return async_to_sync(self.broker.read)(USER, last_event_id)
+
+    def test_numbers_follow_generation(self):
+        _, _, start = self.read(None)
+        generation, seq = start.split("-")
+        self.publish("a", "b", "c")
+        events, reset, current = self.read(start)
+        self.assertFalse(reset)
+        self.assertEqual(current, format_event_id(generation, int(seq) + 3))
+        self.assertEqual([event["type"] for _, event in events], ["a", "b", "c"])
+
+    def test_resume_skips_seen_events(self):
+        _, _, start = self.read(None)
+        self.publish("a", "b")
+        events, _, _ = self.read(start)
+        seen = events[0][0]
+        self.publish("c")
+        events, reset, _ = self.read(seen)
+        self.assertFalse(reset)
+        self.assertEqual([event["type"] for _, event in events], ["b", "c"])
+
+    def test_wrap_around_starts_new_generation(self):
+        generation = 5
+        last = (generation << SEQ_BITS) | ((1 << SEQ_BITS) - 1)
+        cache.set(position_key(USER), last, None)
+        old_id = format_event_id(*split_position(last))
+        self.publish("a")
+        # Переполнение номера переносится в поколение: клиент начинает заново
+        events, reset, current = self.read(old_id)
+        self.assertTrue(reset)
+        self.assertEqual(current, format_event_id(f"{generation + 1:08x}", 0))
+
+    def test_evicted_position_resets(self):
+        self.publish("a")
+        _, _, current = self.read(None)
+        cache.delete(position_key(USER))
+        self.publish("b")
+        events, reset, new_id = self.read(current)
+        self.assertTrue(reset)
+        self.assertNotEqual(new_id.split("-")[0], current.split("-")[0])
+
+    def test_evicted_event_resets(self):
+        _, _, start = self.read(None)
+        self.publish("a", "b")
+        generation, seq = start.split("-")
+        cache.delete(event_key(USER, generation, int(seq) + 1))
+        events, reset, _ = self.read(start)
+        self.assertEqual((events, reset), ([], True))
+
+    def test_stream_resumes_after_last_event_id(self):
+        self.publish("a", "b", "c")
+        generation, seq = split_position(cache.get(position_key(USER)))
+        stream = event_stream(USER, format_event_id(generation, seq - 2))
+
+        async def take(count):
+            return [await anext(stream) for _ in range(count)]
+
+        messages = async_to_sync(take)(3)
+        self.assertTrue(messages[0].startswith("retry:"))
+        self.assertIn(
+            f"id: {format_event_id(generation, seq - 1)}\nevent: b", messages[1]
+        )
+        self.assertIn(f"id: {format_event_id(generation, seq)}\nevent: c", messages[2])
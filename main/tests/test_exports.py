@@ -0,0 +1,143 @@
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from ..export_jobs import JobLost, claim_next_job, job_path, run_job
+from ..models import ExportJob, Task
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", password="secret")
+        self.client.force_login(self.admin)
+        for i in range(3):
+            # TaskResource выгружает только задачи с приоритетом от 3
+            task = Task.objects.create(
+                title=f"Задача {i}",
+                description="",
+                due_date=timezone.now(),
+                priority=3,
+            )
+            task.users.add(self.admin)
+
+    def test_csv_is_streamed(self):
+        response = self.client.get(reverse("admin:main_task_export_stream"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode("utf-8")
+        self.assertTrue(content.startswith("\ufeff"))
+        # Заголовок и три задачи
+        self.assertEqual(len(content.splitlines()), 4)
+        self.assertIn("Задача 2", content)
+
+    def test_csv_keeps_changelist_filters(self):
+        Task.objects.filter(title="Задача 0").update(status="completed")
+        response = self.client.get(
+            reverse("admin:main_task_export_stream") + "?status__exact=completed"
+        )
+        content = b"".join(response.streaming_content).decode("utf-8")
+        self.assertEqual(len(content.splitlines()), 2)
+        self.assertIn("Задача 0", content)
+
+    def test_xlsx_goes_through_export_job(self):
+        response = self.client.post(
+            reverse("admin:main_task_export_job"), {"file_format": "xlsx"}
+        )
+        self.assertRedirects(response, reverse("admin:main_exportjob_changelist"))
+        job = ExportJob.objects.get()
+        self.assertEqual((job.file_format, job.status), ("xlsx", "pending"))
+
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(EXPORT_JOBS_DIR=directory):
+                job.status = "running"
+                job.claim = "test"
+                job.save()
+                run_job(job, chunk_size=2)
+                self.assertEqual(job.status, "done")
+                sheet = load_workbook(job_path(job), read_only=True).active
+                self.assertEqual(len(list(sheet.values)), 4)
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", password="secret")
+        for i in range(5):
+            Task.objects.create(
+                title=f"Задача {i}",
+                description="",
+                due_date=timezone.now(),
+                priority=3,
+            )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(EXPORT_JOBS_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create_job(self, file_format="csv"):
+        return ExportJob.objects.create(created_by=self.admin, file_format=file_format)
+
+    def csv_rows(self, job):
+        return job_path(job).read_text(encoding="utf-8").splitlines()
+
+    def test_command_runs_queue(self):
+        csv_job, xlsx_job = self.create_job(), self.create_job("xlsx")
+        out = StringIO()
+        call_command("run_export_jobs", "--once", "--chunk-size=2", stdout=out)
+        csv_job.refresh_from_db()
+        xlsx_job.refresh_from_db()
+        self.assertEqual((csv_job.status, xlsx_job.status), ("done", "done"))
+        self.assertEqual((csv_job.processed_rows, csv_job.total_rows), (5, 5))
+        self.assertEqual(len(self.csv_rows(csv_job)), 6)
+        self.assertIn("4/5", out.getvalue())
+
+    def test_resumes_from_last_chunk(self):
+        self.create_job()
+        job = claim_next_job(stale_after=300)
+
+        def crash(job):
+            raise RuntimeError("сбой")
+
+        with self.assertRaises(RuntimeError):
+            run_job(job, chunk_size=2, on_chunk=crash)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_rows), ("running", 2))
+        # Хвост, не подтверждённый в задании, отбрасывается
+        with open(job_path(job, ".part"), "ab") as part:
+            part.write(b'["not confirmed"]\n')
+
+        ExportJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(minutes=10)
+        )
+        resumed = claim_next_job(stale_after=300)
+        self.assertEqual((resumed.pk, resumed.last_pk), (job.pk, job.last_pk))
+        run_job(resumed, chunk_size=2)
+        rows = self.csv_rows(resumed)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(len(set(rows)), 6)
+        self.assertFalse(job_path(job, ".part").exists())
+
+    def test_fresh_running_job_is_not_taken(self):
+        self.create_job()
+        self.assertIsNotNone(claim_next_job(stale_after=300))
+        self.assertIsNone(claim_next_job(stale_after=300))
+
+    def test_reclaimed_job_stops_old_worker(self):
+        self.create_job()
+        job = claim_next_job(stale_after=300)
+
+        def reclaim(job):
+            ExportJob.objects.filter(pk=job.pk).update(claim="другой")
+
+        with self.assertRaises(JobLost):
+            run_job(job, chunk_size=2, on_chunk=reclaim)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_rows), ("running", 2))
+        self.assertFalse(job_path(job).exists())
@@ -0,0 +1,85 @@
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from ..filters import TaskFilter, parse_day_range
+from ..models import Task
+
+
+class ParseDayRangeTests(SimpleTestCase):
+    def test_forms(self):
+        self.assertEqual(
+            parse_day_range("2026-01-16"), (date(2026, 1, 16), date(2026, 1, 17))
+        )
+        self.assertEqual(
+            parse_day_range("2026-01-16..2026-01-20"),
+            (date(2026, 1, 16), date(2026, 1, 21)),
+        )
+        # ISO-неделя начинается с понедельника
+        self.assertEqual(
+            parse_day_range("2026-W03"), (date(2026, 1, 12), date(2026, 1, 19))
+        )
+
+    def test_invalid(self):
+        for value in ("16.01.2026", "2026-01-20..2026-01-16", "..2026-01-16", ""):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_day_range(value)
+
+
+@override_settings(TASK_RESPONSE_CACHE_TIMEOUT=0)
+class DueDateFilterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        moments = {
+            "start": datetime(2026, 1, 16, 0, 0, tzinfo=dt_timezone.utc),
+            "late": datetime(2026, 1, 16, 23, 30, tzinfo=dt_timezone.utc),
+            "next": datetime(2026, 1, 17, 0, 0, tzinfo=dt_timezone.utc),
+            "week": datetime(2026, 1, 18, 12, 0, tzinfo=dt_timezone.utc),
+        }
+        for title, due_date in moments.items():
+            task = Task.objects.create(title=title, description="", due_date=due_date)
+            task.users.add(self.user)
+
+    def titles(self, **params):
+        response = self.client.get("/api/tasks/", params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(task["title"] for task in response.data["results"])
+
+    def test_day_is_half_open(self):
+        self.assertEqual(self.titles(due_date="2026-01-16"), ["late", "start"])
+
+    def test_range_and_week(self):
+        self.assertEqual(
+            self.titles(due_date="2026-01-16..2026-01-17"),
+            ["late", "next", "start"],
+        )
+        self.assertEqual(
+            self.titles(due_date="2026-W03"), ["late", "next", "start", "week"]
+        )
+
+    def test_day_in_requested_time_zone(self):
+        # В Москве (UTC+3) 23:30 UTC 16-го - это уже 17-е
+        self.assertEqual(
+            self.titles(due_date="2026-01-17", tz="Europe/Moscow"), ["late", "next"]
+        )
+
+    def test_invalid_values_are_400(self):
+        for params in (
+            {"due_date": "вчера"},
+            {"due_date": "2026-01-16", "tz": "Нигде"},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get("/api/tasks/", params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_column_is_not_cast(self):
+        queryset = TaskFilter({"due_date": "2026-01-16"}, Task.objects.all()).qs
+        sql = str(queryset.query).lower()
+        self.assertIn("due_date", sql)
+        self.assertNotIn("cast", sql)
+        self.assertNotIn("django_datetime_cast_date", sql)
@@ -0,0 +1,265 @@
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..history import (
+    RetentionPolicy,
+    duplicate_versions,
+    get_retention_policies,
+    history_batch,
+)
+from ..models import Task, TaskTombstone
+from ..pagination import TaskHistoryPagination
+
+
+class ChangedOnlyHistoryTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            Task.objects.create(
+                title=f"Задача {i}", description="", due_date=timezone.now()
+            )
+        self.tasks = list(Task.objects.order_by("pk"))
+
+    def history_count(self):
+        return Task.history.count()
+
+    def test_noop_save(self):
+        before = self.history_count()
+        task = self.tasks[0]
+        task.save()
+        # update_date (auto_now) изменился, но версия не содержательна
+        self.assertEqual(self.history_count(), before)
+
+        task.title = "Новое название"
+        task.save()
+        task.save()
+        self.assertEqual(self.history_count(), before + 1)
+
+    def test_new_object_always_versioned(self):
+        task = Task(title="Без снимка", description="", due_date=timezone.now())
+        task.save()
+        self.assertEqual(task.history.count(), 1)
+
+    def test_batch_writes_changed_objects_once(self):
+        before = self.history_count()
+        self.tasks[0].title = "Первая"
+        self.tasks[2].status = "completed"
+        with CaptureQueriesContext(connection) as queries:
+            with history_batch():
+                for task in self.tasks:
+                    task.save()
+        self.assertEqual(self.history_count(), before + 2)
+        inserts = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith('INSERT INTO "main_historicaltask"')
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            set(Task.history.filter(history_type="~").values_list("id", flat=True)),
+            {self.tasks[0].pk, self.tasks[2].pk},
+        )
+
+    def test_batch_rolls_back_with_changes(self):
+        before = self.history_count()
+        with self.assertRaises(RuntimeError):
+            with history_batch():
+                self.tasks[0].title = "Откатится"
+                self.tasks[0].save()
+                raise RuntimeError
+        self.assertEqual(self.history_count(), before)
+        self.tasks[0].refresh_from_db()
+        self.assertEqual(self.tasks[0].title, "Задача 0")
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        # У первой задачи пять версий, у второй одна
+        self.busy = Task.objects.create(
+            title="Версия 0", description="", due_date=timezone.now()
+        )
+        for i in range(1, 5):
+            self.busy.title = f"Версия {i}"
+            self.busy.save()
+        self.quiet = Task.objects.create(
+            title="Одна версия", description="", due_date=timezone.now()
+        )
+        self.versions = list(
+            self.busy.history.order_by("history_id").values_list(
+                "history_id", flat=True
+            )
+        )
+
+    def age(self, history_ids, days):
+        Task.history.filter(history_id__in=history_ids).update(
+            history_date=timezone.now() - timedelta(days=days)
+        )
+
+    def expired(self, **options):
+        policy = RetentionPolicy(Task, **options)
+        return set(policy.expired().values_list("history_id", flat=True))
+
+    def test_keep_versions(self):
+        self.assertEqual(self.expired(keep_versions=2), set(self.versions[:3]))
+        self.assertEqual(self.expired(keep_versions=5), set())
+
+    def test_days_and_keep_versions(self):
+        self.age(self.versions[:4], days=40)
+        quiet_version = self.quiet.history.get().history_id
+        self.age([quiet_version], days=40)
+        self.assertEqual(self.expired(days=30), {*self.versions[:4], quiet_version})
+        # Последние версии объекта остаются, даже если они старые
+        self.assertEqual(self.expired(days=30, keep_versions=2), set(self.versions[:3]))
+
+    def test_policies_are_validated(self):
+        for options in ({}, {"keep_versions": 0}):
+            with self.subTest(options=options):
+                with override_settings(HISTORY_RETENTION={"main.Task": options}):
+                    with self.assertRaises(ValueError):
+                        get_retention_policies()
+        with override_settings(
+            HISTORY_RETENTION={"main.Task": {"days": 1}, "main.Comment": {"days": 1}}
+        ):
+            self.assertEqual(
+                [policy.model for policy in get_retention_policies(["main.Task"])],
+                [Task],
+            )
+
+    def test_duplicate_versions(self):
+        last = self.busy.history.latest()
+        last.pk = None
+        last.save()
+        self.assertEqual(list(duplicate_versions(Task, chunk_size=2)), [last.pk])
+
+    @override_settings(HISTORY_RETENTION={"main.Task": {"keep_versions": 2}})
+    def test_purge_command_archives_and_compacts(self):
+        last = self.busy.history.latest()
+        last.pk = None
+        last.save()
+        user = User.objects.create_user("bob")
+        TaskTombstone.objects.create(
+            task_id=self.busy.pk,
+            user=user,
+            removed_at=timezone.now() - timedelta(days=3650),
+        )
+
+        out = StringIO()
+        call_command("purge_history", "--dry-run", "--compact", stdout=out)
+        self.assertIn("main.Task: к удалению 4 версий", out.getvalue())
+        self.assertIn("main.Task: повторов 1", out.getvalue())
+        self.assertEqual(Task.history.count(), 7)
+
+        with tempfile.TemporaryDirectory() as directory:
+            out = StringIO()
+            call_command(
+                "purge_history",
+                "--compact",
+                f"--archive={directory}",
+                "--chunk-size=2",
+                stdout=out,
+            )
+            archived = [
+                json.loads(line)["history_id"]
+                for path in Path(directory).rglob("*.jsonl")
+                for line in path.read_text(encoding="utf-8").splitlines()
+            ]
+        # Повтор тоже архивируется перед удалением
+        self.assertEqual(sorted(archived), [*self.versions[:4], last.pk])
+        self.assertIn("удалено устаревших версий: 4", out.getvalue())
+        self.assertIn("Отметки удаления задач: удалено 1", out.getvalue())
+        self.assertIn("удалено повторов: 1", out.getvalue())
+        self.assertEqual(
+            list(self.busy.history.values_list("title", flat=True)), ["Версия 4"]
+        )
+        self.assertEqual(self.quiet.history.count(), 1)
+
+    def test_purge_command_rejects_unknown_model(self):
+        with self.assertRaises(CommandError):
+            call_command("purge_history", "--model=main.Unknown", stdout=StringIO())
+
+
+class TaskHistoryApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.task = Task.objects.create(
+            title="Версия 0", description="", due_date=timezone.now(), priority=1
+        )
+        self.task.users.add(self.user)
+        for i in range(1, 4):
+            self.task.title = f"Версия {i}"
+            self.task.save()
+        self.url = f"/api/tasks/{self.task.pk}/history/"
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_changes_between_versions(self):
+        response = self.client.patch(f"/api/tasks/{self.task.pk}/", {"priority": 4})
+        self.assertEqual(response.status_code, 200)
+
+        newest, *_, created = self.get(self.url)["results"]
+        self.assertEqual(newest["history_type"], "~")
+        self.assertEqual(newest["user"], {"id": self.user.pk, "username": "bob"})
+        self.assertEqual(newest["changes"], [{"field": "priority", "old": 1, "new": 4}])
+
+        self.assertEqual(created["history_type"], "+")
+        self.assertIsNone(created["user"])
+        changes = {change["field"]: change for change in created["changes"]}
+        self.assertEqual(
+            changes["title"], {"field": "title", "old": None, "new": "Версия 0"}
+        )
+        self.assertNotIn("update_date", changes)
+
+    @mock.patch.object(TaskHistoryPagination, "page_size", 2)
+    def test_pages_compare_across_boundary(self):
+        # Проверка доступа, страница и предыдущая версия для последней на ней
+        with self.assertNumQueries(3):
+            first = self.get(self.url)
+        self.assertEqual(
+            [version["changes"] for version in first["results"]],
+            [
+                [{"field": "title", "old": "Версия 2", "new": "Версия 3"}],
+                [{"field": "title", "old": "Версия 1", "new": "Версия 2"}],
+            ],
+        )
+        second = self.get(first["next"])
+        self.assertEqual(
+            second["results"][0]["changes"],
+            [{"field": "title", "old": "Версия 0", "new": "Версия 1"}],
+        )
+        self.assertIsNone(second["next"])
+
+    def test_since(self):
+        old = self.task.history.order_by("history_id")[:2]
+        Task.history.filter(history_id__in=[row.history_id for row in old]).update(
+            history_date=timezone.now() - timedelta(days=10)
+        )
+        since = (timezone.localdate() - timedelta(days=1)).isoformat()
+        results = self.get(self.url, {"since": since})["results"]
+        self.assertEqual(len(results), 2)
+        # Старейшая из показанных сравнивается с более ранней версией
+        self.assertEqual(
+            results[-1]["changes"],
+            [{"field": "title", "old": "Версия 1", "new": "Версия 2"}],
+        )
+        response = self.client.get(self.url, {"since": "вчера"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_foreign_task(self):
+        self.client.force_authenticate(User.objects.create_user("alice"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
@@ -0,0 +1,159 @@
+import tempfile
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from io import BytesIO, StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+from openpyxl import Workbook
+
+from ..admin import TaskResource
+from ..exports import iter_csv, iter_export_rows
+from ..imports import import_tasks
+from ..models import Category, Task
+from ..summary import get_summary
+
+
+def csv_file(*lines):
+    return BytesIO(("\n".join(lines) + "\n").encode("utf-8"))
+
+
+class TaskImportTests(TestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user("bob")
+        self.alice = User.objects.create_user("alice")
+        self.work = Category.objects.create(title="Работа")
+
+    def test_creates_tasks_with_owners_and_history(self):
+        file = csv_file(
+            "title,description,users,category,status,priority,due_date",
+            'Отчёт,Квартальный,"bob, alice",работа,В процессе,3,2026-03-01T10:00Z',
+            "Звонок,,bob,,,,01.03.2026 12:30",
+        )
+        result = import_tasks(file, "csv")
+        self.assertEqual((result.valid, result.created, result.errors), (2, 2, []))
+
+        report = Task.objects.get(title="Отчёт")
+        self.assertEqual(
+            (report.status, report.priority, report.category, report.due_date),
+            (
+                "in_progress",
+                3,
+                self.work,
+                datetime(2026, 3, 1, 10, 0, tzinfo=dt_timezone.utc),
+            ),
+        )
+        self.assertEqual(set(report.users.all()), {self.bob, self.alice})
+        self.assertEqual(report.history.count(), 1)
+
+        call = Task.objects.get(title="Звонок")
+        self.assertEqual((call.status, call.priority), ("pending", 2))
+        self.assertEqual(
+            call.due_date,
+            timezone.make_aware(datetime(2026, 3, 1, 12, 30)),
+        )
+        # Счётчики сводки обновлены без сигналов
+        self.assertEqual(get_summary(self.bob)["total"], 2)
+
+    def test_errors_keep_file_row_numbers(self):
+        file = csv_file(
+            "title,users,priority,status,due_date,category",
+            "Хорошая,bob,1,,2026-03-01,",
+            ",bob,1,,2026-03-01,",
+            "Приоритет,bob,7,,2026-03-01,",
+            "Статус,bob,1,отложено,2026-03-01,",
+            "Срок,bob,1,,завтра,",
+            "Категория,bob,1,,2026-03-01,Отдых",
+            "Владелец,carol,1,,2026-03-01,",
+            "Без владельца,,1,,2026-03-01,",
+        )
+        # Пачки по две строки: номера строк не сбиваются
+        result = import_tasks(file, "csv", chunk_size=2)
+        self.assertEqual((result.valid, result.created), (1, 1))
+        self.assertEqual(
+            result.errors,
+            [
+                (3, "Пустое название"),
+                (4, "Приоритет должен быть от 1 до 4"),
+                (5, "Неизвестный статус"),
+                (6, "Неверный срок выполнения"),
+                (7, "Неизвестная категория"),
+                (8, "Неизвестный пользователь"),
+                (9, "Не указаны владельцы"),
+            ],
+        )
+
+    def test_missing_columns(self):
+        result = import_tasks(csv_file("title", "Задача"), "csv")
+        self.assertEqual(result.errors, [(1, "Нет столбцов: due_date")])
+
+    def test_dry_run_and_default_user(self):
+        file = csv_file("title,due_date", "Задача,2026-03-01")
+        result = import_tasks(file, "csv", default_user=self.bob, dry_run=True)
+        self.assertEqual((result.valid, result.created), (1, 0))
+        self.assertFalse(Task.objects.exists())
+
+        file.seek(0)
+        import_tasks(file, "csv", default_user=self.bob)
+        self.assertEqual(list(Task.objects.get().users.all()), [self.bob])
+
+    def test_xlsx(self):
+        workbook = Workbook()
+        workbook.active.append(["title", "users", "priority", "due_date"])
+        workbook.active.append(["Из Excel", "alice", 4, datetime(2026, 3, 1, 9, 0)])
+        file = BytesIO()
+        workbook.save(file)
+        file.seek(0)
+        result = import_tasks(file, "xlsx")
+        self.assertEqual((result.created, result.errors), (1, []))
+        self.assertEqual(Task.objects.get().priority, 4)
+
+    def test_reimports_own_csv_export(self):
+        task = Task.objects.create(
+            title="Выгруженная",
+            description="Текст",
+            due_date=timezone.now(),
+            status="completed",
+            priority=3,
+            category=self.work,
+        )
+        task.users.add(self.bob, self.alice)
+        exported = "".join(iter_csv(iter_export_rows(TaskResource(), Task.objects)))
+
+        result = import_tasks(BytesIO(exported.encode("utf-8")), "csv")
+        self.assertEqual((result.created, result.errors), (1, []))
+        copy = Task.objects.exclude(pk=task.pk).get()
+        self.assertEqual(
+            (copy.title, copy.status, copy.priority, copy.category),
+            ("Выгруженная", "completed", 3, self.work),
+        )
+        self.assertEqual(set(copy.users.all()), {self.bob, self.alice})
+
+
+class ImportTasksCommandTests(TestCase):
+    def setUp(self):
+        self.bob = User.objects.create_user("bob")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "tasks.csv"
+        self.path.write_text(
+            "title,due_date\nЗадача,2026-03-01\n,2026-03-01\n", encoding="utf-8"
+        )
+
+    def test_imports_with_owner(self):
+        out, err = StringIO(), StringIO()
+        call_command(
+            "import_tasks", str(self.path), "--owner=bob", stdout=out, stderr=err
+        )
+        self.assertIn("Создано задач: 1, ошибок: 1", out.getvalue())
+        self.assertIn("Строка 3: Пустое название", err.getvalue())
+        self.assertEqual(Task.objects.get().history.get().history_user, self.bob)
+
+    def test_rejects_unknown_owner_and_format(self):
+        with self.assertRaises(CommandError):
+            call_command("import_tasks", str(self.path), "--owner=carol")
+        with self.assertRaises(CommandError):
+            call_command("import_tasks", str(self.path.with_suffix(".txt")))
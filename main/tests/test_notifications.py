@@ -0,0 +1,86 @@
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Task
+from ..notifications import iter_overdue_digests
+
+
+class RecordingSink:
+    """Получатель для --sink: запоминает пачки сводок."""
+
+    batches = []
+
+    def send(self, digests):
+        self.batches.append([digest.username for digest in digests])
+
+    def close(self):
+        pass
+
+
+class OverdueDigestTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.users = [User.objects.create_user(name) for name in ("ann", "bob", "eve")]
+        ann, bob, eve = self.users
+        rows = [
+            ("Поздно", now - timedelta(days=1), "pending", [ann, bob]),
+            ("Очень поздно", now - timedelta(days=3), "in_progress", [ann]),
+            ("Сделано", now - timedelta(days=2), "completed", [bob, eve]),
+            ("Впереди", now + timedelta(days=1), "pending", [eve]),
+        ]
+        for title, due_date, status, users in rows:
+            task = Task.objects.create(
+                title=title, description="", due_date=due_date, status=status
+            )
+            task.users.add(*users)
+        RecordingSink.batches = []
+
+    def test_digests_group_open_overdue_tasks_by_user(self):
+        with self.assertNumQueries(1):
+            digests = list(iter_overdue_digests(chunk_size=1))
+        self.assertEqual(
+            [
+                (digest.username, [task["title"] for task in digest.tasks])
+                for digest in digests
+            ],
+            [("ann", ["Очень поздно", "Поздно"]), ("bob", ["Поздно"])],
+        )
+        self.assertEqual(len(list(iter_overdue_digests(limit=1))), 1)
+
+    def test_command_writes_jsonl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "digests.jsonl"
+            out = StringIO()
+            call_command("overdue_tasks", f"--jsonl={path}", stdout=out)
+            lines = [json.loads(line) for line in path.read_text().splitlines()]
+        self.assertEqual([line["username"] for line in lines], ["ann", "bob"])
+        self.assertEqual(len(lines[0]["tasks"]), 2)
+        self.assertIn("Пользователей в рассылке: 2, задач в сводках: 3", out.getvalue())
+
+    def test_command_sends_batches_from_workers(self):
+        call_command(
+            "overdue_tasks",
+            "--sink=main.tests.test_notifications.RecordingSink",
+            "--workers=2",
+            "--batch-size=1",
+            stdout=StringIO(),
+        )
+        self.assertEqual(sorted(RecordingSink.batches), [["ann"], ["bob"]])
+
+    def test_nothing_overdue(self):
+        Task.objects.update(status="completed")
+        out = StringIO()
+        call_command("overdue_tasks", stdout=out)
+        self.assertIn("Просроченных задач нет", out.getvalue())
+
+    def test_rejects_zero_workers(self):
+        with self.assertRaises(CommandError):
+            call_command("overdue_tasks", "--workers=0", stdout=StringIO())
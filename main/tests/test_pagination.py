@@ -0,0 +1,66 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Task
+from ..pagination import TaskPagination
+
+
+@override_settings(TASK_RESPONSE_CACHE_TIMEOUT=0)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        # Одинаковые сроки у пар задач: порядок держится на id
+        self.tasks = []
+        for i in range(5):
+            task = Task.objects.create(
+                title=f"Задача {i}",
+                description="",
+                due_date=now + timedelta(days=i // 2),
+            )
+            task.users.add(self.user)
+            self.tasks.append(task)
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    @mock.patch.object(TaskPagination, "page_size", 2)
+    def test_pages_forward_and_back(self):
+        first = self.get("/api/tasks/", {"pagination": "cursor"})
+        self.assertNotIn("count", first)
+        self.assertIsNone(first["previous"])
+        second = self.get(first["next"])
+        third = self.get(second["next"])
+        ids = [
+            task["id"] for page in (first, second, third) for task in page["results"]
+        ]
+        self.assertEqual(ids, [task.pk for task in self.tasks])
+        self.assertIsNone(third["next"])
+
+        back = self.get(third["previous"])
+        self.assertEqual(back["results"], second["results"])
+
+    def test_ordering_rejected(self):
+        response = self.client.get(
+            "/api/tasks/", {"pagination": "cursor", "ordering": "-priority"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ordering", response.data)
+        # Тот же порядок, что у курсора, допустим
+        self.get("/api/tasks/", {"pagination": "cursor", "ordering": "due_date,id"})
+        # Без курсора ?ordering= работает как обычно
+        data = self.get("/api/tasks/", {"ordering": "-id"})
+        self.assertEqual(data["results"][0]["id"], self.tasks[-1].pk)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/tasks/", {"cursor": "не-курсор"})
+        self.assertEqual(response.status_code, 404)
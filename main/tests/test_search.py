@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Category, Comment, Task
+from ..search import search
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_task(self, title, description="", **kwargs):
+        task = Task.objects.create(
+            title=title, description=description, due_date=timezone.now(), **kwargs
+        )
+        task.users.add(self.user)
+        return task
+
+    def found(self, terms, model=Task, order=True):
+        return list(
+            search(model.objects.all(), terms, order).values_list("pk", flat=True)
+        )
+
+    def test_signals_update_index(self):
+        task = self.create_task("Квартальный отчет")
+        self.assertEqual(self.found(["квартальный"]), [task.pk])
+
+        task.title = "Годовой план"
+        task.save()
+        self.assertEqual(self.found(["квартальный"]), [])
+        self.assertEqual(self.found(["годовой"]), [task.pk])
+
+        comment = Comment.objects.create(task=task, user=self.user, text="Согласовано")
+        self.assertEqual(self.found(["согласовано"], Comment), [comment.pk])
+
+        task.delete()
+        self.assertEqual(self.found(["годовой"]), [])
+        self.assertEqual(self.found(["согласовано"], Comment), [])
+
+    def test_category_rename_reindexes_tasks(self):
+        category = Category.objects.create(title="Работа")
+        task = self.create_task("Звонок", category=category)
+        category.title = "Дом"
+        category.save()
+        self.assertEqual(self.found(["дом"]), [task.pk])
+        self.assertEqual(self.found(["работа"]), [])
+
+    def test_prefix_and_all_words(self):
+        task = self.create_task("Подготовить отчет", "для бухгалтерии")
+        self.create_task("Подготовить план")
+        self.assertEqual(self.found(["отч"]), [task.pk])
+        self.assertEqual(self.found(["подгот бухг"]), [task.pk])
+        self.assertEqual(self.found(["отч"], order=False), [task.pk])
+        # Синтаксис запросов индекса не применяется
+        self.assertEqual(self.found(['отчет" OR "план']), [])
+
+    def test_title_ranks_above_description(self):
+        in_description = self.create_task("Звонок", "обсудить бюджет")
+        in_title = self.create_task("Бюджет", "на следующий год")
+        self.assertEqual(self.found(["бюджет"]), [in_title.pk, in_description.pk])
+
+    def test_api_search(self):
+        task = self.create_task("Квартальный отчет")
+        self.create_task("Годовой план")
+        response = self.client.get("/api/tasks/", {"search": "отч"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.data["results"]], [task.pk])
+
+    def test_fallback_without_index(self):
+        task = self.create_task("Квартальный отчет")
+        self.create_task("Годовой план")
+        with mock.patch("main.search.get_search_backend", return_value=None):
+            self.assertIsNone(search(Task.objects.all(), ["отчет"]))
+            response = self.client.get("/api/tasks/", {"search": "тальный"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.data["results"]], [task.pk])
@@ -0,0 +1,44 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from ..models import Category, Task
+from ..serializers import TaskRowSerializer, TaskSerializer
+
+
+def as_json(data):
+    return json.loads(JSONRenderer().render(data))
+
+
+class TaskRowSerializerTests(TestCase):
+    def setUp(self):
+        bob = User.objects.create_user("bob")
+        eve = User.objects.create_user("eve")
+        category = Category.objects.create(title="Работа")
+        shared = Task.objects.create(
+            title="Общая",
+            description="Описание",
+            due_date=timezone.now(),
+            category=category,
+            priority=4,
+        )
+        shared.users.add(bob, eve)
+        # Без категории и без владельцев
+        Task.objects.create(title="Ничья", description="", due_date=timezone.now())
+        self.queryset = Task.objects.order_by("pk")
+
+    def test_same_json_as_task_serializer(self):
+        expected = as_json(TaskSerializer(self.queryset, many=True).data)
+        rows_serializer = TaskRowSerializer(TaskSerializer())
+        rows = rows_serializer.values(self.queryset)
+
+        self.assertEqual(as_json(rows_serializer.to_representation(rows)), expected)
+        self.assertEqual(
+            as_json(async_to_sync(rows_serializer.ato_representation)(rows)), expected
+        )
+        self.assertIsNone(expected[1]["category"])
+        self.assertEqual(expected[1]["users"], [])
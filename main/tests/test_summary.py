@@ -0,0 +1,79 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Task, TaskCounter
+from ..summary import get_summary, rebuild_counters
+
+
+class CounterTests(TestCase):
+    """Счётчики, изменённые по разнице, совпадают с пересчитанными заново."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("bob")
+        self.other = User.objects.create_user("eve")
+        past = timezone.now() - timedelta(days=1)
+        self.tasks = []
+        for status in ("pending", "in_progress", "completed"):
+            task = Task.objects.create(title=status, status=status, due_date=past)
+            task.users.add(self.user)
+            self.tasks.append(task)
+
+    def assertCountersRebuilt(self, *users):
+        for user in users or [self.user]:
+            summary = get_summary(user)
+            rebuild_counters([user.pk])
+            self.assertEqual(summary, get_summary(user))
+
+    def test_untracked_owner_skips_counters(self):
+        with mock.patch("main.signals.stored_state") as stored_state:
+            self.tasks[0].status = "completed"
+            self.tasks[0].save()
+            self.tasks[0].delete()
+        stored_state.assert_not_called()
+        self.assertFalse(TaskCounter.objects.exists())
+
+    def test_stale_edit(self):
+        get_summary(self.user)
+        first, second = Task.objects.get(pk=self.tasks[0].pk), self.tasks[0]
+        first.status = "completed"
+        first.save()
+        # Второй объект загружен до первого сохранения
+        second.status = "in_progress"
+        second.save()
+        self.assertCountersRebuilt()
+        self.assertEqual(get_summary(self.user)["status"]["pending"], 0)
+
+    def test_stale_delete(self):
+        get_summary(self.user)
+        first, second = Task.objects.get(pk=self.tasks[0].pk), self.tasks[0]
+        first.status = "completed"
+        first.save()
+        second.delete()
+        self.assertCountersRebuilt()
+        summary = get_summary(self.user)
+        self.assertEqual(summary["total"], 2)
+        self.assertEqual(summary["status"]["completed"], 1)
+
+    def test_reassign(self):
+        get_summary(self.user)
+        get_summary(self.other)
+        self.tasks[0].users.set([self.other])
+        self.tasks[1].users.add(self.other)
+        self.assertCountersRebuilt(self.user, self.other)
+        self.assertEqual(get_summary(self.other)["total"], 2)
+        self.assertEqual(get_summary(self.other)["overdue"], 2)
+
+    def test_change_while_building(self):
+        # Строка overdue без as_of: пересчёт зафиксировал её и ещё идёт
+        TaskCounter.objects.create(user=self.user, key=TaskCounter.OVERDUE)
+        self.tasks[0].status = "completed"
+        self.tasks[0].save()
+        self.tasks[1].delete()
+        summary = get_summary(self.user)
+        self.assertEqual(summary["total"], 2)
+        self.assertEqual(summary["overdue"], 0)
+        self.assertCountersRebuilt()
@@ -0,0 +1,121 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Comment, Task
+
+
+@override_settings(SYNC_SAFETY_LAG=0)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob")
+        self.other = User.objects.create_user("eve")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tasks = [self.create_task(f"Задача {i}") for i in range(3)]
+        self.comment = Comment.objects.create(
+            task=self.tasks[0], user=self.user, text="Комментарий"
+        )
+
+    def create_task(self, title, *users):
+        task = Task.objects.create(
+            title=title, description="Описание", due_date=timezone.now()
+        )
+        task.users.add(*(users or [self.user]))
+        return task
+
+    def sync(self, token=None):
+        """Все страницы синхронизации: (данные, token для следующей)."""
+        data = {
+            "tasks": [],
+            "comments": [],
+            "deleted_tasks": [],
+            "deleted_comments": [],
+        }
+        response = self.client.get("/api/sync/", {"since": token} if token else {})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            for name, items in data.items():
+                items.extend(response.data[name])
+            if not response.data["next"]:
+                return data, response.data["token"]
+            response = self.client.get(response.data["next"])
+
+    @staticmethod
+    def ids(items):
+        return sorted(item["id"] for item in items)
+
+    def test_full_sync(self):
+        data, token = self.sync()
+        self.assertEqual(self.ids(data["tasks"]), sorted(t.pk for t in self.tasks))
+        self.assertEqual(self.ids(data["comments"]), [self.comment.pk])
+        self.assertEqual(data["deleted_tasks"], [])
+        self.assertTrue(token)
+
+    def test_no_changes(self):
+        _, token = self.sync()
+        data, _ = self.sync(token)
+        self.assertEqual(
+            data,
+            {"tasks": [], "comments": [], "deleted_tasks": [], "deleted_comments": []},
+        )
+
+    def test_changes(self):
+        _, token = self.sync()
+        self.tasks[1].title = "Новое название"
+        self.tasks[1].save()
+        self.comment.text = "Исправленный комментарий"
+        self.comment.save()
+        added = self.create_task("Новая задача")
+
+        data, _ = self.sync(token)
+        titles = {task["id"]: task["title"] for task in data["tasks"]}
+        self.assertEqual(
+            titles, {self.tasks[1].pk: "Новое название", added.pk: "Новая задача"}
+        )
+        self.assertEqual(self.ids(data["comments"]), [self.comment.pk])
+
+    def test_deletes(self):
+        _, token = self.sync()
+        task_id, comment_id = self.tasks[2].pk, self.comment.pk
+        self.comment.delete()
+        self.tasks[2].delete()
+
+        data, _ = self.sync(token)
+        self.assertEqual(data["tasks"], [])
+        self.assertEqual(data["deleted_tasks"], [task_id])
+        self.assertEqual(data["deleted_comments"], [comment_id])
+
+    def test_owner_removal(self):
+        shared = self.create_task("Общая задача", self.user, self.other)
+        _, token = self.sync()
+        shared.users.remove(self.user)
+
+        data, token = self.sync(token)
+        self.assertEqual(data["deleted_tasks"], [shared.pk])
+        self.assertEqual(data["tasks"], [])
+
+        # Возвращённая задача приходит среди изменённых, а не удалённых
+        shared.users.add(self.user)
+        data, _ = self.sync(token)
+        self.assertEqual(self.ids(data["tasks"]), [shared.pk])
+        self.assertEqual(data["deleted_tasks"], [])
+
+    def test_shared_task_comes_with_comments(self):
+        foreign = self.create_task("Чужая задача", self.other)
+        comment = Comment.objects.create(task=foreign, user=self.other, text="Старый")
+        _, token = self.sync()
+        foreign.users.add(self.user)
+
+        data, _ = self.sync(token)
+        self.assertEqual(self.ids(data["tasks"]), [foreign.pk])
+        self.assertEqual(self.ids(data["comments"]), [comment.pk])
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_pages(self):
+        data, token = self.sync()
+        self.assertEqual(self.ids(data["tasks"]), sorted(t.pk for t in self.tasks))
+        self.assertEqual(self.ids(data["comments"]), [self.comment.pk])
+        data, _ = self.sync(token)
+        self.assertEqual(data["tasks"], [])
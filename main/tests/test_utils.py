@@ -0,0 +1,15 @@
+from django.test import SimpleTestCase
+
+from ..utils import batched
+
+
+class BatchedTests(SimpleTestCase):
+    def test_batches(self):
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(batched([], 2)), [])
+
+    def test_lazy(self):
+        # Источник читается по пачке, а не целиком
+        numbers = iter(range(10**9))
+        self.assertEqual(next(batched(numbers, 3)), [0, 1, 2])
+        self.assertEqual(next(numbers), 3)
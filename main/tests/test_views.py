@@ -0,0 +1,129 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import Category, Comment, Task
+
+
+class TaskListTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob")
+        self.other = User.objects.create_user("alice")
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(title="Работа")
+
+    def add_tasks(self, count, comments=0):
+        now = timezone.now()
+        tasks = []
+        for i in range(count):
+            # Одинаковые сроки у пар задач: порядок держится на id
+            task = Task.objects.create(
+                title=f"Задача {len(tasks)}",
+                description="",
+                due_date=now + timedelta(days=i // 2),
+                category=self.category,
+            )
+            task.users.add(self.user, self.other)
+            for j in range(comments):
+                Comment.objects.create(task=task, user=self.other, text=f"Ответ {j}")
+            tasks.append(task)
+        return tasks
+
+    def get_page(self, cursor=None):
+        params = {"cursor": cursor} if cursor else {}
+        response = self.client.get(reverse("task_list"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.context
+
+    @mock.patch("main.views.TASK_LIST_PAGE_SIZE", 2)
+    def test_cursor_pages_cover_every_task(self):
+        tasks = self.add_tasks(5)
+        seen = []
+        page = self.get_page()
+        self.assertIsNone(page["previous_cursor"])
+        while True:
+            seen += [task.pk for task in page["tasks"]]
+            if not page["next_cursor"]:
+                break
+            page = self.get_page(page["next_cursor"])
+        expected = sorted(tasks, key=lambda task: (task.due_date, task.pk))
+        self.assertEqual(seen, [task.pk for task in reversed(expected)])
+
+        previous = self.get_page(page["previous_cursor"])
+        self.assertEqual([task.pk for task in previous["tasks"]], seen[-3:-1])
+
+    def test_queries_do_not_grow_with_tasks(self):
+        self.add_tasks(2, comments=1)
+        with CaptureQueriesContext(connection) as few:
+            self.get_page()
+        self.add_tasks(6, comments=3)
+        with CaptureQueriesContext(connection) as many:
+            self.get_page()
+        self.assertEqual(len(many), len(few))
+
+    def test_latest_comments_are_limited(self):
+        (task,) = self.add_tasks(1, comments=7)
+        (shown,) = self.get_page()["tasks"]
+        self.assertEqual(
+            [comment.text for comment in shown.latest_comments],
+            [f"Ответ {j}" for j in range(6, 1, -1)],
+        )
+        self.assertEqual(shown.pk, task.pk)
+
+    def test_invalid_cursor_redirects_to_first_page(self):
+        response = self.client.get(reverse("task_list"), {"cursor": "мусор"})
+        self.assertRedirects(response, reverse("task_list"))
+
+
+@override_settings(TASK_RESPONSE_CACHE_TIMEOUT=0)
+class FilteredTasksTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bob")
+        self.other = User.objects.create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.work = Category.objects.create(title="Работа")
+        self.home = Category.objects.create(title="Дом")
+
+    def create_task(self, title, days, users=None, **kwargs):
+        task = Task.objects.create(
+            title=title,
+            description="",
+            due_date=timezone.now() + timedelta(days=days),
+            **kwargs,
+        )
+        task.users.add(*(users or [self.user]))
+        return task
+
+    def titles(self):
+        response = self.client.get("/api/tasks/filtered-tasks/")
+        self.assertEqual(response.status_code, 200)
+        return [task["title"] for task in response.data["results"]]
+
+    def test_predicate_and_order(self):
+        # Срочные незавершённые без просрочки
+        self.create_task("Срочная позже", 3, priority=4, status="in_progress")
+        self.create_task("Срочная", 1, priority=3, category=self.work)
+        self.create_task("Срочная просроченная", -1, priority=5)
+        self.create_task("Срочная завершённая", 1, priority=5, status="completed")
+        # Лёгкие в ожидании не из категории "Работа", в том числе без категории
+        self.create_task("Лёгкая просроченная", -2, priority=1)
+        self.create_task("Лёгкая домашняя", 2, priority=2, category=self.home)
+        self.create_task("Лёгкая рабочая", 2, priority=1, category=self.work)
+        self.create_task("Лёгкая в процессе", 2, priority=1, status="in_progress")
+        self.create_task("Чужая", 1, priority=4, users=[self.other])
+        self.assertEqual(
+            self.titles(),
+            ["Лёгкая просроченная", "Срочная", "Лёгкая домашняя", "Срочная позже"],
+        )
+
+    def test_shared_task_listed_once(self):
+        self.create_task("Общая", 1, priority=4, users=[self.user, self.other])
+        self.assertEqual(self.titles(), ["Общая"])
@@ -2,10 +2,11 @@ from django.urls import include, path
 from rest_framework.authtoken.views import obtain_auth_token
 from rest_framework.routers import DefaultRouter
 
-from . import views
+from . import async_views, views
 from .views import (
     CategoryViewSet,
     CommentViewSet,
+    SyncView,
     TaskViewSet,
 )
 
@@ -24,6 +25,15 @@ urlpatterns = [
     path("auth/register/", views.register, name="register"),
     path("auth/login/", views.login_view, name="login"),
     path("auth/logout/", views.logout_view, name="logout"),
+    path("api/async/tasks/", async_views.task_list, name="async_task_list"),
+    path(
+        "api/async/tasks/overdue/", async_views.task_overdue, name="async_task_overdue"
+    ),
+    path(
+        "api/async/tasks/<int:pk>/", async_views.task_detail, name="async_task_detail"
+    ),
+    path("api/async/events/", async_views.task_events, name="async_task_events"),
     path("api/", include(router.urls)),
     path("api/auth/login/", obtain_auth_token, name="api_login"),
+    path("api/sync/", SyncView.as_view(), name="api_sync"),
 ]
@@ -0,0 +1,9 @@
+from itertools import islice
+
+
+def batched(iterable, size):
+    """Элементы iterable списками по size штук (последний может быть
+    короче). Как itertools.batched из Python 3.12, но отдаёт списки."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
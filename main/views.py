@@ -1,27 +1,61 @@
+from datetime import datetime, time
+
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
+from .cache import ConditionalGetMixin, cache_user_response
+from .filters import FullTextSearchFilter, TaskFilter
 from .forms import TaskForm
+from .history import history_batch
 from .models import Category, Comment, Task
+from .pagination import (
+    CommentPagination,
+    InvalidCursor,
+    Keyset,
+    TaskHistoryPagination,
+    TaskPagination,
+)
 from .serializers import (
     CategorySerializer,
     CommentSerializer,
     RegisterSerializer,
+    TaskHistoryDiffSerializer,
+    TaskListSerializer,
+    TaskRowSerializer,
     TaskSerializer,
 )
+from .summary import get_summary
+from .sync import DeltaSync, InvalidSyncToken, sync_horizon
+
+
+def parse_since(value):
+    try:
+        since = parse_datetime(value)
+        if since is None and (day := parse_date(value)) is not None:
+            since = datetime.combine(day, time.min)
+    except ValueError:
+        since = None
+    if since is None:
+        raise ValidationError({"since": "Ожидается дата ГГГГ-ММ-ДД или дата и время"})
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
 
 
 def register(request):
@@ -66,10 +100,42 @@ def home(request):
     return render(request, "main/home.html")
 
 
+TASK_LIST_PAGE_SIZE = 20
+TASK_LIST_COMMENTS_LIMIT = 5
+
+task_list_keyset = Keyset(("-due_date", "-id"))
+
+
 @login_required
 def task_list(request):
-    tasks = Task.objects.filter(users=request.user).order_by("-due_date")
-    return render(request, "main/task_list.html", {"tasks": tasks})
+    latest_comments = Comment.objects.select_related("user").order_by(
+        "-created_at", "-id"
+    )[:TASK_LIST_COMMENTS_LIMIT]
+    tasks = (
+        Task.objects.filter(users=request.user)
+        .select_related("category")
+        .prefetch_related(
+            "users",
+            Prefetch("comments", queryset=latest_comments, to_attr="latest_comments"),
+        )
+    )
+
+    try:
+        tasks, next_cursor, previous_cursor = task_list_keyset.paginate(
+            tasks, request.GET.get("cursor"), TASK_LIST_PAGE_SIZE
+        )
+    except InvalidCursor:
+        return redirect("task_list")
+
+    return render(
+        request,
+        "main/task_list.html",
+        {
+            "tasks": tasks,
+            "next_cursor": next_cursor,
+            "previous_cursor": previous_cursor,
+        },
+    )
 
 
 @login_required
@@ -96,7 +162,15 @@ def task_edit(request, pk):
     if request.method == "POST":
         form = TaskForm(request.POST, instance=task)
         if form.is_valid():
-            form.save()
+            task = form.save(commit=False)
+            changed = [
+                name
+                for name in form.changed_data
+                if name in form.Meta.fields and name != "users"
+            ]
+            if changed:
+                task.save(update_fields=[*changed, "update_date"])
+            form.save_m2m()
             messages.success(request, "Задача успешно обновлена")
             return redirect("task_list")
     else:
@@ -114,7 +188,9 @@ def task_delete(request, pk):
         return redirect("task_list")
 
     if request.method == "POST":
-        task.delete()
+        # Версии удаления комментариев задачи пишутся одним INSERT
+        with history_batch():
+            task.delete()
         messages.success(request, "Задача удалена")
         return redirect("task_list")
 
@@ -160,109 +236,238 @@ class LogoutView(APIView):
         )
 
 
+class SyncView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Задачи и комментарии, изменённые после ?since=<токен>.
+
+        Без токена отдаются все данные пользователя. Следующие страницы -
+        по ссылке next; последняя содержит token для следующего раза.
+        """
+        try:
+            cursor = request.query_params.get("cursor")
+            if cursor:
+                sync, phase, after = DeltaSync.resume(request.user, cursor)
+            else:
+                sync = DeltaSync.start(request.user, request.query_params.get("since"))
+                phase = after = None
+        except InvalidSyncToken:
+            raise ValidationError({"since": "Неверный токен синхронизации"})
+        if sync.since is not None and sync.since < sync_horizon():
+            return Response(
+                {"detail": "Токен синхронизации устарел, загрузите данные заново"},
+                status=status.HTTP_410_GONE,
+            )
+
+        data, next_cursor = sync.page(phase, after)
+        token = data.pop("token", None)
+        next_url = None
+        if next_cursor:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "cursor", next_cursor
+            )
+        return Response({**data, "next": next_url, "token": token})
+
+
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
+    pagination_class = TaskPagination
+    last_modified_field = "update_date"
 
     filter_backends = [
         DjangoFilterBackend,
         OrderingFilter,
-        SearchFilter,
+        FullTextSearchFilter,
     ]
     search_fields = [
         "title",
         "description",
         "category__title",
     ]
-    filterset_fields = {
-        "status": ["exact"],
-        "priority": ["exact", "gte", "lte"],
-        "due_date": ["gte", "lte"],
-    }
+    filterset_class = TaskFilter
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Task.objects.filter(users=self.request.user)
+        return Task.objects.filter(users=self.request.user).prefetch_related("users")
 
-        due_date = self.request.GET.get("due_date")
-        if due_date:
-            queryset = queryset.filter(due_date__date=due_date)
+    @cache_user_response("list")
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional(request, queryset, lambda: self.list_response(queryset))
 
-        return queryset
+    def perform_destroy(self, instance):
+        with history_batch():
+            instance.delete()
 
-    @action(methods=["GET"], detail=False, url_path="filtered-tasks")
-    def filtered_tasks(self, request):
-        user = request.user
-        now = timezone.now()
+    def list_response(self, queryset):
+        rows_serializer = TaskRowSerializer(self.get_serializer())
+        rows = rows_serializer.values(queryset)
 
-        main_queryset = Task.objects.filter(
-            Q(users=user)
-            & (Q(status="pending") | Q(status="in_progress"))
-            & Q(priority__gte=3)
-            & ~Q(status="completed")
-            & ~Q(due_date__lt=now)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(rows_serializer.to_representation(page))
+        return Response(rows_serializer.to_representation(rows))
+
+    @action(methods=["POST", "PATCH"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        if request.method == "POST":
+            serializer = self.get_serializer(data=request.data, many=True)
+            response_status = status.HTTP_201_CREATED
+        else:
+            serializer = self.get_serializer(
+                self.get_queryset(), data=request.data, many=True, partial=True
+            )
+            response_status = status.HTTP_200_OK
+        serializer.is_valid(raise_exception=True)
+        tasks = serializer.save()
+        return Response(
+            self.serialize_task_ids([task.pk for task in tasks]),
+            status=response_status,
         )
 
-        extra_queryset = Task.objects.filter(
-            Q(users=user)
-            & Q(status="pending")
-            & Q(priority__lte=2)
-            & ~Q(category__title="Работа")
-        )
+    @action(methods=["POST"], detail=False, url_path="bulk-complete")
+    def bulk_complete(self, request):
+        ids = request.data.get("ids") if isinstance(request.data, dict) else None
+        task_ids = TaskListSerializer.pk_list(ids)
+        if not task_ids:
+            return Response(
+                {"ids": ["Передайте непустой список идентификаторов задач"]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        queryset = (main_queryset | extra_queryset).distinct()
+        tasks = Task.objects.filter(pk__in=task_ids, users=request.user)
+        completed = {task.pk for task in tasks.complete(history_user=request.user)}
+        existing = set(tasks.values_list("pk", flat=True))
+
+        errors = []
+        for task_id in dict.fromkeys(task_ids):
+            if task_id not in existing:
+                errors.append(
+                    {
+                        "id": task_id,
+                        "detail": "Задача не найдена или не принадлежит пользователю",
+                    }
+                )
+            elif task_id not in completed:
+                errors.append({"id": task_id, "detail": "Задача уже выполнена"})
 
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        return Response(
+            {
+                "completed": [pk for pk in dict.fromkeys(task_ids) if pk in completed],
+                "errors": errors,
+            },
+            status=status.HTTP_200_OK,
+        )
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+    @action(methods=["GET"], detail=False, url_path="filtered-tasks")
+    @cache_user_response("filtered-tasks")
+    def filtered_tasks(self, request):
+        now = timezone.now()
+
+        # Срочные незавершённые задачи без просрочки или лёгкие задачи в
+        # ожидании не из категории "Работа". Одно соединение с users - без
+        # distinct().
+        queryset = (
+            Task.objects.filter(users=request.user)
+            .filter(
+                Q(
+                    status__in=["pending", "in_progress"],
+                    priority__gte=3,
+                    due_date__gte=now,
+                )
+                | (Q(status="pending", priority__lte=2) & ~Q(category__title="Работа"))
+            )
+            .order_by("due_date", "id")
+        )
+        return self.conditional(request, queryset, lambda: self.list_response(queryset))
+
+    def serialize_task_ids(self, task_ids):
+        rows_serializer = TaskRowSerializer(self.get_serializer())
+        rows = {
+            row["id"]: row
+            for row in rows_serializer.values(Task.objects.filter(id__in=task_ids))
+        }
+        return rows_serializer.to_representation(
+            rows[task_id] for task_id in task_ids if task_id in rows
+        )
 
     @action(methods=["GET"], detail=False, url_path="overdue")
+    @cache_user_response("overdue")
     def overdue_tasks(self, request):
         user = request.user
         now = timezone.now()
         tasks = Task.objects.filter(
             users=user, due_date__lt=now, status__in=["pending", "in_progress"]
         )
-        page = self.paginate_queryset(tasks)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
+        return self.conditional(request, tasks, lambda: self.list_response(tasks))
+
+    @action(methods=["GET"], detail=False, url_path="summary")
+    def summary(self, request):
+        """Число задач пользователя по статусам, приоритетам, категориям и
+        просроченных - из счётчиков TaskCounter, без подсчёта задач."""
+        return Response(get_summary(request.user))
 
     @action(methods=["POST"], detail=True, url_path="complete")
     def mark_complete(self, request, pk=None):
-        try:
-            task = Task.objects.get(pk=pk, users=request.user)
-        except Task.DoesNotExist:
+        tasks = Task.objects.filter(pk=pk, users=request.user)
+        if not tasks.complete(history_user=request.user):
+            if not tasks.exists():
+                return Response(
+                    {"detail": "Задача не найдена или не принадлежит пользователю"},
+                    status=404,
+                )
             return Response(
-                {"detail": "Задача не найдена или не принадлежит пользователю"},
-                status=404,
+                {"detail": "Задача уже выполнена"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        if task.status == "completed":
+        serializer = self.get_serializer(self.get_queryset().get(pk=pk))
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(methods=["GET"], detail=True, url_path="history")
+    def task_history(self, request, pk=None):
+        """Изменения задачи по версиям, от новых к старым.
+
+        ?since=ГГГГ-ММ-ДД или дата со временем ограничивает список версиями
+        не старше указанной; навигация только по курсору.
+        """
+        if not Task.objects.filter(pk=pk, users=request.user).exists():
             return Response(
-                {"detail": "Задача уже выполнена"}, status=status.HTTP_400_BAD_REQUEST
+                {"detail": "Задача не найдена или не принадлежит пользователю"},
+                status=404,
             )
 
-        task.status = "completed"
-        task.update_date = timezone.now()
-        task.save()
-        serializer = self.get_serializer(task)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        versions = Task.history.filter(id=pk)
+        since = request.query_params.get("since")
+        if since:
+            versions = versions.filter(history_date__gte=parse_since(since))
+
+        diff = TaskHistoryDiffSerializer()
+        paginator = TaskHistoryPagination()
+        page = paginator.paginate_queryset(diff.values(versions), request, view=self)
+        previous = None
+        if page:
+            previous = (
+                diff.values(Task.history.filter(id=pk))
+                .filter(history_id__lt=page[-1]["history_id"])
+                .order_by("-history_id")
+                .first()
+            )
+        return paginator.get_paginated_response(diff.to_representation(page, previous))
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    pagination_class = CommentPagination
+    last_modified_field = "updated_at"
+    filter_backends = [FullTextSearchFilter]
+    search_fields = ["text"]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):